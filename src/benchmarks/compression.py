@@ -0,0 +1,97 @@
+"""
+Compression benchmark: file size against save and load time, per codec, for the text and pickle repositories.
+
+Seeds the dataset of suite.py, which like archived term data is mostly repeated IDs, descriptions and grades,
+then for every codec times writing all three files at once, measures them and times opening them again.
+Run from the repository root:
+    python -m src.benchmarks.compression --sizes 10000 100000 --output compression.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from src.benchmarks.suite import seed
+from src.repository.compression import CODECS
+from src.repository.flush_policy import FlushPolicy
+
+DEFAULT_SIZES = (10_000, 100_000)
+BACKENDS = ("text", "binary")
+
+
+def _repositories(backend, directory, codec):
+    policy = FlushPolicy(FlushPolicy.EXIT)
+    if backend == "text":
+        from src.repository.student_text_file_repo import StudentTextFileRepository
+        from src.repository.assignment_text_file_repo import AssignmentTextFileRepository
+        from src.repository.grade_text_file_repo import GradeTextFileRepository
+
+        return (StudentTextFileRepository(os.path.join(directory, "students.txt"), policy, codec),
+                AssignmentTextFileRepository(os.path.join(directory, "assignments.txt"), policy, codec),
+                GradeTextFileRepository(os.path.join(directory, "grades.txt"), flush_policy=policy, compression=codec))
+    from src.repository.student_binary_file_repo import StudentBinaryFileRepository
+    from src.repository.assig_binary_file_repo import AssignmentBinaryFileRepository
+    from src.repository.grade_binary_file_repo import GradeBinaryFileRepository
+
+    return (StudentBinaryFileRepository(os.path.join(directory, "students.pickle"), policy, compression=codec),
+            AssignmentBinaryFileRepository(os.path.join(directory, "assignments.pickle"), policy, compression=codec),
+            GradeBinaryFileRepository(os.path.join(directory, "grades.pickle"), policy, compression=codec))
+
+
+def run_codec(backend, grades, codec, repeat):
+    """
+    :return: {"save": seconds, "load": seconds, "bytes": size of the three files}, the best of `repeat` runs.
+    """
+    result = {}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            repositories = _repositories(backend, directory, codec)
+            seed(*repositories, grades)
+            start = time.perf_counter()
+            for repo in repositories:
+                repo.flush()
+            save = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+            start = time.perf_counter()
+            _repositories(backend, directory, codec)
+            load = time.perf_counter() - start
+        result = {"save": min(save, result.get("save", save)), "load": min(load, result.get("load", load)),
+                  "bytes": size}
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare file size and save/load time of the compression codecs.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--codecs", nargs="+", choices=CODECS, default=list(CODECS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="numbers of grades")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per codec; the best one is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    arguments = parser.parse_args(argv)
+
+    results = []
+    print(f"{'backend':<8}{'grades':>10}  {'codec':<6}{'size':>14}{'ratio':>8}{'save':>12}{'load':>12}")
+    for grades in arguments.sizes:
+        for backend in arguments.backends:
+            uncompressed = None
+            for codec in arguments.codecs:
+                result = run_codec(backend, grades, codec, arguments.repeat)
+                uncompressed = uncompressed or (result["bytes"] if codec == "none" else None)
+                ratio = f"{uncompressed / result['bytes']:.1f}x" if uncompressed else "-"
+                results.append(dict(result, backend=backend, grades=grades, codec=codec))
+                print(f"{backend:<8}{grades:>10}  {codec:<6}{result['bytes']:>12} B{ratio:>8}"
+                      f"{result['save'] * 1000:>9.1f} ms{result['load'] * 1000:>9.1f} ms")
+
+    if arguments.output:
+        with open(arguments.output, "wt") as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "results": results}, file, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
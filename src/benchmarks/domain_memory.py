@@ -0,0 +1,55 @@
+"""
+Compare the memory used by the slotted domain classes with equivalent classes that keep a per-instance __dict__.
+
+Run from the repository root:
+    python -m src.benchmarks.domain_memory [count]
+"""
+import datetime
+import sys
+import tracemalloc
+
+from src.domain.assigment import Assignment
+from src.domain.grade import Grade
+from src.domain.student import Student
+
+
+def without_slots(cls):
+    """
+    Build a copy of a slotted class that stores its attributes in a __dict__ instead, with the same methods.
+    """
+    slot_names = {f"_{cls.__name__}{name}" if name.startswith("__") else name for name in cls.__slots__}
+    namespace = {name: value for name, value in cls.__dict__.items()
+                 if name not in slot_names and name not in ("__slots__", "__setstate__")}
+    return type(cls.__name__, (object,), namespace)
+
+
+def measure(factory, count):
+    """
+    :return: The bytes allocated per object when `count` objects are built with `factory(i)` and kept alive.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list itself is not part of the objects
+    return (after - before - sys.getsizeof(objects)) / count
+
+
+def main(count=100_000):
+    deadline = datetime.date(2024, 6, 1)
+    cases = [
+        ("Student", lambda cls, i: cls("name", i, 900 + i % 20), Student),
+        ("Assignment", lambda cls, i: cls(i, "description", deadline), Assignment),
+        ("Grade", lambda cls, i: cls(i % 50, i, 7.5), Grade),
+    ]
+    print(f"{'class':<12}{'__dict__ B/obj':>16}{'__slots__ B/obj':>17}{'saved':>8}")
+    for name, build, cls in cases:
+        plain = without_slots(cls)
+        with_dict = measure(lambda i: build(plain, i), count)
+        with_slots = measure(lambda i: build(cls, i), count)
+        print(f"{name:<12}{with_dict:>16.1f}{with_slots:>17.1f}{1 - with_slots / with_dict:>8.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,107 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the UI and open the repositories,
+which scripted invocations pay on every run.
+
+Every run starts a new Python process in a scratch directory with its own settings.properties
+(seed_data = false, so no synthetic data is generated) and reports three times per backend:
+the whole process, importing src.ui.ui, and choose_repository(). Results use the format of suite.py,
+so a baseline can be compared the same way. Run from the repository root:
+    python -m src.benchmarks.startup --output startup.json
+    python -m src.benchmarks.startup --baseline startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.benchmarks.suite import compare
+from src.repository.backends import BACKENDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SETTINGS = """[DEFAULT]
+repository = {backend}
+students = students.data
+assignments = assignments.data
+grades = grades.data
+database = studentmanager.db
+seed_data = false
+"""
+
+# Run in the child process; prints the import and choose_repository times as JSON
+PROBE = """
+import json, time
+start = time.perf_counter()
+from src.ui.ui import choose_repository
+imported = time.perf_counter()
+repositories = choose_repository()
+opened = time.perf_counter()
+print(json.dumps({"import_ui": imported - start, "choose_repository": opened - imported}))
+"""
+
+
+def run_once(backend, directory):
+    """
+    Start one interpreter on the backend.
+    :return: {operation: seconds}
+    """
+    with open(os.path.join(directory, "settings.properties"), "wt") as file:
+        file.write(SETTINGS.format(backend=backend))
+    environment = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", PROBE], cwd=directory, env=environment,
+                               capture_output=True, text=True, check=True)
+    timings = {"process": time.perf_counter() - start}
+    timings.update(json.loads(completed.stdout.splitlines()[-1]))
+    return timings
+
+
+def run_backend(backend, repeat):
+    """
+    :return: {operation: best time in seconds over `repeat` processes}
+    """
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            for operation, seconds in run_once(backend, directory).items():
+                timings[operation] = min(seconds, timings.get(operation, seconds))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the application for each backend.")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=5, help="processes per backend; the best one is kept")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 means 25%%")
+    arguments = parser.parse_args(argv)
+
+    results = []
+    for backend in arguments.backends:
+        for operation, seconds in run_backend(backend, arguments.repeat).items():
+            results.append({"backend": backend, "grades": 0, "operation": operation, "seconds": seconds})
+            print(f"{backend:<12}{operation:<20}{seconds * 1000:>12.3f} ms")
+
+    if arguments.output:
+        with open(arguments.output, "wt") as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "results": results}, file, indent=1)
+
+    if arguments.baseline:
+        with open(arguments.baseline, "rt") as file:
+            regressions = compare(results, json.load(file)["results"], arguments.tolerance)
+        for (backend, _, operation), old, new in regressions:
+            print(f"REGRESSION {backend} {operation}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
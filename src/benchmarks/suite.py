@@ -0,0 +1,240 @@
+"""
+Scale benchmarks for the repositories and services.
+
+Seeds a dataset of the requested number of grades for each backend, times the common operations and
+writes the results as JSON. A previous results file can be given as a baseline; the run then fails
+with exit code 1 if an operation got slower than the tolerance allows.
+
+Run from the repository root:
+    python -m src.benchmarks.suite --sizes 1000 10000 --output results.json
+    python -m src.benchmarks.suite --sizes 1000 10000 --baseline results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.repository.flush_policy import FlushPolicy
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+from src.services.assignment_service import AssignmentService
+from src.services.grade_service import GradeService
+from src.services.undo_service import UndoService
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_BACKENDS = ("memory", "text", "binary")
+ASSIGNMENTS = 20  # every student gets every assignment, so a dataset of n grades has n // 20 students
+GROUP_SIZE = 50
+# Differences below this many seconds are treated as noise when comparing with a baseline
+NOISE_FLOOR = 0.001
+
+
+def _memory(directory, flush_policy):
+    return StudentRepository(), AssignmentRepository(), GradeRepository()
+
+
+def _text(directory, flush_policy):
+    from src.repository.student_text_file_repo import StudentTextFileRepository
+    from src.repository.assignment_text_file_repo import AssignmentTextFileRepository
+    from src.repository.grade_text_file_repo import GradeTextFileRepository
+
+    return (StudentTextFileRepository(os.path.join(directory, "students.txt"), flush_policy),
+            AssignmentTextFileRepository(os.path.join(directory, "assignments.txt"), flush_policy),
+            GradeTextFileRepository(os.path.join(directory, "grades.txt"), flush_policy=flush_policy))
+
+
+def _binary(directory, flush_policy):
+    from src.repository.student_binary_file_repo import StudentBinaryFileRepository
+    from src.repository.assig_binary_file_repo import AssignmentBinaryFileRepository
+    from src.repository.grade_binary_file_repo import GradeBinaryFileRepository
+
+    return (StudentBinaryFileRepository(os.path.join(directory, "students.pickle"), flush_policy),
+            AssignmentBinaryFileRepository(os.path.join(directory, "assignments.pickle"), flush_policy),
+            GradeBinaryFileRepository(os.path.join(directory, "grades.pickle"), flush_policy))
+
+
+def _records(directory, flush_policy):
+    from src.repository.student_binary_file_repo import StudentBinaryFileRepository
+    from src.repository.assig_binary_file_repo import AssignmentBinaryFileRepository
+    from src.repository.grade_record_file_repo import GradeRecordFileRepository
+
+    return (StudentBinaryFileRepository(os.path.join(directory, "students.pickle"), flush_policy),
+            AssignmentBinaryFileRepository(os.path.join(directory, "assignments.pickle"), flush_policy),
+            GradeRecordFileRepository(os.path.join(directory, "grades.rec"), flush_policy))
+
+
+def _sqlite(directory, flush_policy):
+    from src.repository.sqlite_database import connect
+    from src.repository.student_sqlite_repo import StudentSqliteRepository
+    from src.repository.assignment_sqlite_repo import AssignmentSqliteRepository
+    from src.repository.grade_sqlite_repo import GradeSqliteRepository
+
+    connection = connect(os.path.join(directory, "studentmanager.db"))
+    return (StudentSqliteRepository(connection, flush_policy), AssignmentSqliteRepository(connection, flush_policy),
+            GradeSqliteRepository(connection, flush_policy))
+
+
+def _numpy(directory, flush_policy):
+    from src.repository.grade_numpy_repo import GradeNumpyRepository
+
+    return StudentRepository(), AssignmentRepository(), GradeNumpyRepository()
+
+
+# {backend name: function(directory, flush_policy) -> (student_repo, assignment_repo, grade_repo)}
+BACKENDS = {
+    "memory": _memory,
+    "text": _text,
+    "binary": _binary,
+    "records": _records,
+    "sqlite": _sqlite,
+    "numpy": _numpy,
+}
+# Backends without files: their load time is the time to seed them, and they are not reopened
+IN_MEMORY = {"memory", "numpy"}
+
+
+def _close(repositories):
+    for repo in repositories:
+        if hasattr(repo, "close"):
+            repo.close()
+        elif hasattr(repo, "flush"):
+            repo.flush()
+    connection = getattr(repositories[0], "_connection", None)
+    if connection is not None:
+        connection.close()
+
+
+def seed(student_repo, assignment_repo, grade_repo, grades):
+    """
+    Fill the repositories with `grades` grades: grades // ASSIGNMENTS students in groups of GROUP_SIZE,
+    each given every assignment. Half of the assignments are overdue and every other grade is still ungraded.
+    """
+    student_count = max(1, grades // ASSIGNMENTS)
+    today = datetime.date.today()
+    for assignment_id in range(ASSIGNMENTS):
+        days = -30 + assignment_id if assignment_id < ASSIGNMENTS // 2 else 30 + assignment_id
+        assignment_repo.add_assignment(Assignment(assignment_id, f"Assignment {assignment_id}",
+                                                  str(today + datetime.timedelta(days=days))))
+    student_repo.add_students_bulk(Student(f"Student {student_id}", student_id, student_id // GROUP_SIZE)
+                                   for student_id in range(student_count))
+    grade_repo.add_grades_bulk((student_id, assignment_id, None if (student_id + assignment_id) % 2 else 5 + student_id % 6)
+                               for student_id in range(student_count) for assignment_id in range(ASSIGNMENTS))
+    return student_count
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def run_backend(backend, grades, repeat, flush_policy):
+    """
+    Time every operation on one backend and dataset size.
+    :return: {operation: best time in seconds over `repeat` runs}
+    """
+    factory = BACKENDS[backend]
+    timings = {}
+
+    def record(operation, seconds):
+        timings[operation] = min(seconds, timings.get(operation, seconds))
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Seed with writes deferred to a single flush, then reopen to time a cold load
+        repositories = factory(directory, FlushPolicy(FlushPolicy.EXIT))
+        start = time.perf_counter()
+        student_count = seed(*repositories, grades)
+        if backend in IN_MEMORY:
+            record("load", time.perf_counter() - start)
+        _close(repositories)
+
+        for run in range(repeat):
+            if backend not in IN_MEMORY:
+                start = time.perf_counter()
+                repositories = factory(directory, flush_policy)
+                record("load", time.perf_counter() - start)
+            student_repo, assignment_repo, grade_repo = repositories
+            undo_service = UndoService()
+            assignment_service = AssignmentService(assignment_repo, student_repo, undo_service, grade_repo)
+            grade_service = GradeService(grade_repo, student_repo, assignment_repo, undo_service)
+
+            # A fresh assignment per run, so every run adds new rows
+            assignment_id = ASSIGNMENTS + run
+            assignment_repo.add_assignment(Assignment(assignment_id, "Benchmark", str(datetime.date.today())))
+            record("add_grade", _timed(grade_repo.add_grade, 0, assignment_id, None))
+            record("update_grade", _timed(grade_repo.update_grade, 0, assignment_id, 7))
+            record("delete_grade", _timed(grade_repo.delete, 0, assignment_id))
+            record("give_assignment_to_group", _timed(assignment_service.assign_to_group, assignment_id,
+                                                      (student_count - 1) // GROUP_SIZE))
+            record("undo", _timed(undo_service.undo))
+            record("redo", _timed(undo_service.redo))
+            record("students_sorted_by_average", _timed(grade_service.get_students_sorted_by_average_grade))
+            record("late_students", _timed(grade_service.get_late_students_with_ungraded_assignments))
+            record("students_due_within_30_days", _timed(grade_service.get_students_with_assignments_due_within, 30))
+            if backend not in IN_MEMORY:
+                _close(repositories)
+    return timings
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare two result lists.
+    :return: The list of (key, baseline seconds, new seconds) that got slower than `tolerance` allows.
+    """
+    previous = {(entry["backend"], entry["grades"], entry["operation"]): entry["seconds"] for entry in baseline}
+    regressions = []
+    for entry in results:
+        key = (entry["backend"], entry["grades"], entry["operation"])
+        if key not in previous:
+            continue
+        old, new = previous[key], entry["seconds"]
+        if new > old * (1 + tolerance) and new - old > NOISE_FLOOR:
+            regressions.append((key, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the repositories and services at several dataset sizes.")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=list(DEFAULT_BACKENDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="numbers of grades")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation; the best one is kept")
+    parser.add_argument("--flush", choices=FlushPolicy.MODES, default=FlushPolicy.IMMEDIATE,
+                        help="flush policy of the file backends while timing")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 means 25%%")
+    arguments = parser.parse_args(argv)
+
+    results = []
+    for grades in arguments.sizes:
+        for backend in arguments.backends:
+            timings = run_backend(backend, grades, arguments.repeat, FlushPolicy(arguments.flush))
+            for operation, seconds in timings.items():
+                results.append({"backend": backend, "grades": grades, "operation": operation, "seconds": seconds})
+                print(f"{backend:<8}{grades:>10}  {operation:<30}{seconds * 1000:>12.3f} ms")
+
+    if arguments.output:
+        with open(arguments.output, "wt") as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "flush": arguments.flush, "results": results}, file, indent=1)
+
+    if arguments.baseline:
+        with open(arguments.baseline, "rt") as file:
+            regressions = compare(results, json.load(file)["results"], arguments.tolerance)
+        for (backend, grades, operation), old, new in regressions:
+            print(f"REGRESSION {backend} {grades} {operation}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,26 @@
 import datetime
+
+
+def deadline_to_ordinal(deadline):
+    """
+    Convert a deadline into its proleptic Gregorian ordinal, so deadlines compare as plain ints.
+    :param deadline: A datetime, a date or a "YYYY-MM-DD" string.
+    :return: The ordinal of the deadline's day, or None if the deadline cannot be parsed.
+    """
+    if isinstance(deadline, datetime.datetime):
+        return deadline.date().toordinal()
+    if isinstance(deadline, datetime.date):
+        return deadline.toordinal()
+    try:
+        return datetime.datetime.strptime(str(deadline).strip(), "%Y-%m-%d").toordinal()
+    except ValueError:
+        return None
+
+
 class Assignment(object):
+    # Slots instead of a per-instance __dict__ keep each assignment small
+    __slots__ = ("_id", "_description", "_deadline")
+
     def __init__(self, assignment_id, description, deadline):
         self._id = assignment_id
         self._description = description
@@ -38,6 +59,17 @@ class Assignment(object):
     def __repr__(self):
         return str(self)
 
+    def __hash__(self):
+        # Consistent with __eq__, which only looks at the id
+        return hash(self.id)
+
+    def __setstate__(self, state):
+        # Accept both the (None, slots) state of current pickles and the __dict__ state of older assignments.pickle files
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        for name, value in state.items():
+            setattr(self, name, value)
+
 if __name__ == "__main__":
     c1 = Assignment(1000, "Proiect educatie tehnologica", datetime.datetime(2020, 5, 17))
     c2 = Assignment(1001, "Proiect lucru manual", datetime.datetime(2024, 4, 17))
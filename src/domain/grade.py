@@ -1,4 +1,7 @@
 class Grade(object):
+    # Grades are the most numerous objects, so they drop the per-instance __dict__ for three slots
+    __slots__ = ("__id", "__student", "_value")
+
     def __init__(self, assignment_id, student_id, grade_value):
         self.__id = assignment_id
         self.__student = student_id
@@ -37,6 +40,17 @@ class Grade(object):
     def __repr__(self):
         return str(self)
 
+    def __hash__(self):
+        # The value is mutable, so only the (assignment, student) key is hashed; equal grades still hash equally
+        return hash((self.id, self.student))
+
+    def __setstate__(self, state):
+        # Grades pickled by older versions restore from a plain dict, current ones from a (None, slots) tuple
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        for name, value in state.items():
+            setattr(self, name, value)
+
 if __name__ == "__main__":
     c1 = Grade(1, 2, 7)
     c2 = Grade(1, 2, 7)
@@ -1,4 +1,21 @@
+import unicodedata
+
+
+def normalize_name(name):
+    """
+    Fold a name for searching: case-folded, accents removed and runs of whitespace collapsed to one space,
+    so "  José  SMITH" and "jose smith" compare equal.
+    """
+    if name.isascii():
+        return " ".join(name.lower().split())
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
 class Student(object):
+    # No per-instance __dict__: with many students in memory the three slots are far smaller
+    __slots__ = ("__id", "_name", "__group")
+
     def __init__(self, name, student_id, student_group, assign_list=None):
         self.__id = student_id
         self._name = name
@@ -42,3 +59,11 @@ class Student(object):
 
     def __hash__(self):
         return hash(self.id)
+
+    def __setstate__(self, state):
+        # Objects pickled before __slots__ was added carry a __dict__ state, newer ones a (None, slots) tuple
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        for name, value in state.items():
+            setattr(self, name, value)
+
@@ -44,3 +44,8 @@ class InvalidStudentError(Exception):
 class InvalidGroupError(Exception):
     """Raised when attempting to assign an assignment to a non-existent group."""
     pass
+
+
+class MigrationError(Exception):
+    """Raised when a backend cannot be migrated or a migrated copy does not match its source."""
+    pass
@@ -0,0 +1,105 @@
+import functools
+import time
+
+
+class OperationStats:
+    __slots__ = ("count", "total", "max", "bytes_written")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes_written = 0
+
+
+class Stats:
+    """
+    Call counts, cumulative and maximum latency and bytes written, per named operation.
+    Collection is off by default: the timing hooks check `enabled` first and do nothing else while it is False,
+    and the repositories and services are only wrapped by instrument() once it is switched on.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._operations = {}  # {name: OperationStats}
+
+    def _get(self, name):
+        operation = self._operations.get(name)
+        if operation is None:
+            operation = self._operations[name] = OperationStats()
+        return operation
+
+    def record(self, name, seconds, bytes_written=None):
+        """
+        Record one call of an operation.
+        :param bytes_written: The bytes the call wrote to disk, if known.
+        """
+        operation = self._get(name)
+        operation.count += 1
+        operation.total += seconds
+        if seconds > operation.max:
+            operation.max = seconds
+        if bytes_written:
+            operation.bytes_written += bytes_written
+
+    def reset(self):
+        self._operations = {}
+
+    def snapshot(self):
+        """
+        Return a copy of the statistics: {name: {"count", "total_seconds", "max_seconds", "bytes_written"}}.
+        """
+        return {name: {"count": operation.count, "total_seconds": operation.total,
+                       "max_seconds": operation.max, "bytes_written": operation.bytes_written}
+                for name, operation in self._operations.items()}
+
+    def format_table(self):
+        """
+        Format the statistics as a text table, the operations with the most total time first.
+        """
+        lines = [f"{'operation':<52}{'calls':>8}{'total ms':>12}{'max ms':>10}{'bytes':>12}"]
+        for name, operation in sorted(self._operations.items(), key=lambda item: item[1].total, reverse=True):
+            lines.append(f"{name:<52}{operation.count:>8}{operation.total * 1000:>12.2f}"
+                         f"{operation.max * 1000:>10.2f}{operation.bytes_written or '':>12}")
+        return "\n".join(lines)
+
+
+# The statistics shared by the whole application
+STATS = Stats()
+
+
+def timed(name=None):
+    """
+    Decorator recording every call of the function in STATS while it is enabled.
+    :param name: The operation name, by default the function's qualified name, e.g. "StudentTextFileRepository.__load_file".
+    """
+    def decorator(function):
+        operation_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not STATS.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STATS.record(operation_name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def instrument(obj, name=None):
+    """
+    Time every public method of one object by shadowing it with a timed wrapper on the instance.
+    Everyone holding a reference to the object, e.g. the services holding a repository, then goes through the wrapper.
+    :param name: The prefix of the operation names, by default the class name.
+    :return: The same object.
+    """
+    name = name or type(obj).__name__
+    for attribute in dir(type(obj)):
+        # Properties and constants are skipped, only methods are wrapped
+        if attribute.startswith("_") or not callable(getattr(type(obj), attribute)):
+            continue
+        setattr(obj, attribute, timed(f"{name}.{attribute}")(getattr(obj, attribute)))
+    return obj
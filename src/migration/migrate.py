@@ -0,0 +1,128 @@
+"""
+Copy a grade book from one storage backend to another, e.g. from text files to SQLite.
+
+Both backends are described by a settings file, in the format of settings.properties. Records are streamed
+from the source in batches and written to the target, which must be empty, so the data never has to fit in memory.
+Afterwards the target is read back and its record counts and checksums are compared with the source's.
+Run from the directory the settings files' paths are relative to:
+    python -m src.migration.migrate --source text.properties --target sqlite.properties
+"""
+import argparse
+import hashlib
+import itertools
+import sys
+
+from src.exceptions.exceptions import MigrationError
+from src.migration.streams import open_reader, open_writer
+from src.settings.settings import Settings
+
+DEFAULT_BATCH_SIZE = 10_000
+KINDS = ("students", "assignments", "grades")
+
+
+def canonical(kind, record):
+    """
+    Reduce a record to the fields every backend stores, in one form: grades as floats and deadlines as text.
+    """
+    if kind == "students":
+        return record.id, record.name, record.group
+    if kind == "assignments":
+        return record.id, record.description, str(record.deadline)
+    student_id, assignment_id, grade_value = record
+    return student_id, assignment_id, None if grade_value is None else float(grade_value)
+
+
+class Tally:
+    """
+    The record count and checksum of one stream. The checksum is the sum of the records' hashes,
+    so it does not depend on the order the backend returns its records in.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.checksum = 0
+
+    def add(self, kind, record):
+        digest = hashlib.blake2b(repr(canonical(kind, record)).encode(), digest_size=8).digest()
+        self.checksum = (self.checksum + int.from_bytes(digest, "little")) % 2 ** 64
+        self.count += 1
+
+    def __eq__(self, other):
+        return (self.count, self.checksum) == (other.count, other.checksum)
+
+    def __repr__(self):
+        return f"{self.count} records, checksum {self.checksum:016x}"
+
+
+def batches(records, size):
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def tally(reader):
+    """
+    :return: {kind: Tally} over everything the reader yields.
+    """
+    tallies = {}
+    for kind in KINDS:
+        tallies[kind] = Tally()
+        for record in getattr(reader, kind)():
+            tallies[kind].add(kind, record)
+    return tallies
+
+
+def migrate(source_settings, target_settings, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Copy every student, assignment and grade from the source backend to the empty target backend,
+    then verify the target against the source.
+    :param progress: function(kind, records copied so far), called after every batch.
+    :raises MigrationError: If a backend cannot be migrated, the target is not empty or the copy does not match.
+    :return: {kind: Tally} of the copied records.
+    """
+    copied = {}
+    with open_reader(source_settings) as reader, open_writer(target_settings) as writer:
+        for kind in KINDS:
+            copied[kind] = Tally()
+            write = getattr(writer, f"write_{kind}")
+            for batch in batches(getattr(reader, kind)(), batch_size):
+                write(batch)
+                for record in batch:
+                    copied[kind].add(kind, record)
+                if progress is not None:
+                    progress(kind, copied[kind].count)
+
+    with open_reader(target_settings) as reader:
+        stored = tally(reader)
+    for kind in KINDS:
+        if stored[kind] != copied[kind]:
+            raise MigrationError(f"The target's {kind} do not match the source: "
+                                 f"copied {copied[kind]!r}, found {stored[kind]!r}.")
+    return copied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy the grade book from one storage backend to another.")
+    parser.add_argument("--source", required=True, help="settings file of the backend to read")
+    parser.add_argument("--target", required=True, help="settings file of the empty backend to write")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="records per write")
+    arguments = parser.parse_args(argv)
+
+    def report(kind, count):
+        print(f"{kind}: {count} records copied", file=sys.stderr, flush=True)
+
+    try:
+        copied = migrate(Settings(arguments.source), Settings(arguments.target), arguments.batch_size, report)
+    except MigrationError as error:
+        print(f"Migration failed: {error}", file=sys.stderr)
+        return 1
+    for kind in KINDS:
+        print(f"{kind}: {copied[kind]!r}, verified")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
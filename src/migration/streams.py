@@ -0,0 +1,322 @@
+"""
+Streaming readers and writers for the storage backends, used by the migration tool.
+
+A reader yields a backend's students, assignments and grades one at a time, straight from its files or database,
+without building a repository: its students(), assignments() and grades() methods return iterators, grades as
+(student_id, assignment_id, grade_value) tuples. A writer stores batches of them into an empty backend through
+write_students(list), write_assignments(list) and write_grades(list of such tuples); the data is complete once
+the writer is closed. Both are context managers and are registered under the `repository` setting values of
+src.repository.backends.
+
+Every stream runs in constant memory except:
+    - reading a pickle file, whose snapshot can only be unpickled as a whole,
+    - reading a text grades journal, which is held in memory (it is bounded by journal_compact_threshold),
+    - writing a grade record file, whose key -> slot map grows with the number of grades.
+"""
+import os
+
+from src.exceptions.exceptions import MigrationError
+from src.repository.compression import open_file
+from src.repository.pickle_segments import DELETE, UPSERT, SegmentedPickleFile
+
+# {repository type: function(settings) -> reader}
+READERS = {}
+# {repository type: function(settings) -> writer}
+WRITERS = {}
+
+
+def register_reader(name):
+    def register(factory):
+        READERS[name] = factory
+        return factory
+    return register
+
+
+def register_writer(name):
+    def register(factory):
+        WRITERS[name] = factory
+        return factory
+    return register
+
+
+def open_reader(settings):
+    """Open the backend named in the settings for reading."""
+    return _factory(READERS, settings)(settings)
+
+
+def open_writer(settings):
+    """Open the backend named in the settings for writing. It must not hold any data yet."""
+    return _factory(WRITERS, settings)(settings)
+
+
+def _factory(registry, settings):
+    backend = settings.get_repository_type()
+    if backend not in registry:
+        raise MigrationError(f"The {backend or 'default'} backend keeps no data on disk and cannot be migrated.")
+    return registry[backend]
+
+
+def _ensure_empty(*filenames):
+    for filename in filenames:
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            raise MigrationError(f"The target {filename} already holds data.")
+
+
+class _Stream:
+    """
+    Base of the readers and writers, which are used as context managers.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+
+# --- text files ---
+
+class TextFileReader(_Stream):
+    def __init__(self, settings):
+        self.__settings = settings
+
+    def students(self):
+        from src.repository.student_text_file_repo import read_students
+        return read_students(self.__settings.get_file_for_students())
+
+    def assignments(self):
+        from src.repository.assignment_text_file_repo import read_assignments
+        return read_assignments(self.__settings.get_file_for_assignments())
+
+    def grades(self):
+        """
+        Yield the grades of the base file with the journal applied on top of it.
+        """
+        from src.repository.grade_text_file_repo import GradeTextFileRepository, read_grades, read_journal
+
+        filename = self.__settings.get_file_for_grades()
+        # The journal folded into {key: value or DELETE} plus the students and assignments whose grades it removed.
+        # A torn record at its end is skipped, the source is left as it is.
+        changes, removed_students, removed_assignments = {}, set(), set()
+        for record in read_journal(filename + ".journal")[0]:
+            if record[0] == GradeTextFileRepository.UPSERT:
+                changes[(record[1], record[2])] = record[3]
+            elif record[0] == GradeTextFileRepository.DELETE:
+                changes[(record[1], record[2])] = DELETE
+            elif record[0] == GradeTextFileRepository.DELETE_ASSIGNMENT:
+                removed_assignments.add(record[1])
+                changes.update({key: DELETE for key in changes if key[0] == record[1]})
+            elif record[0] == GradeTextFileRepository.DELETE_STUDENT:
+                removed_students.add(record[1])
+                changes.update({key: DELETE for key in changes if key[1] == record[1]})
+
+        for assignment_id, student_id, grade_value in read_grades(filename):
+            if (assignment_id, student_id) in changes:
+                continue
+            if assignment_id in removed_assignments or student_id in removed_students:
+                continue
+            yield student_id, assignment_id, grade_value
+        for (assignment_id, student_id), grade_value in changes.items():
+            if grade_value is not DELETE:
+                yield student_id, assignment_id, grade_value
+
+
+class TextFileWriter(_Stream):
+    def __init__(self, settings):
+        filenames = (settings.get_file_for_students(), settings.get_file_for_assignments(),
+                     settings.get_file_for_grades())
+        _ensure_empty(*filenames, filenames[2] + ".journal")
+        self.__files = [open_file(filename, "wt", settings.get_compression()) for filename in filenames]
+
+    def write_students(self, students):
+        from src.repository.student_text_file_repo import format_student
+        self.__files[0].writelines(format_student(student) for student in students)
+
+    def write_assignments(self, assignments):
+        from src.repository.assignment_text_file_repo import format_assignment
+        self.__files[1].writelines(format_assignment(assignment) for assignment in assignments)
+
+    def write_grades(self, grades):
+        from src.repository.grade_text_file_repo import format_grade
+        self.__files[2].writelines(format_grade(assignment_id, student_id, grade_value)
+                                   for student_id, assignment_id, grade_value in grades)
+
+    def close(self):
+        for file in self.__files:
+            file.close()
+
+
+register_reader("textfiles")(TextFileReader)
+register_writer("textfiles")(TextFileWriter)
+
+
+# --- binary files ---
+
+def _replay(filename, key):
+    """
+    Load a pickle file's snapshot and apply its segments.
+    :param key: function(record) -> the key in the snapshot dict that an upsert or delete record changes.
+    """
+    snapshot, records = SegmentedPickleFile(filename).load()
+    state = {} if snapshot is None else snapshot
+    if isinstance(state, list):
+        # The list of Grade objects of older grade files, see GradeBinaryFileRepository
+        state = {(grade.student, grade.id): grade.value for grade in state}
+    for record in records:
+        if record[0] == UPSERT:
+            state[key(record)] = record[-1]
+        else:
+            state.pop(key(record), None)
+    return state
+
+
+def _entity_key(record):
+    # (UPSERT, entity) or (DELETE, id)
+    return record[1].id if record[0] == UPSERT else record[1]
+
+
+def _grade_key(record):
+    # (UPSERT, assignment_id, student_id, value) or (DELETE, assignment_id, student_id)
+    return record[1], record[2]
+
+
+class BinaryFileReader(_Stream):
+    def __init__(self, settings):
+        self.__settings = settings
+
+    def students(self):
+        yield from _replay(self.__settings.get_file_for_students(), _entity_key).values()
+
+    def assignments(self):
+        yield from _replay(self.__settings.get_file_for_assignments(), _entity_key).values()
+
+    def grades(self):
+        filename = self.__settings.get_file_for_grades()
+        if self.__settings.get_grades_format() == "records":
+            from src.repository.grade_record_file_repo import read_records
+            if os.path.exists(filename):
+                for assignment_id, student_id, grade_value in read_records(filename):
+                    yield student_id, assignment_id, grade_value
+            return
+        for (assignment_id, student_id), grade_value in _replay(filename, _grade_key).items():
+            yield student_id, assignment_id, grade_value
+
+
+class BinaryFileWriter(_Stream):
+    """
+    Writes an empty snapshot and then appends every batch as a segment, so nothing accumulates in memory.
+    The first repository that opens a file compacts its segments into a snapshot.
+    """
+
+    def __init__(self, settings):
+        self.__records_format = settings.get_grades_format() == "records"
+        filenames = (settings.get_file_for_students(), settings.get_file_for_assignments(),
+                     settings.get_file_for_grades())
+        _ensure_empty(*filenames)
+        self.__students = SegmentedPickleFile(filenames[0], compression=settings.get_compression())
+        self.__assignments = SegmentedPickleFile(filenames[1], compression=settings.get_compression())
+        self.__students.write_snapshot({})
+        self.__assignments.write_snapshot({})
+        if self.__records_format:
+            from src.repository.grade_record_file_repo import GradeRecordFile
+            self.__grades = GradeRecordFile(filenames[2])
+        else:
+            self.__grades = SegmentedPickleFile(filenames[2], compression=settings.get_compression())
+            self.__grades.write_snapshot({})
+
+    def write_students(self, students):
+        self.__students.append([(UPSERT, student) for student in students])
+
+    def write_assignments(self, assignments):
+        self.__assignments.append([(UPSERT, assignment) for assignment in assignments])
+
+    def write_grades(self, grades):
+        if self.__records_format:
+            for student_id, assignment_id, grade_value in grades:
+                self.__grades[(assignment_id, student_id)] = grade_value
+        else:
+            self.__grades.append([(UPSERT, assignment_id, student_id, grade_value)
+                                  for student_id, assignment_id, grade_value in grades])
+
+    def close(self):
+        if self.__records_format:
+            self.__grades.close()
+
+
+register_reader("binaryfiles")(BinaryFileReader)
+register_writer("binaryfiles")(BinaryFileWriter)
+
+
+# --- SQLite ---
+
+class SqliteReader(_Stream):
+    """Reads through the SQLite repositories, whose iter_* methods fetch rows from the cursor as they go."""
+
+    def __init__(self, settings):
+        from src.repository.sqlite_database import connect
+
+        if not os.path.exists(settings.get_database_file()):
+            raise MigrationError(f"The database {settings.get_database_file()} does not exist.")
+        self.__connection = connect(settings.get_database_file())
+
+    def students(self):
+        from src.repository.student_sqlite_repo import StudentSqliteRepository
+        return StudentSqliteRepository(self.__connection).iter_students()
+
+    def assignments(self):
+        from src.repository.assignment_sqlite_repo import AssignmentSqliteRepository
+        return AssignmentSqliteRepository(self.__connection).iter_assignments()
+
+    def grades(self):
+        from src.repository.grade_sqlite_repo import GradeSqliteRepository
+        for grade in GradeSqliteRepository(self.__connection).iter_grades():
+            yield grade.student, grade.id, grade.value
+
+    def close(self):
+        self.__connection.close()
+
+
+class SqliteWriter(_Stream):
+    """Writes through the SQLite repositories and commits after every batch."""
+
+    def __init__(self, settings):
+        from src.repository.sqlite_database import connect
+        from src.repository.student_sqlite_repo import StudentSqliteRepository
+        from src.repository.assignment_sqlite_repo import AssignmentSqliteRepository
+        from src.repository.grade_sqlite_repo import GradeSqliteRepository
+        from src.repository.flush_policy import FlushPolicy
+
+        self.__connection = connect(settings.get_database_file())
+        for table in ("students", "assignments", "grades"):
+            if self.__connection.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None:
+                self.__connection.close()
+                raise MigrationError(f"The target database {settings.get_database_file()} already holds {table}.")
+        # Committed by hand once per batch
+        policy = FlushPolicy(FlushPolicy.EXIT)
+        self.__student_repo = StudentSqliteRepository(self.__connection, policy)
+        self.__assignment_repo = AssignmentSqliteRepository(self.__connection, policy)
+        self.__grade_repo = GradeSqliteRepository(self.__connection, policy)
+
+    def write_students(self, students):
+        self.__student_repo.add_students_bulk(students)
+        self.__connection.commit()
+
+    def write_assignments(self, assignments):
+        for assignment in assignments:
+            self.__assignment_repo.add_assignment(assignment)
+        self.__connection.commit()
+
+    def write_grades(self, grades):
+        self.__grade_repo.add_grades_bulk(grades)
+        self.__connection.commit()
+
+    def close(self):
+        self.__connection.commit()
+        self.__connection.close()
+
+
+register_reader("sqlite")(SqliteReader)
+register_writer("sqlite")(SqliteWriter)
@@ -1,34 +1,69 @@
-import pickle
 from src.domain.assigment import Assignment
+from src.instrumentation.stats import timed
+from src.repository.compression import NONE
+from src.repository.flush_policy import FlushController
 from src.repository.memory_assignment import AssignmentRepository
+from src.repository.pickle_segments import DELETE, UPSERT, SegmentedPickleFile
 
 class AssignmentBinaryFileRepository(AssignmentRepository):
-    def __init__(self, filename):
+    def __init__(self, filename, flush_policy=None, compact_threshold=1000, compression=NONE):
+        """
+        :param filename: The assignments file, a pickled snapshot followed by delta segments.
+        :param flush_policy: When pending changes are written, see FlushPolicy.
+        :param compact_threshold: Number of segment records after which a new snapshot is written.
+        :param compression: The codec the file is written with, see src.repository.compression.
+        """
         super().__init__()
-        self.__fileName = filename
+        self.__file = SegmentedPickleFile(filename, compact_threshold, compression)
+        self.__pending_records = []
+        self._flusher = FlushController(self.__write_changes, flush_policy)
         self.__load_file()
 
+    @timed()
     def __load_file(self):
-        """Load assignments from a binary file."""
-        try:
-            with open(self.__fileName, "rb") as file:
-                self.assignments = pickle.load(file)
-        except (FileNotFoundError, EOFError):
-            self.assignments = {}
-
-    def __save_file(self):
-        """Save all assignments to a binary file."""
-        with open(self.__fileName, "wb") as file:
-            pickle.dump(self.assignments, file)
+        """Load assignments from the snapshot and replay the segments appended after it."""
+        snapshot, records = self.__file.load()
+        self.assignments = {} if snapshot is None else snapshot
+        for record in records:
+            if record[0] == UPSERT:
+                self.assignments[record[1].id] = record[1]
+            else:
+                self.assignments.pop(record[1], None)
+        self._rebuild_indexes()
+        if self.__file.compaction_due:
+            self.compact()
+
+    def __write_changes(self):
+        """Append the pending records as one segment, or write a new snapshot once compaction is due."""
+        records, self.__pending_records = self.__pending_records, []
+        return self.__file.save(records, self.assignments)
+
+    def __persist(self, records):
+        self.__pending_records.extend(records)
+        self._flusher.changed()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Write pending changes to the binary file."""
+        self._flusher.flush()
+
+    def compact(self):
+        """Rewrite the file as a single snapshot of the current assignments."""
+        self.__pending_records = []
+        self.__file.write_snapshot(self.assignments)
+        self._flusher.mark_clean()
 
     def add_assignment(self, assignment):
         super().add_assignment(assignment)
-        self.__save_file()
+        self.__persist([(UPSERT, assignment)])
 
     def remove_assignment(self, assignment_id, grade_repo):
         super().remove_assignment(assignment_id, grade_repo)
-        self.__save_file()
+        self.__persist([(DELETE, assignment_id)])
 
     def update_assignment(self, assignment):
         super().update_assignment(assignment)
-        self.__save_file()
+        self.__persist([(UPSERT, assignment)])
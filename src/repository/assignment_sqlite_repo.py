@@ -0,0 +1,102 @@
+from src.domain.assigment import Assignment, deadline_to_ordinal
+from src.repository.flush_policy import FlushController
+from src.repository.memory_assignment import AssignmentRepository
+
+
+class AssignmentSqliteRepository(AssignmentRepository):
+    """
+    AssignmentRepository stored in the "assignments" table of a SQLite database.
+    Deadlines are stored next to their day ordinal, which is indexed for the overdue and due-within queries.
+    """
+
+    def __init__(self, connection, flush_policy=None):
+        # The in-memory dictionaries of AssignmentRepository are not used, so its __init__ is not called
+        self._connection = connection
+        self._flusher = FlushController(self._connection.commit, flush_policy, f"{type(self).__name__}.commit")
+
+    @staticmethod
+    def __to_assignment(row):
+        return Assignment(row[0], row[1], row[2])
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Commit pending changes to the database."""
+        self._flusher.flush()
+
+    def __exists(self, assignment_id):
+        return self._connection.execute("SELECT 1 FROM assignments WHERE id = ?",
+                                        (assignment_id,)).fetchone() is not None
+
+    def add_assignment(self, assignment):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO assignments (id, description, deadline, deadline_ordinal) VALUES (?, ?, ?, ?)",
+            (assignment.id, assignment.description, str(assignment.deadline), deadline_to_ordinal(assignment.deadline)))
+        self._flusher.changed()
+
+    def get(self, id):
+        row = self._connection.execute("SELECT id, description, deadline FROM assignments WHERE id = ?",
+                                       (id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Assignment {id} does not exist.")
+        return self.__to_assignment(row)
+
+    def remove_assignment(self, assignment_id, grade_repo):
+        if not self.__exists(assignment_id):
+            raise ValueError(f"Assignment {assignment_id} does not exist.")
+        grade_repo.remove_grades_for_assignment(assignment_id)
+        self._connection.execute("DELETE FROM assignments WHERE id = ?", (assignment_id,))
+        self._flusher.changed()
+
+    def update_assignment(self, assignment):
+        self.add_assignment(assignment)
+
+    def give_assignment_to_student(self, assignment_id, student_id, grade_repo):
+        if not self.__exists(assignment_id):
+            raise ValueError(f"Assignment {assignment_id} does not exist.")
+        grade_repo.add_grade(student_id, assignment_id, grade_value=None)
+
+    def give_assignment_to_students(self, assignment_id, student_ids, grade_repo):
+        if not self.__exists(assignment_id):
+            raise ValueError(f"Assignment {assignment_id} does not exist.")
+        new_student_ids = [student_id for student_id in dict.fromkeys(student_ids)
+                           if not grade_repo.has_grade(student_id, assignment_id)]
+        if new_student_ids:
+            grade_repo.add_grades_bulk((student_id, assignment_id, None) for student_id in new_student_ids)
+        return new_student_ids
+
+    def give_assignment_to_group(self, assignment_id, group_id, student_repo, grade_repo):
+        if not self.__exists(assignment_id):
+            raise ValueError(f"Assignment {assignment_id} does not exist.")
+
+        students_in_group = student_repo.students_in_group(group_id)
+        if not students_in_group:
+            raise ValueError(f"Group {group_id} does not exist or has no students.")
+
+        return self.give_assignment_to_students(assignment_id, [student.id for student in students_in_group],
+                                                grade_repo)
+
+    def list_assignments(self):
+        rows = self._connection.execute("SELECT id, description, deadline FROM assignments ORDER BY id")
+        return [self.__to_assignment(row) for row in rows]
+
+    def iter_assignments(self):
+        """
+        Yield the assignments in ID order, fetching rows from the cursor as they are consumed.
+        """
+        for row in self._connection.execute("SELECT id, description, deadline FROM assignments ORDER BY id"):
+            yield self.__to_assignment(row)
+
+    def get_assignments_due_between(self, first_day, last_day):
+        """
+        Return the IDs of the assignments due between two days, both included, ordered by deadline.
+        Runs as a range scan over the index on deadline_ordinal.
+        """
+        first = -1 if first_day is None else first_day.toordinal()
+        last = 2 ** 62 if last_day is None else last_day.toordinal()
+        rows = self._connection.execute(
+            "SELECT id FROM assignments WHERE deadline_ordinal BETWEEN ? AND ? ORDER BY deadline_ordinal, id",
+            (first, last))
+        return [row[0] for row in rows]
@@ -1,74 +1,95 @@
+import os
+
+from src.instrumentation.stats import timed
+from src.repository.compression import NONE, open_file
+from src.repository.flush_policy import FlushController
 from src.repository.memory_assignment import AssignmentRepository
 from src.domain.assigment import Assignment
 
 
+def read_assignments(filename):
+    """
+    Parse an assignments text file line by line, yielding one assignment at a time.
+    A missing file yields nothing.
+    """
+    try:
+        with open_file(filename, "rt") as fin:
+            for line in fin:
+                current_line = line.strip().split(",")
+                if current_line == [""]:
+                    continue
+                yield Assignment(
+                    int(current_line[0]),  # ID
+                    current_line[1],       # Description
+                    current_line[2]        # Deadline
+                )
+    except IOError:
+        # It's okay if the file doesn't exist yet
+        pass
+
+
+def format_assignment(assignment):
+    """Return the line of an assignment in the text file."""
+    return f"{assignment.id},{assignment.description},{assignment.deadline}\n"
+
+
 class AssignmentTextFileRepository(AssignmentRepository):
-    def __init__(self, filename):
+    def __init__(self, filename, flush_policy=None, compression=NONE):
+        """
+        :param compression: The codec the file is written with, see src.repository.compression.
+                            Files are read with whatever codec they were written with.
+        """
         super().__init__()
         self.__fileName = filename
+        self.__compression = compression
+        self._flusher = FlushController(self.__saveFile, flush_policy)
         self.__loadFile()
 
+    @timed()
     def __loadFile(self):
         """
         Load assignments from a text file.
         """
-        lines = []
-        try:
-            with open(self.__fileName, "rt") as fin:
-                lines = fin.readlines()
-        except IOError:
-            # It's okay if the file doesn't exist yet
-            pass
-
-        for line in lines:
-            current_line = line.strip().split(",")
-            new_assignment = Assignment(
-                int(current_line[0]),  # ID
-                current_line[1],       # Description
-                current_line[2]        # Deadline
-            )
+        for new_assignment in read_assignments(self.__fileName):
             self.assignments[new_assignment.id] = new_assignment
+        self._rebuild_indexes()
 
     def __saveFile(self):
         """
         Save all assignments to a text file.
         """
-        with open(self.__fileName, "wt") as fout:
-            for assignment in self.list_assignments():
-                assignment_string = f"{assignment.id},{assignment.description},{assignment.deadline}\n"
-                fout.write(assignment_string)
+        with open_file(self.__fileName, "wt", self.__compression) as fout:
+            for assignment in self.iter_assignments():
+                fout.write(format_assignment(assignment))
+        return os.path.getsize(self.__fileName)
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """
+        Write pending changes to the file.
+        """
+        self._flusher.flush()
 
     def add_assignment(self, assignment):
         """
         Add a new assignment to the repository and save to file.
         """
         super().add_assignment(assignment)
-        self.__saveFile()
+        self._flusher.changed()
 
     def remove_assignment(self, assignment_id, grade_repo):
         """
         Remove an assignment by ID and save changes to file.
         """
         super().remove_assignment(assignment_id, grade_repo)
-        self.__saveFile()
+        self._flusher.changed()
 
     def update_assignment(self, assignment):
         """
         Update an existing assignment and save changes to file.
         """
         super().update_assignment(assignment)
-        self.__saveFile()
-
-    def give_assignment_to_student(self, assignment_id, student_id, grade_repo):
-        """
-        Assign an assignment to a specific student and save to file.
-        """
-        super().give_assignment_to_student(assignment_id, student_id, grade_repo)
-        self.__saveFile()
-
-    def give_assignment_to_group(self, assignment_id, group_id, student_repo, grade_repo):
-        """
-        Assign an assignment to a group of students and save to file.
-        """
-        super().give_assignment_to_group(assignment_id, group_id, student_repo, grade_repo)
-        self.__saveFile()
+        self._flusher.changed()
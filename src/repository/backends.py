@@ -0,0 +1,91 @@
+"""
+The storage backends that settings.properties can name as `repository`.
+
+Each backend is a factory that imports its own repository modules, so starting the application only
+imports the backend it runs on.
+"""
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+
+# {repository type: function(settings, flush_policy) -> (student_repo, assignment_repo, grade_repo)}
+BACKENDS = {}
+DEFAULT_BACKEND = "inmemory"
+
+
+def register_backend(name):
+    """
+    Decorator that registers a repository factory under a `repository` setting value.
+    """
+    def register(factory):
+        BACKENDS[name] = factory
+        return factory
+    return register
+
+
+def create_repositories(settings, flush_policy):
+    """
+    Build the repositories of the backend named in the settings.
+    Unknown or missing repository types fall back to the in-memory repositories.
+    :return: A (student_repo, assignment_repo, grade_repo) tuple.
+    """
+    factory = BACKENDS.get(settings.get_repository_type(), BACKENDS[DEFAULT_BACKEND])
+    return factory(settings, flush_policy)
+
+
+@register_backend("inmemory")
+def _memory(settings, flush_policy):
+    if settings.get_grade_storage() == "numpy":
+        from src.repository.grade_numpy_repo import GradeNumpyRepository
+        grade_repo = GradeNumpyRepository()
+    else:
+        grade_repo = GradeRepository()
+    return StudentRepository(), AssignmentRepository(), grade_repo
+
+
+@register_backend("binaryfiles")
+def _binary_files(settings, flush_policy):
+    from src.repository.student_binary_file_repo import StudentBinaryFileRepository
+    from src.repository.assig_binary_file_repo import AssignmentBinaryFileRepository
+
+    compact_threshold = settings.get_journal_compact_threshold()
+    compression = settings.get_compression()
+    if settings.get_grades_format() == "records":
+        from src.repository.grade_record_file_repo import GradeRecordFileRepository
+        grade_repo = GradeRecordFileRepository(settings.get_file_for_grades(), flush_policy)
+    else:
+        from src.repository.grade_binary_file_repo import GradeBinaryFileRepository
+        grade_repo = GradeBinaryFileRepository(settings.get_file_for_grades(), flush_policy, compact_threshold,
+                                               compression)
+    return (StudentBinaryFileRepository(settings.get_file_for_students(), flush_policy, compact_threshold, compression),
+            AssignmentBinaryFileRepository(settings.get_file_for_assignments(), flush_policy, compact_threshold,
+                                           compression),
+            grade_repo)
+
+
+@register_backend("textfiles")
+def _text_files(settings, flush_policy):
+    from src.repository.student_text_file_repo import StudentTextFileRepository
+    from src.repository.assignment_text_file_repo import AssignmentTextFileRepository
+    from src.repository.grade_text_file_repo import GradeTextFileRepository
+
+    compression = settings.get_compression()
+    return (StudentTextFileRepository(settings.get_file_for_students(), flush_policy, compression),
+            AssignmentTextFileRepository(settings.get_file_for_assignments(), flush_policy, compression),
+            GradeTextFileRepository(settings.get_file_for_grades(),
+                                    journal=settings.get_grades_journal(),
+                                    compact_threshold=settings.get_journal_compact_threshold(),
+                                    flush_policy=flush_policy,
+                                    compression=compression))
+
+
+@register_backend("sqlite")
+def _sqlite(settings, flush_policy):
+    from src.repository.sqlite_database import connect
+    from src.repository.student_sqlite_repo import StudentSqliteRepository
+    from src.repository.assignment_sqlite_repo import AssignmentSqliteRepository
+    from src.repository.grade_sqlite_repo import GradeSqliteRepository
+
+    connection = connect(settings.get_database_file())
+    return (StudentSqliteRepository(connection, flush_policy), AssignmentSqliteRepository(connection, flush_policy),
+            GradeSqliteRepository(connection, flush_policy))
@@ -0,0 +1,133 @@
+"""
+Optional compression of the text and pickle files of the file repositories.
+
+open_file() opens a file like open() does, compressing what is written with the chosen codec and detecting the
+codec of what is read from the file's first bytes, so files written with any codec, or none, load the same way.
+Data is compressed and decompressed in chunks as it is written and read, never as a whole.
+Appending to a file keeps the codec the file was written with: gzip, zlib and xz data may be concatenated,
+and each append adds one more compressed stream.
+"""
+import gzip
+import io
+import lzma
+import os
+import zlib
+
+NONE = "none"
+GZIP = "gzip"
+ZLIB = "zlib"
+LZMA = "lzma"
+CODECS = (NONE, GZIP, ZLIB, LZMA)
+# Compression levels used when none is configured; gzip would default to the slow level 9
+DEFAULT_LEVELS = {GZIP: 6, ZLIB: 6, LZMA: 6}
+CHUNK = 64 * 1024
+# What reading a truncated or damaged compressed file may raise
+READ_ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError)
+
+
+def detect(filename):
+    """
+    Tell the codec of a file from its first bytes.
+    :return: One of CODECS; NONE for missing, empty and uncompressed files.
+    """
+    try:
+        with open(filename, "rb") as file:
+            head = file.read(6)
+    except FileNotFoundError:
+        return NONE
+    if head.startswith(b"\x1f\x8b"):
+        return GZIP
+    if head.startswith(b"\xfd7zXZ\x00"):
+        return LZMA
+    # A zlib header: deflate with a window of up to 32 KiB, and a check value making it a multiple of 31
+    if len(head) >= 2 and head[0] == 0x78 and (head[0] * 256 + head[1]) % 31 == 0:
+        return ZLIB
+    return NONE
+
+
+def open_file(filename, mode="rt", codec=NONE, level=None):
+    """
+    Open a file for reading, writing or appending, in text or binary mode.
+    :param codec: The codec new data is written with. Reading ignores it and detects the file's codec,
+                  and appending to a non-empty file uses the codec the file already has.
+    :param level: The compression level, by default DEFAULT_LEVELS.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression {codec}, expected one of {', '.join(CODECS)}.")
+    reading = "r" in mode
+    if reading or ("a" in mode and os.path.exists(filename) and os.path.getsize(filename) > 0):
+        codec = detect(filename)
+    if codec == NONE:
+        return open(filename, mode)
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    binary_mode = mode.replace("t", "").replace("b", "") + "b"
+    if codec == GZIP:
+        file = gzip.open(filename, binary_mode) if reading else gzip.open(filename, binary_mode, compresslevel=level)
+    elif codec == LZMA:
+        file = lzma.open(filename, binary_mode) if reading else lzma.open(filename, binary_mode, preset=level)
+    elif reading:
+        file = io.BufferedReader(_ZlibReader(open(filename, "rb")), CHUNK)
+    else:
+        file = io.BufferedWriter(_ZlibWriter(open(filename, binary_mode), level), CHUNK)
+    return file if "b" in mode else io.TextIOWrapper(file)
+
+
+class _ZlibWriter(io.RawIOBase):
+    """Compresses everything written into one zlib stream, finished when the file is closed."""
+
+    def __init__(self, file, level):
+        self.__file = file
+        self.__compressor = zlib.compressobj(level)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.__file.write(self.__compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self.__file.write(self.__compressor.flush())
+            finally:
+                self.__file.close()
+                super().close()
+
+
+class _ZlibReader(io.RawIOBase):
+    """Decompresses one or more concatenated zlib streams, at most CHUNK compressed bytes at a time."""
+
+    def __init__(self, file):
+        self.__file = file
+        self.__decompressor = zlib.decompressobj()
+        self.__started = False  # whether the current stream has been fed any data
+        self.__input = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            if not self.__input:
+                self.__input = self.__file.read(CHUNK)
+                if not self.__input:
+                    if self.__started:
+                        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                    return 0
+            data = self.__decompressor.decompress(self.__input, len(buffer))
+            self.__started = True
+            self.__input = self.__decompressor.unconsumed_tail
+            if self.__decompressor.eof:
+                # The next stream, if any, starts right after this one
+                self.__input = self.__decompressor.unused_data
+                self.__decompressor = zlib.decompressobj()
+                self.__started = False
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.__file.close()
+            super().close()
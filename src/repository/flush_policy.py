@@ -0,0 +1,118 @@
+import contextlib
+import time
+
+from src.instrumentation.stats import STATS
+
+
+class FlushPolicy:
+    """
+    Decides when a file repository writes its pending changes to disk.
+    - immediate: after every operation (the original behaviour)
+    - operations: once `operations` operations are pending
+    - interval: on the first operation at least `interval` seconds after the previous flush
+    - exit: only on an explicit flush(), e.g. when the UI exits
+    """
+    IMMEDIATE = "immediate"
+    OPERATIONS = "operations"
+    INTERVAL = "interval"
+    EXIT = "exit"
+    MODES = (IMMEDIATE, OPERATIONS, INTERVAL, EXIT)
+
+    def __init__(self, mode=IMMEDIATE, operations=1, interval=0.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown flush mode {mode!r}, expected one of {', '.join(self.MODES)}.")
+        self.mode = mode
+        self.operations = max(1, operations)
+        self.interval = interval
+
+    def should_flush(self, pending_operations, seconds_since_flush):
+        if self.mode == self.IMMEDIATE:
+            return True
+        if self.mode == self.OPERATIONS:
+            return pending_operations >= self.operations
+        if self.mode == self.INTERVAL:
+            return seconds_since_flush >= self.interval
+        return False
+
+
+class FlushController:
+    """
+    Tracks the dirty state of one file repository and calls its save function when the policy says so.
+    """
+
+    def __init__(self, save_function, policy: FlushPolicy = None, name=None):
+        """
+        :param save_function: Writes the pending changes; it may return the number of bytes it wrote.
+        :param name: The name of the saves in the statistics, by default the save function's qualified name.
+        """
+        self.__save_function = save_function
+        self.name = name or getattr(save_function, "__qualname__", "save")
+        self.policy = policy or FlushPolicy()
+        self.dirty = False
+        self.pending_operations = 0
+        self.__last_flush = time.monotonic()
+        self.__deferring = 0  # depth of nested deferred() blocks
+
+    def changed(self):
+        """
+        Record one mutating operation and flush if the policy asks for it.
+        """
+        self.dirty = True
+        self.pending_operations += 1
+        if not self.__deferring:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """
+        Flush if there are pending changes and the policy asks for it.
+        """
+        if self.dirty and self.policy.should_flush(self.pending_operations, time.monotonic() - self.__last_flush):
+            self.flush()
+
+    @contextlib.contextmanager
+    def deferred(self, flush=True):
+        """
+        Hold back the flushes of a multi-step change, so that it is written at most once, when the block ends.
+        Blocks can be nested; only the outermost one flushes.
+        :param flush: If False, the block never flushes and the caller calls flush_if_due() itself later.
+        """
+        self.__deferring += 1
+        try:
+            yield self
+        finally:
+            self.__deferring -= 1
+            if not self.__deferring and flush:
+                self.flush_if_due()
+
+    def flush(self):
+        """
+        Write the pending changes, if there are any.
+        """
+        if self.dirty:
+            if STATS.enabled:
+                start = time.perf_counter()
+                bytes_written = self.__save_function()
+                STATS.record(self.name, time.perf_counter() - start, bytes_written)
+            else:
+                self.__save_function()
+        self.mark_clean()
+
+    def mark_clean(self):
+        self.dirty = False
+        self.pending_operations = 0
+        self.__last_flush = time.monotonic()
+
+
+@contextlib.contextmanager
+def deferred_flushes(*repositories, flush=True):
+    """
+    Defer the flushes of every given repository that has a FlushController until the block ends.
+    Repositories without one, like the in-memory ones, are skipped.
+    :param flush: Passed on to FlushController.deferred().
+    """
+    with contextlib.ExitStack() as stack:
+        for repo in repositories:
+            flusher = getattr(repo, "_flusher", None)
+            if flusher is not None:
+                stack.enter_context(flusher.deferred(flush))
+        yield
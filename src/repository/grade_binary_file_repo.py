@@ -1,34 +1,95 @@
-import pickle
 from src.domain.grade import Grade
+from src.instrumentation.stats import timed
+from src.repository.compression import NONE
+from src.repository.flush_policy import FlushController
 from src.repository.memory_grade import GradeRepository
+from src.repository.pickle_segments import DELETE, UPSERT, SegmentedPickleFile
 
 class GradeBinaryFileRepository(GradeRepository):
-    def __init__(self, filename):
+    def __init__(self, filename, flush_policy=None, compact_threshold=1000, compression=NONE):
+        """
+        :param filename: The grades file, a pickled snapshot followed by delta segments.
+        :param flush_policy: When pending changes are written, see FlushPolicy.
+        :param compact_threshold: Number of segment records after which a new snapshot is written.
+        :param compression: The codec the file is written with, see src.repository.compression.
+        """
         super().__init__()
-        self.__fileName = filename
+        self.__file = SegmentedPickleFile(filename, compact_threshold, compression)
+        self.__pending_records = []
+        self._flusher = FlushController(self.__write_changes, flush_policy)
         self.__load_file()
 
+    @timed()
     def __load_file(self):
-        """Load grades from a binary file."""
-        try:
-            with open(self.__fileName, "rb") as file:
-                self.grades = pickle.load(file)
-        except (FileNotFoundError, EOFError):
-            self.grades = []
-
-    def __save_file(self):
-        """Save all grades to a binary file."""
-        with open(self.__fileName, "wb") as file:
-            pickle.dump(self.grades, file)
+        """Load grades from the snapshot and replay the segments appended after it."""
+        snapshot, records = self.__file.load()
+        self.grades = {} if snapshot is None else snapshot
+        if isinstance(self.grades, list):
+            # Older files hold a list of Grade objects instead of the {(assignment_id, student_id): value} dict.
+            # Those were built as Grade(student_id, assignment_id, value), so .id is the student and .student the assignment
+            self.grades = {(grade.student, grade.id): grade.value for grade in self.grades}
+        # Replayed on the plain dict, so the indexes are built once afterwards
+        for record in records:
+            if record[0] == UPSERT:
+                self.grades[(record[1], record[2])] = record[3]
+            else:
+                self.grades.pop((record[1], record[2]), None)
+        self._rebuild_indexes()
+        if self.__file.compaction_due:
+            self.compact()
+
+    def __write_changes(self):
+        """Append the pending records as one segment, or write a new snapshot once compaction is due."""
+        records, self.__pending_records = self.__pending_records, []
+        return self.__file.save(records, self.grades)
+
+    def __persist(self, records):
+        self.__pending_records.extend(records)
+        self._flusher.changed()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Write pending changes to the binary file."""
+        self._flusher.flush()
+
+    def compact(self):
+        """Rewrite the file as a single snapshot of the current grades."""
+        self.__pending_records = []
+        self.__file.write_snapshot(self.grades)
+        self._flusher.mark_clean()
 
     def add_grade(self, student_id, assignment_id, grade_value):
         super().add_grade(student_id, assignment_id, grade_value)
-        self.__save_file()
+        self.__persist([(UPSERT, assignment_id, student_id, grade_value)])
+
+    def add_grades_bulk(self, entries):
+        entries = super().add_grades_bulk(entries)
+        self.__persist([(UPSERT, assignment_id, student_id, grade_value)
+                        for student_id, assignment_id, grade_value in entries])
+        return entries
+
+    def update_grade(self, student_id, assignment_id, grade_value):
+        super().update_grade(student_id, assignment_id, grade_value)
+        self.__persist([(UPSERT, assignment_id, student_id, grade_value)])
+
+    def delete(self, student_id, assignment_id):
+        super().delete(student_id, assignment_id)
+        self.__persist([(DELETE, assignment_id, student_id)])
+
+    def remove_grades_bulk(self, keys):
+        removed = super().remove_grades_bulk(keys)
+        self.__persist([(DELETE, assignment_id, student_id) for student_id, assignment_id in removed])
+        return removed
 
     def remove_grades_for_student(self, student_id):
+        records = [(DELETE, assignment_id, student_id) for assignment_id in self.student_assignments.get(student_id, ())]
         super().remove_grades_for_student(student_id)
-        self.__save_file()
+        self.__persist(records)
 
     def remove_grades_for_assignment(self, assignment_id):
+        records = [(DELETE, assignment_id, student_id) for student_id in self.assignment_students.get(assignment_id, ())]
         super().remove_grades_for_assignment(assignment_id)
-        self.__save_file()
+        self.__persist(records)
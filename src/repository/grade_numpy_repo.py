@@ -0,0 +1,262 @@
+import numbers
+
+import numpy as np
+
+from src.domain.grade import Grade
+from src.repository.memory_grade import GradeRepository
+
+
+class GradeNumpyRepository(GradeRepository):
+    """
+    GradeRepository that stores grades column-wise in parallel NumPy arrays: assignment ids, student ids and
+    values, where NaN marks an ungraded row. A {(assignment_id, student_id): row} map gives O(1) point lookups
+    and per-student and per-assignment row indexes keep the lookups by one student or assignment O(k) in its rows,
+    like the indexes of GradeRepository; averages and rankings over all rows run as vectorized array operations.
+    Removed rows are only masked out; the arrays are compacted once more than half of the rows are dead.
+    """
+    INITIAL_CAPACITY = 1024
+    ITER_CHUNK = 4096
+
+    def __init__(self):
+        # The dictionaries of GradeRepository are replaced by the columns, so its __init__ is not called
+        self._rows = {}  # {(assignment_id, student_id): row}
+        # Row indexes in row order, rebuilt on compaction
+        self._student_rows = {}  # {student_id: {assignment_id: row, ...}}
+        self._assignment_rows = {}  # {assignment_id: {student_id: row, ...}}
+        self._size = 0  # rows in use, dead ones included
+        self._dead = 0
+        self._assignment_ids = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._student_ids = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self._values = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._live = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        self.version = 0
+
+    @property
+    def grades(self):
+        """
+        A {(assignment_id, student_id): grade_value} snapshot, for callers written against GradeRepository.
+        """
+        return {key: self.__to_value(self._values[row]) for key, row in self._rows.items()}
+
+    @staticmethod
+    def __to_value(value):
+        return None if np.isnan(value) else float(value)
+
+    @staticmethod
+    def __to_values(values):
+        return [None if value != value else value for value in values.tolist()]  # NaN != NaN
+
+    def __resize(self, capacity):
+        for name in ("_assignment_ids", "_student_ids", "_values", "_live"):
+            column = getattr(self, name)
+            resized = np.zeros(capacity, dtype=column.dtype)
+            resized[:self._size] = column[:self._size]
+            setattr(self, name, resized)
+
+    def __compact(self):
+        """
+        Move the live rows to the front, keeping their order, and rebuild the row map and indexes.
+        """
+        live_rows = np.flatnonzero(self._live[:self._size])
+        count = len(live_rows)
+        for name in ("_assignment_ids", "_student_ids", "_values"):
+            column = getattr(self, name)
+            column[:count] = column[live_rows]
+        self._live[:count] = True
+        self._live[count:self._size] = False
+        self._size = count
+        self._dead = 0
+        self._rows = dict(zip(zip(self._assignment_ids[:count].tolist(), self._student_ids[:count].tolist()),
+                              range(count)))
+        self._student_rows = {}
+        self._assignment_rows = {}
+        for (assignment_id, student_id), row in self._rows.items():
+            self._student_rows.setdefault(student_id, {})[assignment_id] = row
+            self._assignment_rows.setdefault(assignment_id, {})[student_id] = row
+
+    def __put(self, student_id, assignment_id, grade_value):
+        value = np.nan if grade_value is None else grade_value
+        row = self._rows.get((assignment_id, student_id))
+        if row is not None:
+            self._values[row] = value
+            return
+        if self._size == len(self._live):
+            # Amortized doubling, so appending stays O(1) on average
+            self.__resize(2 * len(self._live))
+        row = self._size
+        self._assignment_ids[row] = assignment_id
+        self._student_ids[row] = student_id
+        self._values[row] = value
+        self._live[row] = True
+        self._rows[(assignment_id, student_id)] = row
+        self._student_rows.setdefault(student_id, {})[assignment_id] = row
+        self._assignment_rows.setdefault(assignment_id, {})[student_id] = row
+        self._size += 1
+
+    def __drop_rows(self, rows):
+        for row in rows.tolist():
+            assignment_id, student_id = int(self._assignment_ids[row]), int(self._student_ids[row])
+            del self._rows[(assignment_id, student_id)]
+            self.__unindex(self._student_rows, student_id, assignment_id)
+            self.__unindex(self._assignment_rows, assignment_id, student_id)
+        self._live[rows] = False
+        self._dead += len(rows)
+        if self._dead > self.INITIAL_CAPACITY and 2 * self._dead > self._size:
+            self.__compact()
+
+    @staticmethod
+    def __unindex(index, key, inner_key):
+        rows = index[key]
+        del rows[inner_key]
+        if not rows:
+            del index[key]
+
+    @staticmethod
+    def __indexed_rows(index, keys):
+        """
+        :return: The rows of all the given keys in the index, in row order.
+        """
+        rows = [row for key in keys for row in index.get(key, {}).values()]
+        return np.sort(np.array(rows, dtype=np.int64))
+
+    def __rows_for_student(self, student_id):
+        return np.fromiter(self._student_rows.get(student_id, {}).values(), dtype=np.int64)
+
+    def __rows_for_assignment(self, assignment_id):
+        return np.fromiter(self._assignment_rows.get(assignment_id, {}).values(), dtype=np.int64)
+
+    def add_grade(self, student_id, assignment_id, grade_value):
+        self.__put(student_id, assignment_id, grade_value)
+        self.version += 1
+
+    def add_grades_bulk(self, entries):
+        entries = list(entries)
+        for student_id, assignment_id, grade_value in entries:
+            if grade_value is not None and not isinstance(grade_value, numbers.Real):
+                raise ValueError(f"Invalid grade {grade_value!r} for student {student_id} on assignment {assignment_id}.")
+        for student_id, assignment_id, grade_value in entries:
+            self.__put(student_id, assignment_id, grade_value)
+        self.version += 1
+        return entries
+
+    def remove_grades_bulk(self, keys):
+        removed = [(student_id, assignment_id) for student_id, assignment_id in keys
+                   if (assignment_id, student_id) in self._rows]
+        self.__drop_rows(np.array([self._rows[(assignment_id, student_id)] for student_id, assignment_id in removed],
+                                  dtype=np.int64))
+        self.version += 1
+        return removed
+
+    def update_grade(self, student_id, assignment_id, grade_value):
+        if (assignment_id, student_id) not in self._rows:
+            raise ValueError(f"No grade exists for student {student_id} on assignment {assignment_id}.")
+        self.__put(student_id, assignment_id, grade_value)
+        self.version += 1
+
+    def get_grades_for_student(self, student_id):
+        rows = self.__rows_for_student(student_id)
+        return list(zip(self._assignment_ids[rows].tolist(), self.__to_values(self._values[rows])))
+
+    def get_grades_for_students(self, student_ids):
+        rows = self.__indexed_rows(self._student_rows, set(student_ids))
+        return list(zip(self._student_ids[rows].tolist(), self._assignment_ids[rows].tolist(),
+                        self.__to_values(self._values[rows])))
+
+    def get_grades_for_assignment(self, assignment_id):
+        rows = self.__rows_for_assignment(assignment_id)
+        return list(zip(self._student_ids[rows].tolist(), self.__to_values(self._values[rows])))
+
+    def get_grades_for_assignment_by_grade(self, assignment_id):
+        rows = self.__rows_for_assignment(assignment_id)
+        # A stable sort on the negated grades keeps equal grades in insertion order, like sorted(reverse=True)
+        rows = rows[np.argsort(-np.nan_to_num(self._values[rows], nan=0.0), kind="stable")]
+        return list(zip(self._student_ids[rows].tolist(), self.__to_values(self._values[rows])))
+
+    def get_assignments_for_student(self, student_id):
+        return list(self._student_rows.get(student_id, ()))
+
+    def get_students_for_assignment(self, assignment_id):
+        return list(self._assignment_rows.get(assignment_id, ()))
+
+    def get_ungraded_assignments(self, student_id):
+        rows = self.__rows_for_student(student_id)
+        return self._assignment_ids[rows[np.isnan(self._values[rows])]].tolist()
+
+    def get_ungraded_students_for_assignments(self, assignment_ids):
+        rows = self.__indexed_rows(self._assignment_rows, set(assignment_ids))
+        return set(self._student_ids[rows[np.isnan(self._values[rows])]].tolist())
+
+    def has_grade(self, student_id, assignment_id):
+        return (assignment_id, student_id) in self._rows
+
+    def find_by_student_and_assignment(self, student_id, assignment_id):
+        return self.get_grade_for_assig(student_id, assignment_id)
+
+    def delete(self, student_id, assignment_id):
+        if (assignment_id, student_id) not in self._rows:
+            raise ValueError(f"Grade for student {student_id} and assignment {assignment_id} not found.")
+        self.__drop_rows(np.array([self._rows[(assignment_id, student_id)]], dtype=np.int64))
+        self.version += 1
+
+    def remove_grades_for_assignment(self, assignment_id):
+        self.__drop_rows(self.__rows_for_assignment(assignment_id))
+        self.version += 1
+
+    def remove_grades_for_student(self, student_id):
+        self.__drop_rows(self.__rows_for_student(student_id))
+        self.version += 1
+
+    def get_grade_for_assig(self, student_id, assignment_id):
+        row = self._rows.get((assignment_id, student_id))
+        return None if row is None else self.__to_value(self._values[row])
+
+    def iter_grades(self):
+        """
+        Yield all grades as Grade objects. The columns are converted ITER_CHUNK rows at a time,
+        so a full scan never holds more than one chunk of Python values.
+        """
+        for start in range(0, self._size, self.ITER_CHUNK):
+            rows = start + np.flatnonzero(self._live[start:min(start + self.ITER_CHUNK, self._size)])
+            yield from (Grade(assignment_id, student_id, grade_value) for assignment_id, student_id, grade_value in
+                        zip(self._assignment_ids[rows].tolist(), self._student_ids[rows].tolist(),
+                            self.__to_values(self._values[rows])))
+
+    def __student_averages(self, include_ungraded, rows=None):
+        """
+        Compute the averages of every student appearing in the given rows (all live rows by default).
+        :return: Two arrays: the student IDs and their averages, for students with a non-zero denominator.
+        """
+        if rows is None:
+            rows = np.flatnonzero(self._live[:self._size])
+        student_ids, inverse = np.unique(self._student_ids[rows], return_inverse=True)
+        values = self._values[rows]
+        graded = ~np.isnan(values)
+        sums = np.bincount(inverse, weights=np.where(graded, values, 0.0), minlength=len(student_ids))
+        if include_ungraded:
+            counts = np.bincount(inverse, minlength=len(student_ids)).astype(np.float64)
+        else:
+            counts = np.bincount(inverse, weights=graded, minlength=len(student_ids))
+        counted = counts > 0
+        return student_ids[counted], sums[counted] / counts[counted]
+
+    def get_average_for_student(self, student_id, include_ungraded=False):
+        _, averages = self.__student_averages(include_ungraded, self.__rows_for_student(student_id))
+        return float(averages[0]) if len(averages) else None
+
+    def average_grades(self, include_ungraded=False):
+        student_ids, averages = self.__student_averages(include_ungraded)
+        return dict(zip(student_ids.tolist(), averages.tolist()))
+
+    def top_k(self, n, include_ungraded=False):
+        student_ids, averages = self.__student_averages(include_ungraded)
+        if n <= 0 or not len(averages):
+            return []
+        if n < len(averages):
+            # Select the n-th best average in O(students), then sort only the averages at or above it
+            threshold = np.partition(averages, len(averages) - n)[len(averages) - n]
+            candidates = np.flatnonzero(averages >= threshold)
+        else:
+            candidates = np.arange(len(averages))
+        # Best average first, ties broken by the smaller student ID like the other repositories
+        best = candidates[np.lexsort((student_ids[candidates], -averages[candidates]))][:n]
+        return list(zip(student_ids[best].tolist(), averages[best].tolist()))
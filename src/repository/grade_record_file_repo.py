@@ -0,0 +1,194 @@
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+
+from src.instrumentation.stats import timed
+from src.repository.flush_policy import FlushController
+from src.repository.memory_grade import GradeRepository
+
+MAGIC = b"GRADREC1"
+# One record per grade: assignment_id, student_id, value, flag. Little-endian without padding, 25 bytes.
+RECORD = struct.Struct("<qqdB")
+FREE = 0
+GRADED = 1
+UNGRADED = 2  # the value field is unused
+
+
+def read_records(filename, chunk_records=65536):
+    """
+    Scan a grade record file `chunk_records` records at a time, without mapping it or building a slot map.
+    :return: A generator of (assignment_id, student_id, grade_value) tuples in slot order.
+    """
+    with open(filename, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filename} is not a grade record file.")
+        while True:
+            chunk = file.read(chunk_records * RECORD.size)
+            chunk = chunk[:len(chunk) - len(chunk) % RECORD.size]
+            if not chunk:
+                break
+            for assignment_id, student_id, value, flag in RECORD.iter_unpack(chunk):
+                if flag != FREE:
+                    yield assignment_id, student_id, None if flag == UNGRADED else value
+
+
+class GradeRecordFile(MutableMapping):
+    """
+    A {(assignment_id, student_id): grade_value} mapping stored as fixed-width records in a memory-mapped file.
+    Only the key -> slot map is kept in memory: reading or writing a grade touches its own record in place,
+    and the slots of deleted grades are reused through a free list. The file grows by doubling its capacity.
+    """
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, filename):
+        self.__file = open(filename, "r+b" if os.path.exists(filename) else "w+b")
+        if os.fstat(self.__file.fileno()).st_size == 0:
+            self.__file.write(MAGIC)
+            self.__file.truncate(len(MAGIC) + self.INITIAL_CAPACITY * RECORD.size)
+        self.__map = mmap.mmap(self.__file.fileno(), 0)
+        if self.__map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a grade record file.")
+        self.__capacity = (len(self.__map) - len(MAGIC)) // RECORD.size
+        self.__slots = {}  # {(assignment_id, student_id): slot}
+        self.__free = []  # free slots below __end, reused before the file grows
+        self.__end = 0  # one past the last slot ever used
+        self.__scan()
+
+    @staticmethod
+    def __offset(slot):
+        return len(MAGIC) + slot * RECORD.size
+
+    def __scan(self):
+        """
+        Build the key -> slot map and the free list with one pass over the records.
+        """
+        free = []
+        records = memoryview(self.__map)[len(MAGIC):self.__offset(self.__capacity)]
+        try:
+            for slot, (assignment_id, student_id, _, flag) in enumerate(RECORD.iter_unpack(records)):
+                if flag == FREE:
+                    free.append(slot)
+                else:
+                    self.__slots[(assignment_id, student_id)] = slot
+                    self.__end = slot + 1
+        finally:
+            records.release()
+        # Reversed, so that pop() hands out the lowest free slot first
+        self.__free = [slot for slot in reversed(free) if slot < self.__end]
+
+    def __grow(self):
+        self.__map.close()
+        self.__capacity *= 2
+        self.__file.truncate(self.__offset(self.__capacity))
+        self.__map = mmap.mmap(self.__file.fileno(), 0)
+
+    def __allocate(self):
+        if self.__free:
+            return self.__free.pop()
+        if self.__end == self.__capacity:
+            self.__grow()
+        self.__end += 1
+        return self.__end - 1
+
+    def __getitem__(self, key):
+        _, _, value, flag = RECORD.unpack_from(self.__map, self.__offset(self.__slots[key]))
+        return None if flag == UNGRADED else value
+
+    def __setitem__(self, key, grade_value):
+        slot = self.__slots.get(key)
+        if slot is None:
+            slot = self.__allocate()
+            self.__slots[key] = slot
+        if grade_value is None:
+            RECORD.pack_into(self.__map, self.__offset(slot), key[0], key[1], 0.0, UNGRADED)
+        else:
+            RECORD.pack_into(self.__map, self.__offset(slot), key[0], key[1], grade_value, GRADED)
+
+    def __delitem__(self, key):
+        slot = self.__slots.pop(key)
+        RECORD.pack_into(self.__map, self.__offset(slot), 0, 0, 0.0, FREE)
+        self.__free.append(slot)
+
+    def __contains__(self, key):
+        return key in self.__slots
+
+    def __iter__(self):
+        return iter(self.__slots)
+
+    def __len__(self):
+        return len(self.__slots)
+
+    def flush(self):
+        """Write the modified pages of the mapping back to the file."""
+        self.__map.flush()
+
+    def close(self):
+        if not self.__map.closed:
+            self.__map.flush()
+            self.__map.close()
+        self.__file.close()
+
+
+class GradeRecordFileRepository(GradeRepository):
+    """
+    GradeRepository backed by a GradeRecordFile instead of a pickled dict.
+    Opening the file only scans the fixed-width records, and a changed grade rewrites one record,
+    so saving no longer re-serializes every grade. The flush policy decides when the mapping is synced to disk.
+    """
+
+    def __init__(self, filename, flush_policy=None):
+        super().__init__()
+        self.__load_file(filename)
+        self._flusher = FlushController(self.grades.flush, flush_policy)
+
+    @timed()
+    def __load_file(self, filename):
+        """Open the record file and rebuild the in-memory indexes from it."""
+        self.grades = GradeRecordFile(filename)
+        # The secondary indexes and running aggregates still live in memory
+        self._rebuild_indexes()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Sync pending changes to the record file."""
+        self._flusher.flush()
+
+    def close(self):
+        """Flush and release the memory-mapped file."""
+        self.flush()
+        self.grades.close()
+
+    def add_grade(self, student_id, assignment_id, grade_value):
+        super().add_grade(student_id, assignment_id, grade_value)
+        self._flusher.changed()
+
+    def add_grades_bulk(self, entries):
+        entries = super().add_grades_bulk(entries)
+        self._flusher.changed()
+        return entries
+
+    def update_grade(self, student_id, assignment_id, grade_value):
+        super().update_grade(student_id, assignment_id, grade_value)
+        self._flusher.changed()
+
+    def delete(self, student_id, assignment_id):
+        super().delete(student_id, assignment_id)
+        self._flusher.changed()
+
+    def remove_grades_bulk(self, keys):
+        removed = super().remove_grades_bulk(keys)
+        self._flusher.changed()
+        return removed
+
+    def remove_grades_for_student(self, student_id):
+        super().remove_grades_for_student(student_id)
+        self._flusher.changed()
+
+    def remove_grades_for_assignment(self, assignment_id):
+        super().remove_grades_for_assignment(assignment_id)
+        self._flusher.changed()
@@ -0,0 +1,229 @@
+from src.domain.grade import Grade
+from src.domain.student import Student
+from src.repository.flush_policy import FlushController
+from src.repository.memory_grade import GradeRepository
+from src.repository.sqlite_database import chunks
+
+UPSERT_GRADE = """
+INSERT INTO grades (assignment_id, student_id, value) VALUES (?, ?, ?)
+ON CONFLICT (assignment_id, student_id) DO UPDATE SET value = excluded.value
+"""
+
+
+class GradeSqliteRepository(GradeRepository):
+    """
+    GradeRepository stored in the "grades" table of a SQLite database.
+    The per-student and per-assignment lookups use the primary key and the index on student_id, and the
+    averages and rankings run as SQL aggregates instead of Python loops. The reports that list students
+    (ranked_students, assignment_students_by_grade and ungraded_students) join the grades with the students
+    table of the same database in one query, instead of looking every student up separately.
+    """
+
+    def __init__(self, connection, flush_policy=None):
+        # The in-memory dictionaries of GradeRepository are not used, so its __init__ is not called
+        self._connection = connection
+        self._flusher = FlushController(self._connection.commit, flush_policy, f"{type(self).__name__}.commit")
+        self.version = 0
+
+    def __changed(self):
+        self.version += 1
+        self._flusher.changed()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Commit pending changes to the database."""
+        self._flusher.flush()
+
+    def add_grade(self, student_id, assignment_id, grade_value):
+        self._connection.execute(UPSERT_GRADE, (assignment_id, student_id, grade_value))
+        self.__changed()
+
+    def add_grades_bulk(self, entries):
+        """
+        Add or replace a batch of grades in one statement.
+        :param entries: An iterable of (student_id, assignment_id, grade_value) tuples.
+        :return: The list of entries that was applied.
+        """
+        entries = list(entries)
+        self._connection.executemany(UPSERT_GRADE, [(assignment_id, student_id, grade_value)
+                                                    for student_id, assignment_id, grade_value in entries])
+        self.__changed()
+        return entries
+
+    def remove_grades_bulk(self, keys):
+        """
+        Remove a batch of grades. Keys without a grade are ignored.
+        :return: The list of keys that was actually removed.
+        """
+        removed = [(student_id, assignment_id) for student_id, assignment_id in keys
+                   if self.has_grade(student_id, assignment_id)]
+        self._connection.executemany("DELETE FROM grades WHERE assignment_id = ? AND student_id = ?",
+                                     [(assignment_id, student_id) for student_id, assignment_id in removed])
+        self.__changed()
+        return removed
+
+    def update_grade(self, student_id, assignment_id, grade_value):
+        cursor = self._connection.execute("UPDATE grades SET value = ? WHERE assignment_id = ? AND student_id = ?",
+                                          (grade_value, assignment_id, student_id))
+        if cursor.rowcount == 0:
+            raise ValueError(f"No grade exists for student {student_id} on assignment {assignment_id}.")
+        self.__changed()
+
+    def get_grades_for_student(self, student_id):
+        """
+        Retrieve assignments and grades for a student.
+        :return: A list of tuples, where each tuple contains (assignment_id, grade_value).
+        """
+        return self._connection.execute(
+            "SELECT assignment_id, value FROM grades WHERE student_id = ? ORDER BY rowid", (student_id,)).fetchall()
+
+    def get_grades_for_students(self, student_ids):
+        """
+        Retrieve the grades of several students at once.
+        :return: A list of (student_id, assignment_id, grade_value) tuples, as taken by add_grades_bulk.
+        """
+        entries = []
+        for chunk in chunks(student_ids):
+            entries.extend(self._connection.execute(
+                f"SELECT student_id, assignment_id, value FROM grades "
+                f"WHERE student_id IN ({','.join('?' * len(chunk))}) ORDER BY rowid", chunk))
+        return entries
+
+    def get_grades_for_assignment(self, assignment_id):
+        """
+        Retrieve students and grades for an assignment.
+        :return: A list of tuples, where each tuple contains (student_id, grade_value).
+        """
+        return self._connection.execute(
+            "SELECT student_id, value FROM grades WHERE assignment_id = ? ORDER BY rowid", (assignment_id,)).fetchall()
+
+    def get_grades_for_assignment_by_grade(self, assignment_id):
+        return self._connection.execute(
+            "SELECT student_id, value FROM grades WHERE assignment_id = ? ORDER BY COALESCE(value, 0) DESC, rowid",
+            (assignment_id,)).fetchall()
+
+    def get_ungraded_assignments(self, student_id):
+        rows = self._connection.execute(
+            "SELECT assignment_id FROM grades WHERE student_id = ? AND value IS NULL ORDER BY rowid", (student_id,))
+        return [row[0] for row in rows]
+
+    def get_assignments_for_student(self, student_id):
+        return [assignment_id for assignment_id, _ in self.get_grades_for_student(student_id)]
+
+    def get_students_for_assignment(self, assignment_id):
+        return [student_id for student_id, _ in self.get_grades_for_assignment(assignment_id)]
+
+    def get_ungraded_students_for_assignments(self, assignment_ids):
+        ungraded_students = set()
+        for chunk in chunks(assignment_ids):
+            rows = self._connection.execute(
+                f"SELECT DISTINCT student_id FROM grades "
+                f"WHERE value IS NULL AND assignment_id IN ({','.join('?' * len(chunk))})", chunk)
+            ungraded_students.update(row[0] for row in rows)
+        return ungraded_students
+
+    def has_grade(self, student_id, assignment_id):
+        return self._connection.execute("SELECT 1 FROM grades WHERE assignment_id = ? AND student_id = ?",
+                                        (assignment_id, student_id)).fetchone() is not None
+
+    def find_by_student_and_assignment(self, student_id, assignment_id):
+        return self.get_grade_for_assig(student_id, assignment_id)
+
+    def delete(self, student_id, assignment_id):
+        cursor = self._connection.execute("DELETE FROM grades WHERE assignment_id = ? AND student_id = ?",
+                                          (assignment_id, student_id))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Grade for student {student_id} and assignment {assignment_id} not found.")
+        self.__changed()
+
+    def remove_grades_for_assignment(self, assignment_id):
+        self._connection.execute("DELETE FROM grades WHERE assignment_id = ?", (assignment_id,))
+        self.__changed()
+
+    def remove_grades_for_student(self, student_id):
+        self._connection.execute("DELETE FROM grades WHERE student_id = ?", (student_id,))
+        self.__changed()
+
+    def get_grade_for_assig(self, student_id, assignment_id):
+        row = self._connection.execute("SELECT value FROM grades WHERE assignment_id = ? AND student_id = ?",
+                                       (assignment_id, student_id)).fetchone()
+        return None if row is None else row[0]
+
+    def iter_grades(self):
+        """
+        Yield all grades as Grade objects, fetching rows from the cursor as they are consumed.
+        """
+        for assignment_id, student_id, grade_value in self._connection.execute(
+                "SELECT assignment_id, student_id, value FROM grades ORDER BY rowid"):
+            yield Grade(assignment_id, student_id, grade_value)
+
+    @staticmethod
+    def __average_expression(include_ungraded):
+        # TOTAL() is always a float; COUNT(value) skips ungraded rows, COUNT(*) counts them as 0
+        return "TOTAL(value) / COUNT(*)" if include_ungraded else "TOTAL(value) / COUNT(value)"
+
+    def get_average_for_student(self, student_id, include_ungraded=False):
+        row = self._connection.execute(
+            f"SELECT {self.__average_expression(include_ungraded)} FROM grades "
+            f"WHERE student_id = ? HAVING COUNT({'*' if include_ungraded else 'value'}) > 0", (student_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def average_grades(self, include_ungraded=False):
+        rows = self._connection.execute(
+            f"SELECT student_id, {self.__average_expression(include_ungraded)} FROM grades "
+            f"GROUP BY student_id HAVING COUNT({'*' if include_ungraded else 'value'}) > 0")
+        return dict(rows.fetchall())
+
+    def top_k(self, n, include_ungraded=False):
+        rows = self._connection.execute(
+            f"SELECT student_id, {self.__average_expression(include_ungraded)} AS average FROM grades "
+            f"GROUP BY student_id HAVING COUNT({'*' if include_ungraded else 'value'}) > 0 "
+            f"ORDER BY average DESC, student_id LIMIT ?", (n,))
+        return rows.fetchall()
+
+    # --- reports joined with the students table ---
+    # Each takes the StudentSqliteRepository on the same connection, whose table is joined, so that a
+    # ThreadSafeRepository wrapping both locks the students as well as the grades while the query runs.
+
+    def ranked_students(self, student_repo, include_ungraded=False):
+        """
+        Rank every student by average grade: best first, ties by ascending ID, and the students without a grade
+        counted in the average last, with an average of 0.
+        :return: A list of (student, average) tuples.
+        """
+        rows = self._connection.execute(
+            f"SELECT students.id, students.name, students.student_group, averages.average FROM students "
+            f"LEFT JOIN (SELECT student_id, {self.__average_expression(include_ungraded)} AS average FROM grades "
+            f"GROUP BY student_id HAVING COUNT({'*' if include_ungraded else 'value'}) > 0) AS averages "
+            f"ON averages.student_id = students.id "
+            f"ORDER BY averages.average IS NULL, averages.average DESC, students.id")
+        return [(Student(name, student_id, group), 0.0 if average is None else average)
+                for student_id, name, group, average in rows]
+
+    def assignment_students_by_grade(self, student_repo, assignment_id):
+        """
+        Retrieve the students given an assignment, ordered descending by grade, ungraded ones as if graded 0.
+        :return: A list of (student, grade_value) tuples, with 0 for the ungraded rows.
+        """
+        rows = self._connection.execute(
+            "SELECT students.id, students.name, students.student_group, grades.value FROM grades "
+            "JOIN students ON students.id = grades.student_id WHERE grades.assignment_id = ? "
+            "ORDER BY COALESCE(grades.value, 0) DESC, grades.rowid", (assignment_id,))
+        return [(Student(name, student_id, group), 0 if grade_value is None else grade_value)
+                for student_id, name, group, grade_value in rows]
+
+    def ungraded_students(self, student_repo, assignment_ids):
+        """
+        :return: The students with an ungraded row among the given assignments, ordered by ID.
+        """
+        students = {}
+        for chunk in chunks(assignment_ids):
+            rows = self._connection.execute(
+                f"SELECT id, name, student_group FROM students WHERE id IN "
+                f"(SELECT student_id FROM grades WHERE value IS NULL "
+                f"AND assignment_id IN ({','.join('?' * len(chunk))}))", chunk)
+            students.update((student_id, Student(name, student_id, group)) for student_id, name, group in rows)
+        return [students[student_id] for student_id in sorted(students)]
@@ -1,65 +1,228 @@
+import os
+
 from src.domain.grade import Grade
+from src.instrumentation.stats import timed
+from src.repository.compression import NONE, open_file
+from src.repository.flush_policy import FlushController
 from src.repository.memory_grade import GradeRepository
 
 
+def read_grades(filename):
+    """
+    Parse a grades text file line by line, yielding (assignment_id, student_id, grade_value) tuples.
+    A missing file yields nothing.
+    """
+    try:
+        with open_file(filename, "rt") as file:
+            for line in file:
+                parts = line.strip().split(",")
+                grade_value = None if parts[2] == "None" else float(parts[2])
+                yield int(parts[0]), int(parts[1]), grade_value
+    except FileNotFoundError:
+        # A file that doesn't exist yet holds no grades
+        pass
+
+
+def format_grade(assignment_id, student_id, grade_value):
+    """Return the line of a grade in the text file."""
+    grade_value_str = "None" if grade_value is None else str(grade_value)
+    return f"{assignment_id},{student_id},{grade_value_str}\n"
+
+
 class GradeTextFileRepository(GradeRepository):
-    def __init__(self, filename):
+    # Journal record tags: upsert one grade, delete one grade,
+    # remove every grade of an assignment, remove every grade of a student
+    UPSERT = "+"
+    DELETE = "-"
+    DELETE_ASSIGNMENT = "-a"
+    DELETE_STUDENT = "-s"
+
+    def __init__(self, filename, journal=False, compact_threshold=1000, flush_policy=None, compression=NONE):
+        """
+        :param filename: The base grades file.
+        :param journal: If True, mutations are appended to "<filename>.journal" instead of
+                        rewriting the base file every time. A journal left by an earlier run is replayed
+                        either way, and folded into the base file when journaling is off.
+        :param compact_threshold: Number of journal records after which the journal is folded
+                                  back into the base file.
+        :param flush_policy: When pending changes are written, see FlushPolicy.
+        :param compression: The codec the base file is written with, see src.repository.compression.
+                            The journal, which only ever grows by a few lines, is not compressed.
+        """
         super().__init__()
         self.__filename = filename
+        self.__compression = compression
+        self.__journal = journal
+        self.__journal_filename = filename + ".journal"
+        self.__compact_threshold = compact_threshold
+        self.__journal_records = 0
+        self.__pending_records = []
+        self._flusher = FlushController(self.__write_changes, flush_policy)
         self.__load_file()
+        if self.__journal or os.path.exists(self.__journal_filename):
+            self.__replay_journal()
 
+    @timed()
     def __load_file(self):
         """
         Load grades from a text file into the repository.
         """
-        try:
-            with open(self.__filename, "rt") as file:
-                for line in file:
-                    parts = line.strip().split(",")
-                    assignment_id = int(parts[0])
-                    student_id = int(parts[1])
-                    grade_value = None if parts[2] == "None" else float(parts[2])
-                    self.grades[(assignment_id, student_id)] = grade_value
-        except FileNotFoundError:
-            # If the file doesn't exist, start with an empty repository
-            self.grades = {}
+        for assignment_id, student_id, grade_value in read_grades(self.__filename):
+            self.grades[(assignment_id, student_id)] = grade_value
+        self._rebuild_indexes()
 
     def __save_file(self):
         """
-        Save all grades from the repository to a text file.
+        Save all grades from the repository to a text file. The grades are written to a temporary file,
+        synced to disk and then moved over the base file, so a crash or a full disk leaves the old file intact.
+        :return: The number of bytes written.
         """
-        with open(self.__filename, "wt") as file:
+        temporary = self.__filename + ".tmp"
+        with open_file(temporary, "wt", self.__compression) as file:
             for (assignment_id, student_id), grade_value in self.grades.items():
-                grade_value_str = "None" if grade_value is None else str(grade_value)
-                file.write(f"{assignment_id},{student_id},{grade_value_str}\n")
+                file.write(format_grade(assignment_id, student_id, grade_value))
+        # Synced through a descriptor of its own, as compressed files do not expose the one they write through
+        descriptor = os.open(temporary, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+        bytes_written = os.path.getsize(temporary)
+        os.replace(temporary, self.__filename)
+        return bytes_written
+
+    @timed()
+    def __replay_journal(self):
+        """
+        Apply the journal records on top of the grades loaded from the base file.
+        Every record is idempotent, so a journal that survived a compaction is replayed safely.
+        A record cut short by a crash during an append is dropped and truncated away,
+        so the next append starts on a line of its own.
+        """
+        records, end = read_journal(self.__journal_filename)
+        if os.path.exists(self.__journal_filename) and os.path.getsize(self.__journal_filename) > end:
+            os.truncate(self.__journal_filename, end)
+        for record in records:
+            if record[0] == self.UPSERT:
+                super().add_grade(record[2], record[1], record[3])
+            elif record[0] == self.DELETE:
+                if (record[1], record[2]) in self.grades:
+                    super().delete(record[2], record[1])
+            elif record[0] == self.DELETE_ASSIGNMENT:
+                super().remove_grades_for_assignment(record[1])
+            elif record[0] == self.DELETE_STUDENT:
+                super().remove_grades_for_student(record[1])
+            self.__journal_records += 1
+
+        # Without journaling, nothing would replay the journal on the next load, so it is folded in right away
+        if not self.__journal or self.__journal_records >= self.__compact_threshold:
+            self.compact()
+
+    def __append_records(self, records):
+        """
+        Append mutation records to the journal, compacting it once it grows past the threshold.
+        :return: The number of bytes appended.
+        """
+        with open(self.__journal_filename, "at") as file:
+            start = file.tell()
+            for fields in records:
+                file.write(",".join(str(field) for field in fields) + "\n")
+                self.__journal_records += 1
+            bytes_written = file.tell() - start
+        if self.__journal_records >= self.__compact_threshold:
+            self.compact()
+        return bytes_written
+
+    def __write_changes(self):
+        """
+        Write the pending changes, either as journal records or by rewriting the whole file once.
+        """
+        if self.__journal:
+            records, self.__pending_records = self.__pending_records, []
+            return self.__append_records(records)
+        return self.__save_file()
+
+    def __persist(self, *records):
+        """
+        Register one mutating operation; its records are written when the flush policy says so.
+        """
+        if self.__journal:
+            self.__pending_records.extend(records)
+        self._flusher.changed()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """
+        Write pending changes to the file.
+        """
+        self._flusher.flush()
+
+    def compact(self):
+        """
+        Fold the journal and any pending changes back into a clean base file and truncate the journal.
+        The journal is only removed once the new base file has replaced the old one.
+        """
+        self.__pending_records = []
+        self.__save_file()
+        if os.path.exists(self.__journal_filename):
+            os.remove(self.__journal_filename)
+        self.__journal_records = 0
+        self._flusher.mark_clean()
 
     def add_grade(self, student_id, assignment_id, grade_value):
         """
         Add a grade and save changes to the file.
         """
         super().add_grade(student_id, assignment_id, grade_value)
-        self.__save_file()
+        self.__persist((self.UPSERT, assignment_id, student_id, grade_value))
+
+    def add_grades_bulk(self, entries):
+        """
+        Add a batch of grades and save changes to the file once.
+        """
+        entries = super().add_grades_bulk(entries)
+        self.__persist(*[(self.UPSERT, assignment_id, student_id, grade_value)
+                         for student_id, assignment_id, grade_value in entries])
+        return entries
+
+    def remove_grades_bulk(self, keys):
+        """
+        Remove a batch of grades and save changes to the file once.
+        """
+        removed = super().remove_grades_bulk(keys)
+        self.__persist(*[(self.DELETE, assignment_id, student_id) for student_id, assignment_id in removed])
+        return removed
 
     def update_grade(self, student_id, assignment_id, grade_value):
         """
         Update a grade and save changes to the file.
         """
         super().update_grade(student_id, assignment_id, grade_value)
-        self.__save_file()
+        self.__persist((self.UPSERT, assignment_id, student_id, grade_value))
+
+    def delete(self, student_id, assignment_id):
+        """
+        Delete a grade and save changes to the file.
+        """
+        super().delete(student_id, assignment_id)
+        self.__persist((self.DELETE, assignment_id, student_id))
 
     def remove_grades_for_assignment(self, assignment_id):
         """
         Remove all grades for a specific assignment and save changes to the file.
         """
         super().remove_grades_for_assignment(assignment_id)
-        self.__save_file()
+        self.__persist((self.DELETE_ASSIGNMENT, assignment_id))
 
     def remove_grades_for_student(self, student_id):
         """
         Remove all grades for a specific student and save changes to the file.
         """
         super().remove_grades_for_student(student_id)
-        self.__save_file()
+        self.__persist((self.DELETE_STUDENT, student_id))
 
     def get_grades_for_student(self, student_id):
         """
@@ -79,3 +242,42 @@ class GradeTextFileRepository(GradeRepository):
         """
         return super().get_grade_for_assig(student_id, assignment_id)
 
+
+def _parse_journal_line(line):
+    """
+    :return: The record of a complete journal line, with its IDs and grade value parsed.
+    :raises ValueError: If the line is cut short or malformed.
+    """
+    if not line.endswith(b"\n"):
+        raise ValueError("The journal line is incomplete")
+    parts = line.decode().rstrip("\n").split(",")
+    tag = parts[0]
+    if tag == GradeTextFileRepository.UPSERT and len(parts) == 4:
+        return tag, int(parts[1]), int(parts[2]), None if parts[3] == "None" else float(parts[3])
+    if tag == GradeTextFileRepository.DELETE and len(parts) == 3:
+        return tag, int(parts[1]), int(parts[2])
+    if tag in (GradeTextFileRepository.DELETE_ASSIGNMENT, GradeTextFileRepository.DELETE_STUDENT) and len(parts) == 2:
+        return tag, int(parts[1])
+    raise ValueError(f"Malformed journal record {line!r}")
+
+
+def read_journal(filename):
+    """
+    Parse a grades journal into its records: (UPSERT, assignment_id, student_id, grade_value),
+    (DELETE, assignment_id, student_id), (DELETE_ASSIGNMENT, assignment_id) or (DELETE_STUDENT, student_id).
+    Reading stops at the first line that is cut short or cannot be parsed, what a crash during an append leaves.
+    :return: A (records, end) tuple; end is the size in bytes of the intact part of the journal.
+    """
+    records, end = [], 0
+    try:
+        with open(filename, "rb") as file:
+            for line in file:
+                try:
+                    records.append(_parse_journal_line(line))
+                except (ValueError, UnicodeDecodeError):
+                    break
+                end += len(line)
+    except FileNotFoundError:
+        # No journal yet, the base file is up to date
+        pass
+    return records, end
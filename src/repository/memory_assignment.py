@@ -1,57 +1,139 @@
+import bisect
+import datetime
+
+from src.domain.assigment import deadline_to_ordinal
+
+
 class AssignmentRepository:
     def __init__(self):
         # Store assignments in a dictionary
         self.assignments = {}
+        # Deadlines parsed once into ordinals, plus a sorted [(ordinal, assignment_id)] index
+        # that answers "due before/between" queries with a binary search instead of a scan
+        self._deadlines = {}  # {assignment_id: ordinal}
+        self._deadline_index = []
+
+    def _index_assignment(self, assignment):
+        ordinal = deadline_to_ordinal(assignment.deadline)
+        if ordinal is None:
+            return
+        self._deadlines[assignment.id] = ordinal
+        bisect.insort(self._deadline_index, (ordinal, assignment.id))
+
+    def _unindex_assignment(self, assignment_id):
+        # The stored ordinal is used, since the assignment object may already carry a new deadline
+        ordinal = self._deadlines.pop(assignment_id, None)
+        if ordinal is None:
+            return
+        position = bisect.bisect_left(self._deadline_index, (ordinal, assignment_id))
+        del self._deadline_index[position]
+
+    def _rebuild_indexes(self):
+        """
+        Rebuild the deadline index from self.assignments.
+        Used by the file repositories after they load self.assignments wholesale.
+        """
+        self._deadlines = {}
+        for assignment in self.assignments.values():
+            ordinal = deadline_to_ordinal(assignment.deadline)
+            if ordinal is not None:
+                self._deadlines[assignment.id] = ordinal
+        self._deadline_index = sorted((ordinal, assignment_id) for assignment_id, ordinal in self._deadlines.items())
 
     def add_assignment(self, assignment):
         if assignment.id in self.assignments:
-            pass
+            self._unindex_assignment(assignment.id)
         self.assignments[assignment.id] = assignment
+        self._index_assignment(assignment)
+
     def get(self, id):
         if id not in self.assignments:
             raise ValueError(f"Assignment {id} does not exist.")
         return self.assignments.get(id)
+
     def remove_assignment(self, assignment_id, grade_repo):
         if assignment_id not in self.assignments:
             raise ValueError(f"Assignment {assignment_id} does not exist.")
         grade_repo.remove_grades_for_assignment(assignment_id)
         del self.assignments[assignment_id]
+        self._unindex_assignment(assignment_id)
 
     def update_assignment(self, assignment):
         if assignment.id not in self.assignments:
             pass
+        self._unindex_assignment(assignment.id)
         self.assignments[assignment.id] = assignment
+        self._index_assignment(assignment)
+
     def give_assignment_to_student(self, assignment_id, student_id, grade_repo):
         if assignment_id not in self.assignments:
             raise ValueError(f"Assignment {assignment_id} does not exist.")
         grade_repo.add_grade(student_id, assignment_id, grade_value=None)
 
+    def give_assignment_to_students(self, assignment_id, student_ids, grade_repo):
+        """
+        Give an assignment to several students with a single bulk write to the grade repository.
+        Students who already have the assignment keep their current grade.
+        :return: The IDs of the students that received the assignment now.
+        """
+        if assignment_id not in self.assignments:
+            raise ValueError(f"Assignment {assignment_id} does not exist.")
+        new_student_ids = [student_id for student_id in dict.fromkeys(student_ids)
+                           if not grade_repo.has_grade(student_id, assignment_id)]
+        if new_student_ids:
+            grade_repo.add_grades_bulk((student_id, assignment_id, None) for student_id in new_student_ids)
+        return new_student_ids
+
     def give_assignment_to_group(self, assignment_id, group_id, student_repo, grade_repo):
         if assignment_id not in self.assignments:
             raise ValueError(f"Assignment {assignment_id} does not exist.")
 
-        students_in_group = [student for student in student_repo.list_all() if student.group == group_id]
+        students_in_group = student_repo.students_in_group(group_id)
         if not students_in_group:
             raise ValueError(f"Group {group_id} does not exist or has no students.")
 
-        for student in students_in_group:
-            self.give_assignment_to_student(assignment_id, student.id, grade_repo)
+        return self.give_assignment_to_students(assignment_id, [student.id for student in students_in_group],
+                                                grade_repo)
 
     # New method to list all assignments
     def list_assignments(self):
         return list(self.assignments.values())
 
+    def iter_assignments(self):
+        """
+        Yield the assignments one by one, without building a list. The repository must not change while iterating.
+        """
+        yield from self.assignments.values()
+
     def get_deadline_for_assignment(self, assignment_id):
         assignment = self.get(assignment_id)
         return assignment.deadline
 
+    def get_assignments_due_between(self, first_day, last_day):
+        """
+        Return the IDs of the assignments due between two days, both included, ordered by deadline.
+        :param first_day: A date, or None for no lower bound.
+        :param last_day: A date, or None for no upper bound.
+        """
+        start = 0 if first_day is None else bisect.bisect_left(self._deadline_index, (first_day.toordinal(),))
+        end = len(self._deadline_index) if last_day is None else \
+            bisect.bisect_left(self._deadline_index, (last_day.toordinal() + 1,))
+        return [assignment_id for _, assignment_id in self._deadline_index[start:end]]
+
+    def get_overdue_assignments(self, today=None):
+        """
+        Return the IDs of the assignments whose deadline is before today, ordered by deadline.
+        """
+        today = today or datetime.date.today()
+        return self.get_assignments_due_between(None, today - datetime.timedelta(days=1))
+
+    def get_assignments_due_within(self, days, today=None):
+        """
+        Return the IDs of the assignments due from today up to `days` days from now, ordered by deadline.
+        """
+        today = today or datetime.date.today()
+        return self.get_assignments_due_between(today, today + datetime.timedelta(days=days))
+
     def get_ungraded_assignments_for_student(self, student_id, grade_repo):
-        # Get all assignments assigned to the student
-        all_assignments = grade_repo.get_assignments_for_student(student_id)
-
-        # Filter out assignments that are already graded
-        ungraded_assignments = [
-            assignment_id for assignment_id in all_assignments
-            if grade_repo.get_grade_for_assig(student_id, assignment_id) is None
-        ]
-        return ungraded_assignments
\ No newline at end of file
+        # The grade repository filters the student's assignments down to the ungraded ones
+        return grade_repo.get_ungraded_assignments(student_id)
@@ -1,21 +1,127 @@
+import heapq
+import numbers
+
+from src.domain.grade import Grade
+
+
 class GradeRepository:
     def __init__(self):
         # Store grades as tuples: {(assignment_id, student_id): grade_value}
         self.grades = {}
-        self.student_assignments = {}  # {student_id: [assignment_id, ...]}
-    def add_grade(self, student_id, assignment_id, grade_value):
+        # Secondary indexes kept in sync with self.grades. The inner dicts are used as
+        # insertion-ordered sets, so lookups and removals cost O(1) per row.
+        self.student_assignments = {}  # {student_id: {assignment_id: None, ...}}
+        self.assignment_students = {}  # {assignment_id: {student_id: None, ...}}
+        # Running aggregates per student: [sum of graded values, graded count, row count]
+        self.student_totals = {}
+        # Bumped on every write, so callers can tell whether cached reports are stale
+        self.version = 0
+
+    def _index_grade(self, assignment_id, student_id):
+        """
+        Register the (assignment_id, student_id) key in the secondary indexes.
+        """
+        self.student_assignments.setdefault(student_id, {})[assignment_id] = None
+        self.assignment_students.setdefault(assignment_id, {})[student_id] = None
+
+    def _unindex_grade(self, assignment_id, student_id):
+        """
+        Drop the (assignment_id, student_id) key from the secondary indexes.
+        """
+        assignments = self.student_assignments.get(student_id)
+        if assignments is not None:
+            assignments.pop(assignment_id, None)
+            if not assignments:
+                del self.student_assignments[student_id]
+        students = self.assignment_students.get(assignment_id)
+        if students is not None:
+            students.pop(student_id, None)
+            if not students:
+                del self.assignment_students[assignment_id]
+
+    def _account_grade(self, student_id, grade_value, sign):
+        """
+        Add (sign=1) or withdraw (sign=-1) one grade row from the student's running aggregates.
+        """
+        totals = self.student_totals.get(student_id)
+        if totals is None:
+            totals = self.student_totals[student_id] = [0, 0, 0]
+        if grade_value is not None:
+            totals[0] += sign * grade_value
+            totals[1] += sign
+        totals[2] += sign
+        if totals[2] == 0:
+            del self.student_totals[student_id]
+
+    def _rebuild_indexes(self):
+        """
+        Rebuild the secondary indexes and aggregates from self.grades.
+        Used by the file repositories after they load self.grades wholesale.
+        """
+        self.student_assignments = {}
+        self.assignment_students = {}
+        self.student_totals = {}
+        for (assignment_id, student_id), grade_value in self.grades.items():
+            self._index_grade(assignment_id, student_id)
+            self._account_grade(student_id, grade_value, 1)
+        self.version += 1
+
+    def _put_grade(self, student_id, assignment_id, grade_value):
+        # Replacing an existing row must withdraw its old value from the aggregates first
+        key = (assignment_id, student_id)
+        if key in self.grades:
+            self._account_grade(student_id, self.grades[key], -1)
+        self._account_grade(student_id, grade_value, 1)
+
         # Add the grade for the student
-        self.grades[(assignment_id, student_id)] = grade_value
+        self.grades[key] = grade_value
+
+        # Ensure assignment is tracked for the student and the student for the assignment
+        self._index_grade(assignment_id, student_id)
 
-        # Ensure assignment is tracked for the student
-        if student_id not in self.student_assignments:
-            self.student_assignments[student_id] = []
-        if assignment_id not in self.student_assignments[student_id]:
-            self.student_assignments[student_id].append(assignment_id)
+    def _drop_grade(self, student_id, assignment_id):
+        self._account_grade(student_id, self.grades.pop((assignment_id, student_id)), -1)
+        self._unindex_grade(assignment_id, student_id)
+
+    def add_grade(self, student_id, assignment_id, grade_value):
+        self._put_grade(student_id, assignment_id, grade_value)
+        self.version += 1
+
+    def add_grades_bulk(self, entries):
+        """
+        Add or replace a batch of grades in one pass.
+        :param entries: An iterable of (student_id, assignment_id, grade_value) tuples.
+        :return: The list of entries that was applied.
+        """
+        entries = list(entries)
+        for student_id, assignment_id, grade_value in entries:
+            if grade_value is not None and not isinstance(grade_value, numbers.Real):
+                raise ValueError(f"Invalid grade {grade_value!r} for student {student_id} on assignment {assignment_id}.")
+        for student_id, assignment_id, grade_value in entries:
+            self._put_grade(student_id, assignment_id, grade_value)
+        self.version += 1
+        return entries
+
+    def remove_grades_bulk(self, keys):
+        """
+        Remove a batch of grades in one pass. Keys without a grade are ignored.
+        :param keys: An iterable of (student_id, assignment_id) tuples.
+        :return: The list of keys that was actually removed.
+        """
+        removed = []
+        for student_id, assignment_id in keys:
+            if (assignment_id, student_id) in self.grades:
+                self._drop_grade(student_id, assignment_id)
+                removed.append((student_id, assignment_id))
+        self.version += 1
+        return removed
 
     def update_grade(self, student_id, assignment_id, grade_value):
         if (assignment_id, student_id) not in self.grades:
             raise ValueError(f"No grade exists for student {student_id} on assignment {assignment_id}.")
+        self._account_grade(student_id, self.grades[(assignment_id, student_id)], -1)
+        self._account_grade(student_id, grade_value, 1)
+        self.version += 1
         self.grades[(assignment_id, student_id)] = grade_value
 
     def get_grades_for_student(self, student_id):
@@ -24,22 +130,77 @@ class GradeRepository:
         :param student_id: The ID of the student whose grades are to be retrieved.
         :return: A list of tuples, where each tuple contains (assignment_id, grade_value).
         """
-        assignments_and_grades = []
-        for (assignment_id, s_id), grade_value in self.grades.items():
-            if s_id == student_id:
-                # Append a tuple (assignment_id, grade_value) to the list
-                assignments_and_grades.append((assignment_id, grade_value))
-        return assignments_and_grades
+        return [
+            (assignment_id, self.grades[(assignment_id, student_id)])
+            for assignment_id in self.student_assignments.get(student_id, ())
+        ]
+
+    def get_grades_for_students(self, student_ids):
+        """
+        Retrieve the grades of several students at once, e.g. to restore them after the students are removed.
+        :return: A list of (student_id, assignment_id, grade_value) tuples, as taken by add_grades_bulk.
+        """
+        return [
+            (student_id, assignment_id, self.grades[(assignment_id, student_id)])
+            for student_id in student_ids
+            for assignment_id in self.student_assignments.get(student_id, ())
+        ]
+
+    def get_grades_for_assignment(self, assignment_id):
+        """
+        Retrieve students and grades for an assignment.
+        :param assignment_id: The ID of the assignment whose grades are to be retrieved.
+        :return: A list of tuples, where each tuple contains (student_id, grade_value).
+        """
+        return [
+            (student_id, self.grades[(assignment_id, student_id)])
+            for student_id in self.assignment_students.get(assignment_id, ())
+        ]
+
+    def get_grades_for_assignment_by_grade(self, assignment_id):
+        """
+        Retrieve students and grades for an assignment, ordered descending by grade.
+        Ungraded rows are ordered as if graded 0 and keep their value of None.
+        :return: A list of tuples, where each tuple contains (student_id, grade_value).
+        """
+        return sorted(self.get_grades_for_assignment(assignment_id),
+                      key=lambda x: x[1] if x[1] is not None else 0, reverse=True)
 
     def get_assignments_for_student(self, student_id):
         """
         Retrieve all assignment IDs for a specific student.
         """
-        assignments = set()  # Use a set to avoid duplicates
-        for (assignment_id, s_id), _ in self.grades.items():
-            if s_id == student_id:
-                assignments.add(assignment_id)
-        return list(assignments)  # Convert the set to a list
+        return list(self.student_assignments.get(student_id, ()))
+
+    def get_ungraded_assignments(self, student_id):
+        """
+        Retrieve the IDs of the assignments the student has not been graded for yet.
+        """
+        return [assignment_id for assignment_id in self.student_assignments.get(student_id, ())
+                if self.grades[(assignment_id, student_id)] is None]
+
+    def get_students_for_assignment(self, assignment_id):
+        """
+        Retrieve all student IDs that received a specific assignment.
+        """
+        return list(self.assignment_students.get(assignment_id, ()))
+
+    def get_ungraded_students_for_assignments(self, assignment_ids):
+        """
+        Retrieve the IDs of the students with at least one ungraded row among the given assignments.
+        """
+        ungraded_students = set()
+        for assignment_id in assignment_ids:
+            for student_id in self.assignment_students.get(assignment_id, ()):
+                if self.grades[(assignment_id, student_id)] is None:
+                    ungraded_students.add(student_id)
+        return ungraded_students
+
+    def has_grade(self, student_id, assignment_id):
+        """
+        Check whether the assignment was given to the student, graded or not.
+        """
+        return (assignment_id, student_id) in self.grades
 
     def find_by_student_and_assignment(self, student_id, assignment_id):
         # Ensure we are checking for the correct key structure
@@ -48,24 +209,86 @@ class GradeRepository:
 
     def delete(self, student_id, assignment_id):
         # Check if the grade exists for the specific student and assignment
-        grade = self.find_by_student_and_assignment(student_id, assignment_id)
-
-        if grade is not None:
+        if (assignment_id, student_id) in self.grades:
             # If grade exists, delete it from the grades dictionary
-            del self.grades[(assignment_id, student_id)]
+            self._drop_grade(student_id, assignment_id)
+            self.version += 1
         else:
             raise ValueError(f"Grade for student {student_id} and assignment {assignment_id} not found.")
 
     def remove_grades_for_assignment(self, assignment_id):
-        # Remove all grades for a specific assignment
-        self.grades = {k: v for k, v in self.grades.items() if k[0] != assignment_id}
+        # Remove all grades for a specific assignment, touching only its own rows
+        self.version += 1
+        for student_id in self.assignment_students.pop(assignment_id, ()):
+            self._account_grade(student_id, self.grades.pop((assignment_id, student_id)), -1)
+            assignments = self.student_assignments[student_id]
+            del assignments[assignment_id]
+            if not assignments:
+                del self.student_assignments[student_id]
 
     def remove_grades_for_student(self, student_id):
-        # Remove all grades for a specific student
-        self.grades = {k: v for k, v in self.grades.items() if k[1] != student_id}
+        # Remove all grades for a specific student, touching only their own rows
+        self.version += 1
+        self.student_totals.pop(student_id, None)
+        for assignment_id in self.student_assignments.pop(student_id, ()):
+            del self.grades[(assignment_id, student_id)]
+            students = self.assignment_students[assignment_id]
+            del students[student_id]
+            if not students:
+                del self.assignment_students[assignment_id]
 
     def get_grade_for_assig(self, student_id, assignment_id):
         """
         Retrieve the grade for a specific student and assignment.
         """
         return self.grades.get((assignment_id, student_id), None)
+
+    def list_all_grades(self):
+        """
+        Return all grades as Grade objects.
+        """
+        return list(self.iter_grades())
+
+    def iter_grades(self):
+        """
+        Yield all grades as Grade objects, one at a time. The repository must not change while iterating.
+        """
+        for (assignment_id, student_id), grade_value in self.grades.items():
+            yield Grade(assignment_id, student_id, grade_value)
+
+    def get_average_for_student(self, student_id, include_ungraded=False):
+        """
+        Return the student's average grade from the running aggregates.
+        :param include_ungraded: If True, ungraded assignments count as 0; otherwise they are skipped.
+        :return: The average, or None if the student has no grade counted in it.
+        """
+        totals = self.student_totals.get(student_id)
+        if totals is None:
+            return None
+        count = totals[2] if include_ungraded else totals[1]
+        return totals[0] / count if count else None
+
+    def average_grades(self, include_ungraded=False):
+        """
+        Return {student_id: average} for every student with at least one grade counted in the average.
+        """
+        count_index = 2 if include_ungraded else 1
+        return {
+            student_id: totals[0] / totals[count_index]
+            for student_id, totals in self.student_totals.items()
+            if totals[count_index]
+        }
+
+    def top_k(self, n, include_ungraded=False):
+        """
+        Return the n students with the highest average as (student_id, average) tuples, best first and,
+        on equal averages, by ascending student ID.
+        Uses a bounded heap, so the cost is O(students * log n) instead of a full sort.
+        """
+        count_index = 2 if include_ungraded else 1
+        averages = (
+            (-totals[0] / totals[count_index], student_id)
+            for student_id, totals in self.student_totals.items()
+            if totals[count_index]
+        )
+        return [(student_id, -negative_average) for negative_average, student_id in heapq.nsmallest(n, averages)]
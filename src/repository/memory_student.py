@@ -1,52 +1,277 @@
-from src.domain.student import Student
+import bisect
+import heapq
+
+from src.domain.student import Student, normalize_name
 from src.exceptions.exceptions import StudentNotFoundError, DuplicateStudentError, InvalidStudentUpdateError
 
 class StudentRepository:
     def __init__(self):
         self._students = {}
+        self._groups = {}  # {group: {student_id: None, ...}}, inner dicts used as ordered sets
+        # Search index over the normalized names: every trigram of " " + name, plus the two-character
+        # " x" key at the start of each word, maps to the IDs of the students whose name contains it
+        self._normalized_names = {}  # {student_id: normalize_name(student.name)}
+        self._name_index = {}  # {gram: {student_id, ...}}
+        # Sorted [(normalized_name, student_id)], so the name-prefix matches of a query are one contiguous slice
+        self._sorted_names = []
+        # Bumped on every write, so callers can tell whether cached reports are stale
+        self.version = 0
+
+    @staticmethod
+    def _name_grams(normalized_name):
+        padded = " " + normalized_name
+        grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        grams.update(padded[i:i + 2] for i in range(len(padded) - 1) if padded[i] == " ")
+        return grams
+
+    def _index_student(self, student, keep_sorted=True):
+        """
+        :param keep_sorted: Batch callers pass False and sort self._sorted_names once at the end.
+        """
+        student_id = student.id
+        self._groups.setdefault(student.group, {})[student_id] = None
+        normalized_name = normalize_name(student.name)
+        self._normalized_names[student_id] = normalized_name
+        if keep_sorted:
+            bisect.insort(self._sorted_names, (normalized_name, student_id))
+        else:
+            self._sorted_names.append((normalized_name, student_id))
+        name_index = self._name_index
+        for gram in self._name_grams(normalized_name):
+            ids = name_index.get(gram)
+            if ids is None:
+                name_index[gram] = {student_id}
+            else:
+                ids.add(student_id)
+
+    def _unindex_student(self, student, keep_sorted=True):
+        """
+        :param keep_sorted: Batch callers pass False and filter self._sorted_names once at the end.
+        """
+        members = self._groups.get(student.group)
+        if members is not None:
+            members.pop(student.id, None)
+            if not members:
+                del self._groups[student.group]
+        # The stored name is used, since the student object may already carry a new one
+        normalized_name = self._normalized_names.pop(student.id, None)
+        if normalized_name is None:
+            return
+        if keep_sorted:
+            del self._sorted_names[bisect.bisect_left(self._sorted_names, (normalized_name, student.id))]
+        for gram in self._name_grams(normalized_name):
+            ids = self._name_index[gram]
+            ids.discard(student.id)
+            if not ids:
+                del self._name_index[gram]
+
+    def _rebuild_indexes(self):
+        """
+        Rebuild the group and name indexes from self._students.
+        Used by the file repositories after they load self._students wholesale.
+        """
+        self._groups = {}
+        self._normalized_names = {}
+        self._name_index = {}
+        self._sorted_names = []
+        for student in self._students.values():
+            self._index_student(student, keep_sorted=False)
+        self._sorted_names.sort()
+        self.version += 1
 
     def add_student(self, student):
         try:
             if student.id in self._students:
                 raise DuplicateStudentError(f"Student with ID {student.id} already exists.")
             self._students[student.id] = student
+            self._index_student(student)
+            self.version += 1
         except DuplicateStudentError as e:
             print(f"Warning: Skipping student with ID {student.id}: {e}")
 
+    def add_students_bulk(self, students):
+        """
+        Add a batch of students. The whole batch is validated first, so either every student is added
+        or none is.
+        :raises DuplicateStudentError: If an ID is already in the repository or repeated in the batch.
+        """
+        students = list(students)
+        seen = set()
+        for student in students:
+            if student.id in self._students or student.id in seen:
+                raise DuplicateStudentError(f"Student with ID {student.id} already exists.")
+            seen.add(student.id)
+        for student in students:
+            self._students[student.id] = student
+            self._index_student(student, keep_sorted=False)
+        self._sorted_names.sort()
+        self.version += 1
+
     def remove_student(self, student_id, grade_repo):
         if student_id not in self._students:
             raise StudentNotFoundError(f"Student with ID {student_id} does not exist.")
 
         # Remove the student
+        self._unindex_student(self._students[student_id])
         del self._students[student_id]
+        self.version += 1
 
         # Remove all grades for the student
         grade_repo.remove_grades_for_student(student_id)
 
+    def remove_students_bulk(self, student_ids, grade_repo):
+        """
+        Remove a batch of students and all of their grades, with one index pass and one grade repository write.
+        The whole batch is validated first, so either every student is removed or none is.
+        :raises StudentNotFoundError: If an ID is not in the repository.
+        :return: The list of removed students.
+        """
+        student_ids = list(dict.fromkeys(student_ids))
+        for student_id in student_ids:
+            if student_id not in self._students:
+                raise StudentNotFoundError(f"Student with ID {student_id} does not exist.")
+        removed = [self._students.pop(student_id) for student_id in student_ids]
+        for student in removed:
+            self._unindex_student(student, keep_sorted=False)
+        removed_ids = set(student_ids)
+        self._sorted_names = [entry for entry in self._sorted_names if entry[1] not in removed_ids]
+        self.version += 1
+
+        # Remove all grades of the batch at once
+        grade_repo.remove_grades_bulk([(student_id, assignment_id) for student_id, assignment_id, _ in
+                                       grade_repo.get_grades_for_students(student_ids)])
+        return removed
+
     def find_student(self, student_id):
         student = self._students.get(student_id)  # Fetch student by ID
         if not student:  # Check if student is None or falsy
             raise StudentNotFoundError(f"Student with ID {student_id} not found.")
         return student
-    def search_students(self, search_term):
-        search_term = search_term.lower()
-        return [student for student in self._students.values() if search_term in student.name.lower()]
+    @staticmethod
+    def _match_rank(normalized_name, term):
+        """
+        Rank how well a normalized name matches a normalized term, lower is better.
+        :return: 0 for the whole name, 1 for a name prefix, 2 for a word prefix, 3 for any other substring,
+                 or None if the name does not contain the term.
+        """
+        if normalized_name == term:
+            return 0
+        if normalized_name.startswith(term):
+            return 1
+        if " " + term in normalized_name:
+            return 2
+        if term in normalized_name:
+            return 3
+        return None
+
+    @staticmethod
+    def _rank_matches(named_ids, term, limit, prefix):
+        """
+        Rank (normalized_name, student_id) pairs against the term and keep the best `limit` ones.
+        :return: The IDs of the matching students, best match first, ties ordered by name and ID.
+        """
+        matches = []
+        for normalized_name, student_id in named_ids:
+            rank = StudentRepository._match_rank(normalized_name, term)
+            if rank is not None and (not prefix or rank < 3):
+                matches.append((rank, normalized_name, student_id))
+        best = sorted(matches) if limit is None else heapq.nsmallest(limit, matches)
+        return [student_id for _, _, student_id in best]
+
+    def _gram_candidates(self, key):
+        """
+        Return the IDs of the students whose name contains every trigram of the key, or None if the key is
+        too short to have one. Not every candidate contains the key itself.
+        """
+        if len(key) < 3:
+            return self._name_index.get(key, set()) if key.startswith(" ") and len(key) == 2 else None
+        # Intersect the posting sets, starting from the smallest one
+        postings = sorted((self._name_index.get(key[i:i + 3], set()) for i in range(len(key) - 2)), key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def _best_by_name(self, student_ids, accept, count):
+        names = self._normalized_names
+        matches = [(names[student_id], student_id) for student_id in student_ids if accept(names[student_id])]
+        return sorted(matches) if count is None else heapq.nsmallest(count, matches)
+
+    def search_students(self, search_term, limit=None, prefix=False):
+        """
+        Find the students whose name contains the search term, ignoring case, accents and extra whitespace.
+        The matches are collected best tier first, so a limited query stops as soon as it has enough:
+        whole-name and name-prefix matches are a slice of the sorted names, word-prefix and other substring
+        matches come from the trigram index. Substring terms shorter than three characters scan the stored names.
+        :param search_term: The text to look for. An empty term matches every student.
+        :param limit: Return at most this many students, or all of them if None.
+        :param prefix: If True, only names with a word starting with the term match.
+        :return: The matching students: whole-name matches first, then name prefixes, word prefixes and other
+                 substrings, each ordered by name.
+        """
+        term = normalize_name(search_term)
+        word_term = " " + term
+        remaining = limit
+        matches = []
+
+        # Whole name and name prefix
+        position = bisect.bisect_left(self._sorted_names, (term,))
+        while position < len(self._sorted_names) and remaining != 0:
+            normalized_name, student_id = self._sorted_names[position]
+            if not normalized_name.startswith(term):
+                break
+            matches.append((normalized_name, student_id))
+            position += 1
+            remaining = None if remaining is None else remaining - 1
+
+        # Word prefix
+        if term and remaining != 0:
+            candidates = self._gram_candidates(word_term)
+            word_matches = self._best_by_name(
+                self._normalized_names if candidates is None else candidates,
+                lambda name: word_term in name and not name.startswith(term), remaining)
+            matches.extend(word_matches)
+            remaining = None if remaining is None else remaining - len(word_matches)
+
+        # Any other substring
+        if term and not prefix and remaining != 0:
+            candidates = self._gram_candidates(term)
+            matches.extend(self._best_by_name(
+                self._normalized_names if candidates is None else candidates,
+                lambda name: term in name and word_term not in name and not name.startswith(term), remaining))
+
+        return [self._students[student_id] for _, student_id in matches]
 
     def list_all(self):
         return list(self._students.values())
 
+    def iter_students(self):
+        """
+        Yield the students one by one, without building a list. The repository must not change while iterating.
+        """
+        yield from self._students.values()
+
+    def students_in_group(self, group):
+        """
+        Return the students of a group, in the order they were added to it.
+        """
+        return [self._students[student_id] for student_id in self._groups.get(group, ())]
+
     def update_student(self, student_id_inf: int, new_name: str = None, new_group: int = None):
         if not new_name and not new_group:
             raise InvalidStudentUpdateError("At least one of 'new_name' or 'new_group' must be provided for update.")
 
         studentel = self._students.get(student_id_inf)
         if not studentel:
-            raise StudentNotFoundError(f"Student with ID {student_id} does not exist.")
+            raise StudentNotFoundError(f"Student with ID {student_id_inf} does not exist.")
 
-        if new_name:
-            studentel.name = new_name  # Use the property setter
-        if new_group is not None:
-            studentel.group = new_group  # Use the property setter
+        self.version += 1
+        # Reindexed under the new name and group, also if a setter rejects the new value
+        self._unindex_student(studentel)
+        try:
+            if new_name:
+                studentel.name = new_name  # Use the property setter
+            if new_group is not None:
+                studentel.group = new_group  # Use the property setter
+        finally:
+            self._index_student(studentel)
 
     def get_all_ids(self):
         """
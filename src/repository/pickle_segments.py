@@ -0,0 +1,114 @@
+"""
+Append-only storage for the pickle-based binary repositories.
+
+A file holds one pickled base snapshot (the repository's dict, as older versions of the repositories wrote it)
+followed by any number of pickled delta segments. A segment is a list of records, each either
+(UPSERT, key..., value) or (DELETE, key...). Saving a change appends one segment, so a write costs as much as
+the change instead of the whole dataset. Loading reads the snapshot and replays the segments, and once the
+segments hold `compact_threshold` records the file is rewritten as a single new snapshot.
+"""
+import os
+import pickle
+
+from src.repository.compression import NONE, READ_ERRORS, detect, open_file
+
+UPSERT = "+"
+DELETE = "-"
+
+
+class SegmentedPickleFile:
+    def __init__(self, filename, compact_threshold=1000, compression=NONE):
+        """
+        :param filename: The file holding the snapshot and its segments.
+        :param compact_threshold: Number of segment records after which the next save writes a new snapshot.
+        :param compression: The codec snapshots are written with, see src.repository.compression.
+                            Segments are appended with the codec of the snapshot they follow.
+        """
+        self.filename = filename
+        self.compact_threshold = compact_threshold
+        self.compression = compression
+        self.records = 0  # the records in the segments after the snapshot
+        self.torn = False  # whether the file ends in a segment that cannot be read and has to be rewritten
+
+    def load(self):
+        """
+        Read the snapshot and the records of every segment after it.
+        A segment cut short by a crash during an append is dropped. In an uncompressed file it is truncated away;
+        a compressed file is marked as torn, which makes a compaction due.
+        :return: A (snapshot, records) tuple; the snapshot is None if the file is missing or empty.
+        """
+        records = []
+        plain = detect(self.filename) == NONE
+        try:
+            with open_file(self.filename, "rb") as file:
+                try:
+                    snapshot = pickle.load(file)
+                except EOFError:
+                    return None, records
+                end = file.tell() if plain else None
+                while True:
+                    try:
+                        if not file.peek(1):
+                            break
+                        records.extend(pickle.load(file))
+                    except (pickle.UnpicklingError, ValueError) + READ_ERRORS:
+                        # A segment whose append did not finish
+                        self.torn = True
+                        break
+                    end = file.tell() if plain else None
+        except FileNotFoundError:
+            return None, records
+        if self.torn and plain:
+            os.truncate(self.filename, end)
+            self.torn = False
+        self.records = len(records)
+        return snapshot, records
+
+    @property
+    def compaction_due(self):
+        return self.records >= self.compact_threshold or self.torn
+
+    def save(self, records, state):
+        """
+        Append the records as one segment. The whole state is written as a new snapshot instead when
+        the file has no snapshot yet or the segments would reach the compaction threshold.
+        :param state: The repository's dict, to be pickled as the snapshot.
+        :return: The number of bytes written.
+        """
+        if not records:
+            return 0
+        if self.records + len(records) >= self.compact_threshold or not os.path.exists(self.filename):
+            return self.write_snapshot(state)
+        return self.append(records)
+
+    def append(self, records):
+        """
+        Append the records as one segment after the snapshot, whatever the threshold.
+        :return: The number of bytes written.
+        """
+        start = os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+        with open_file(self.filename, "ab", self.compression) as file:
+            pickle.dump(records, file, pickle.HIGHEST_PROTOCOL)
+        self.records += len(records)
+        return os.path.getsize(self.filename) - start
+
+    def write_snapshot(self, state):
+        """
+        Replace the file with a snapshot of `state` and no segments. The snapshot is written to a temporary
+        file and synced to disk before it is moved over the file, so a crash leaves either the old file or the new one.
+        :return: The number of bytes written.
+        """
+        temporary = self.filename + ".tmp"
+        with open_file(temporary, "wb", self.compression) as file:
+            pickle.dump(state, file)
+        # Synced through a descriptor of its own, as compressed files do not expose the one they write through
+        descriptor = os.open(temporary, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+        bytes_written = os.path.getsize(temporary)
+        os.replace(temporary, self.filename)
+        self.records = 0
+        self.torn = False
+        return bytes_written
@@ -0,0 +1,54 @@
+import sqlite3
+
+from src.domain.student import normalize_name
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    student_group INTEGER
+);
+CREATE INDEX IF NOT EXISTS students_by_group ON students (student_group);
+
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    deadline TEXT,
+    deadline_ordinal INTEGER
+);
+CREATE INDEX IF NOT EXISTS assignments_by_deadline ON assignments (deadline_ordinal);
+
+CREATE TABLE IF NOT EXISTS grades (
+    assignment_id INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (assignment_id, student_id)
+);
+CREATE INDEX IF NOT EXISTS grades_by_student ON grades (student_id);
+"""
+
+# SQLite limits the number of "?" parameters in one statement, so long IN (...) lists are split
+MAX_PARAMETERS = 500
+
+
+def connect(filename):
+    """
+    Open the SQLite database shared by the student, assignment and grade repositories
+    and create the tables and indexes if they don't exist yet.
+    :param filename: The database file, or ":memory:".
+    """
+    connection = sqlite3.connect(filename)
+    # Name searches fold names the same way as the in-memory repository
+    connection.create_function("normalize_name", 1, normalize_name, deterministic=True)
+    connection.executescript(SCHEMA)
+    connection.commit()
+    return connection
+
+
+def chunks(values, size=MAX_PARAMETERS):
+    """
+    Split a list of query parameters into lists of at most `size` items.
+    """
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
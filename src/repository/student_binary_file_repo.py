@@ -1,35 +1,80 @@
-import pickle
 from src.domain.student import Student
+from src.instrumentation.stats import timed
+from src.repository.compression import NONE
+from src.repository.flush_policy import FlushController
 from src.repository.memory_student import StudentRepository
+from src.repository.pickle_segments import DELETE, UPSERT, SegmentedPickleFile
 
 class StudentBinaryFileRepository(StudentRepository):
-    def __init__(self, filename):
+    def __init__(self, filename, flush_policy=None, compact_threshold=1000, compression=NONE):
+        """
+        :param filename: The students file, a pickled snapshot followed by delta segments.
+        :param flush_policy: When pending changes are written, see FlushPolicy.
+        :param compact_threshold: Number of segment records after which a new snapshot is written.
+        :param compression: The codec the file is written with, see src.repository.compression.
+        """
         super().__init__()
-        self.__fileName = filename
+        self.__file = SegmentedPickleFile(filename, compact_threshold, compression)
+        self.__pending_records = []
+        self._flusher = FlushController(self.__write_changes, flush_policy)
         self.__load_file()
 
+    @timed()
     def __load_file(self):
-        """Load students from a binary file."""
-        try:
-            with open(self.__fileName, "rb") as file:
-                self._students = pickle.load(file)
-        except (FileNotFoundError, EOFError):
-            self._students = {}
-
-    def __save_file(self):
-        """Save all students to a binary file."""
-        with open(self.__fileName, "wb") as file:
-            pickle.dump(self._students, file)
+        """Load students from the snapshot and replay the segments appended after it."""
+        snapshot, records = self.__file.load()
+        self._students = {} if snapshot is None else snapshot
+        for record in records:
+            if record[0] == UPSERT:
+                self._students[record[1].id] = record[1]
+            else:
+                self._students.pop(record[1], None)
+        self._rebuild_indexes()
+        if self.__file.compaction_due:
+            self.compact()
+
+    def __write_changes(self):
+        """Append the pending records as one segment, or write a new snapshot once compaction is due."""
+        records, self.__pending_records = self.__pending_records, []
+        return self.__file.save(records, self._students)
+
+    def __persist(self, records):
+        self.__pending_records.extend(records)
+        self._flusher.changed()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Write pending changes to the binary file."""
+        self._flusher.flush()
+
+    def compact(self):
+        """Rewrite the file as a single snapshot of the current students."""
+        self.__pending_records = []
+        self.__file.write_snapshot(self._students)
+        self._flusher.mark_clean()
 
     def add_student(self, student):
         super().add_student(student)
-        self.__save_file()
+        self.__persist([(UPSERT, self._students[student.id])])
+
+    def add_students_bulk(self, students):
+        students = list(students)
+        super().add_students_bulk(students)
+        self.__persist([(UPSERT, student) for student in students])
 
     def remove_student(self, student_id, grade_repo):
         super().remove_student(student_id, grade_repo)
-        self.__save_file()
+        self.__persist([(DELETE, student_id)])
+
+    def remove_students_bulk(self, student_ids, grade_repo):
+        removed = super().remove_students_bulk(student_ids, grade_repo)
+        self.__persist([(DELETE, student.id) for student in removed])
+        return removed
 
     def update_student(self, student_id, new_name=None, new_group=None):
         updated_student = super().update_student(student_id, new_name, new_group)
-        self.__save_file()
+        self.__persist([(UPSERT, self._students[student_id])])
         return updated_student
@@ -0,0 +1,152 @@
+from src.domain.student import Student, normalize_name
+from src.exceptions.exceptions import StudentNotFoundError, DuplicateStudentError, InvalidStudentUpdateError
+from src.repository.flush_policy import FlushController
+from src.repository.memory_student import StudentRepository
+from src.repository.sqlite_database import chunks
+
+
+class StudentSqliteRepository(StudentRepository):
+    """
+    StudentRepository stored in the "students" table of a SQLite database.
+    Nothing is kept in memory: every method runs a query, and the flush policy decides when to commit.
+    """
+
+    def __init__(self, connection, flush_policy=None):
+        # The in-memory dictionaries of StudentRepository are not used, so its __init__ is not called
+        self._connection = connection
+        self._flusher = FlushController(self._connection.commit, flush_policy, f"{type(self).__name__}.commit")
+        self.version = 0
+
+    @staticmethod
+    def __to_student(row):
+        return Student(row[1], row[0], row[2])
+
+    def __changed(self):
+        self.version += 1
+        self._flusher.changed()
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """Commit pending changes to the database."""
+        self._flusher.flush()
+
+    def add_student(self, student):
+        try:
+            if self.__exists(student.id):
+                raise DuplicateStudentError(f"Student with ID {student.id} already exists.")
+            self._connection.execute("INSERT INTO students (id, name, student_group) VALUES (?, ?, ?)",
+                                     (student.id, student.name, student.group))
+            self.__changed()
+        except DuplicateStudentError as e:
+            print(f"Warning: Skipping student with ID {student.id}: {e}")
+
+    def add_students_bulk(self, students):
+        """
+        Add a batch of students in one statement. Either every student is added or none is.
+        :raises DuplicateStudentError: If an ID is already in the repository or repeated in the batch.
+        """
+        students = list(students)
+        ids = [student.id for student in students]
+        if len(set(ids)) != len(ids):
+            raise DuplicateStudentError("The batch contains the same student ID more than once.")
+        for chunk in chunks(ids):
+            row = self._connection.execute(
+                f"SELECT id FROM students WHERE id IN ({','.join('?' * len(chunk))}) LIMIT 1", chunk).fetchone()
+            if row is not None:
+                raise DuplicateStudentError(f"Student with ID {row[0]} already exists.")
+        self._connection.executemany("INSERT INTO students (id, name, student_group) VALUES (?, ?, ?)",
+                                     [(student.id, student.name, student.group) for student in students])
+        self.__changed()
+
+    def __exists(self, student_id):
+        return self._connection.execute("SELECT 1 FROM students WHERE id = ?", (student_id,)).fetchone() is not None
+
+    def remove_student(self, student_id, grade_repo):
+        cursor = self._connection.execute("DELETE FROM students WHERE id = ?", (student_id,))
+        if cursor.rowcount == 0:
+            raise StudentNotFoundError(f"Student with ID {student_id} does not exist.")
+        self.__changed()
+
+        # Remove all grades for the student
+        grade_repo.remove_grades_for_student(student_id)
+
+    def remove_students_bulk(self, student_ids, grade_repo):
+        """
+        Remove a batch of students and all of their grades. Either every student is removed or none is.
+        :raises StudentNotFoundError: If an ID is not in the repository.
+        :return: The list of removed students.
+        """
+        student_ids = list(dict.fromkeys(student_ids))
+        removed = []
+        for chunk in chunks(student_ids):
+            removed.extend(self.__to_student(row) for row in self._connection.execute(
+                f"SELECT id, name, student_group FROM students WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        if len(removed) != len(student_ids):
+            missing = set(student_ids).difference(student.id for student in removed)
+            raise StudentNotFoundError(f"Student with ID {min(missing)} does not exist.")
+        self._connection.executemany("DELETE FROM students WHERE id = ?", [(student_id,) for student_id in student_ids])
+        self.__changed()
+
+        grade_repo.remove_grades_bulk([(student_id, assignment_id) for student_id, assignment_id, _ in
+                                       grade_repo.get_grades_for_students(student_ids)])
+        return removed
+
+    def find_student(self, student_id):
+        row = self._connection.execute("SELECT id, name, student_group FROM students WHERE id = ?",
+                                       (student_id,)).fetchone()
+        if row is None:
+            raise StudentNotFoundError(f"Student with ID {student_id} not found.")
+        return self.__to_student(row)
+
+    def search_students(self, search_term, limit=None, prefix=False):
+        """
+        Find the students whose name contains the search term, ranked like StudentRepository.search_students.
+        The filter runs in SQL on the normalized names; there is no trigram index, so every name is folded per query.
+        """
+        term = normalize_name(search_term)
+        rows = self._connection.execute(
+            "SELECT normalize_name(name), id FROM students WHERE instr(normalize_name(name), ?) > 0", (term,))
+        student_ids = self._rank_matches(rows, term, limit, prefix)
+        return [self.find_student(student_id) for student_id in student_ids]
+
+    def list_all(self):
+        rows = self._connection.execute("SELECT id, name, student_group FROM students ORDER BY id")
+        return [self.__to_student(row) for row in rows]
+
+    def iter_students(self):
+        """
+        Yield the students in ID order, fetching rows from the cursor as they are consumed.
+        """
+        for row in self._connection.execute("SELECT id, name, student_group FROM students ORDER BY id"):
+            yield self.__to_student(row)
+
+    def students_in_group(self, group):
+        """
+        Return the students of a group, using the index on student_group.
+        """
+        rows = self._connection.execute(
+            "SELECT id, name, student_group FROM students WHERE student_group = ? ORDER BY id", (group,))
+        return [self.__to_student(row) for row in rows]
+
+    def update_student(self, student_id_inf: int, new_name: str = None, new_group: int = None):
+        if not new_name and not new_group:
+            raise InvalidStudentUpdateError("At least one of 'new_name' or 'new_group' must be provided for update.")
+
+        student = self.find_student(student_id_inf)
+        # Run the domain validation of the property setters before writing
+        if new_name:
+            student.name = new_name
+        if new_group is not None:
+            student.group = new_group
+        self._connection.execute("UPDATE students SET name = ?, student_group = ? WHERE id = ?",
+                                 (student.name, student.group, student.id))
+        self.__changed()
+
+    def get_all_ids(self):
+        """
+        Return a list of all student IDs in the repository.
+        """
+        return [row[0] for row in self._connection.execute("SELECT id FROM students ORDER BY id")]
@@ -1,61 +1,111 @@
+import os
+
 from src.domain.student import Student
+from src.instrumentation.stats import timed
+from src.repository.compression import NONE, open_file
+from src.repository.flush_policy import FlushController
 from src.repository.memory_student import StudentRepository
 
 
+def read_students(filename):
+    """
+    Parse a students text file line by line, yielding one student at a time.
+    A missing file yields nothing.
+    """
+    try:
+        with open_file(filename, "rt") as fin:
+            for line in fin:
+                current_line = line.strip().split(",")
+                if current_line == [""]:
+                    continue
+                yield Student(
+                    current_line[1].strip(),  # Name
+                    int(current_line[0].strip()),  # ID
+                    int(current_line[2].strip())   # Group
+                )
+    except IOError:
+        # It's okay if the file doesn't exist yet
+        pass
+
+
+def format_student(student):
+    """Return the line of a student in the text file."""
+    return f"{student.id},{student.name},{student.group}\n"
+
+
 class StudentTextFileRepository(StudentRepository):
-    def __init__(self, filename):
+    def __init__(self, filename, flush_policy=None, compression=NONE):
+        """
+        :param compression: The codec the file is written with, see src.repository.compression.
+                            Files are read with whatever codec they were written with.
+        """
         super().__init__()
         self.__fileName = filename
+        self.__compression = compression
+        self._flusher = FlushController(self.__save_file, flush_policy)
         self.__load_file()
 
+    @timed()
     def __load_file(self):
         """
         Load students from a text file.
         """
-        lines = []
-        try:
-            with open(self.__fileName, "rt") as fin:
-                lines = fin.readlines()
-        except IOError:
-            # It's okay if the file doesn't exist yet
-            pass
-
-        for line in lines:
-            current_line = line.strip().split(",")
-            new_student = Student(
-                current_line[1].strip(),  # Name
-                int(current_line[0].strip()),  # ID
-                int(current_line[2].strip())   # Group
-            )
+        for new_student in read_students(self.__fileName):
             self._students[new_student.id] = new_student
+        self._rebuild_indexes()
 
     def __save_file(self):
         """
         Save all students to a text file.
         """
-        with open(self.__fileName, "wt") as fout:
-            for student in self._students.values():
-                student_string = f"{student.id},{student.name},{student.group}\n"
-                fout.write(student_string)
+        with open_file(self.__fileName, "wt", self.__compression) as fout:
+            for student in self.iter_students():
+                fout.write(format_student(student))
+        return os.path.getsize(self.__fileName)
+
+    @property
+    def dirty(self):
+        return self._flusher.dirty
+
+    def flush(self):
+        """
+        Write pending changes to the file.
+        """
+        self._flusher.flush()
 
     def add_student(self, student):
         """
         Add a student to the repository and save to file.
         """
         super().add_student(student)
-        self.__save_file()
+        self._flusher.changed()
+
+    def add_students_bulk(self, students):
+        """
+        Add a batch of students to the repository and save to file once.
+        """
+        super().add_students_bulk(students)
+        self._flusher.changed()
 
     def remove_student(self, student_id, grade_repo):
         """
         Remove a student by ID and save changes to file.
         """
         super().remove_student(student_id, grade_repo)
-        self.__save_file()
+        self._flusher.changed()
+
+    def remove_students_bulk(self, student_ids, grade_repo):
+        """
+        Remove a batch of students and their grades, and save to file once.
+        """
+        removed = super().remove_students_bulk(student_ids, grade_repo)
+        self._flusher.changed()
+        return removed
 
     def update_student(self, student_id, new_name=None, new_group=None):
         """
         Update a student's details and save changes to file.
         """
         updated_student = super().update_student(student_id, new_name, new_group)
-        self.__save_file()
+        self._flusher.changed()
         return updated_student
@@ -0,0 +1,149 @@
+import contextlib
+import itertools
+import threading
+
+# Methods whose name starts with one of these change the repository; every other method is a read
+WRITE_PREFIXES = ("add", "remove", "update", "delete", "give_assignment", "flush", "close", "compact")
+
+
+class ReadWriteLock:
+    """
+    Lets any number of readers in at once, or a single writer.
+    Writers are preferred: once a writer waits, new readers queue behind it, so a steady stream of
+    report threads cannot starve the writes. A thread already holding the lock can take it again, e.g. by
+    calling repository methods inside locked(), but a reader cannot upgrade itself to a writer.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = {}  # {thread id: read holds}
+        self.__writer = None  # thread id of the writer
+        self.__write_holds = 0
+        self.__waiting_writers = 0
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self.__condition:
+            if me not in self.__readers and self.__writer != me:
+                while self.__writer is not None or self.__waiting_writers:
+                    self.__condition.wait()
+            self.__readers[me] = self.__readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self.__condition:
+            self.__readers[me] -= 1
+            if not self.__readers[me]:
+                del self.__readers[me]
+                if not self.__readers:
+                    self.__condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self.__condition:
+            if self.__writer == me:
+                self.__write_holds += 1
+                return
+            if me in self.__readers:
+                raise RuntimeError("A thread holding the read lock cannot take the write lock.")
+            self.__waiting_writers += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting_writers -= 1
+            self.__writer = me
+            self.__write_holds = 1
+
+    def release_write(self):
+        with self.__condition:
+            self.__write_holds -= 1
+            if not self.__write_holds:
+                self.__writer = None
+                self.__condition.notify_all()
+
+    @contextlib.contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+# Locks are always taken in creation order, so callers locking several repositories cannot deadlock
+_lock_order = itertools.count()
+
+
+@contextlib.contextmanager
+def locked(*repositories, write=False):
+    """
+    Hold the read (or write) locks of several ThreadSafeRepository objects at once, e.g. to read the students
+    and their grades as one consistent snapshot. Other objects are ignored.
+    """
+    proxies = sorted({id(repo): repo for repo in repositories if isinstance(repo, ThreadSafeRepository)}.values(),
+                     key=lambda repo: repo._order)
+    with contextlib.ExitStack() as stack:
+        for proxy in proxies:
+            stack.enter_context(proxy._lock.write() if write else proxy._lock.read())
+        yield
+
+
+class ThreadSafeRepository:
+    """
+    Wraps a student, assignment or grade repository so that it can be shared between threads.
+
+    Reads run under the repository's read lock, so many report threads can read at once, and writes
+    (the methods named in WRITE_PREFIXES) run alone under its write lock. A method that is given other
+    ThreadSafeRepository objects, like remove_student(student_id, grade_repo), takes their locks as well
+    before it starts and works on the wrapped repositories, so a cascading delete is atomic: no reader sees
+    the student gone while their grades are still there.
+    The iter_* methods return an iterator over a snapshot taken under the read lock, and container
+    attributes like `grades` are returned as shallow copies, since a live view cannot outlive the lock.
+    """
+
+    def __init__(self, repo):
+        self._repo = repo
+        self._lock = ReadWriteLock()
+        self._order = next(_lock_order)
+
+    @property
+    def wrapped(self):
+        return self._repo
+
+    def __getattr__(self, name):
+        # Only called for names not found on the proxy itself, i.e. the wrapped repository's attributes
+        value = getattr(self._repo, name)
+        if not callable(value):
+            if isinstance(value, (dict, list, set)):
+                with self._lock.read():
+                    return type(value)(getattr(self._repo, name))
+            return value
+        if name.startswith("_"):
+            return value
+
+        write = name.startswith(WRITE_PREFIXES)
+        snapshot = name.startswith("iter_")
+
+        def call(*args, **kwargs):
+            repositories = [self, *args, *kwargs.values()]
+            args = [arg.wrapped if isinstance(arg, ThreadSafeRepository) else arg for arg in args]
+            kwargs = {key: arg.wrapped if isinstance(arg, ThreadSafeRepository) else arg for key, arg in kwargs.items()}
+            with locked(*repositories, write=write):
+                result = value(*args, **kwargs)
+                if snapshot:
+                    result = list(result)
+            return iter(result) if snapshot else result
+
+        call.__name__ = name
+        # Cached on the proxy, so later calls skip __getattr__
+        setattr(self, name, call)
+        return call
@@ -0,0 +1,143 @@
+"""
+Thin client of the grade book server. It runs the menu of the interactive UI against the server's
+services and repositories, so every operator works on the same warm in-memory dataset:
+    python -m src.server.client --port 8765
+    python -m src.server.client --unix /tmp/studentmanager.sock
+"""
+import argparse
+import json
+import socket
+
+from src.server import protocol
+
+
+class GradeBookClient:
+    """
+    A blocking connection to a GradeBookServer.
+    call() sends one request and waits for its answer, pipeline() sends several requests before reading
+    the answers, and batch() sends several requests as one line and gets one line back.
+    """
+
+    def __init__(self, host=protocol.DEFAULT_HOST, port=protocol.DEFAULT_PORT, path=None):
+        """
+        :param path: Connect to this Unix socket instead of host:port.
+        """
+        if path is not None:
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.__socket.connect(path)
+        else:
+            self.__socket = socket.create_connection((host, port))
+        self.__file = self.__socket.makefile("rwb")
+        self.__next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.__file.close()
+        self.__socket.close()
+
+    def __request(self, target, method, args):
+        self.__next_id += 1
+        return {"id": self.__next_id, "target": target, "method": method, "args": protocol.encode(list(args))}
+
+    def __read_line(self):
+        line = self.__file.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        return json.loads(line)
+
+    @staticmethod
+    def __results(responses):
+        # Every answer is read before raising, so the connection stays in step with the server
+        for response in responses:
+            if "error" in response:
+                protocol.raise_error(response["error"])
+        return [protocol.decode(response["result"]) for response in responses]
+
+    def call(self, target, method, *args):
+        return self.pipeline([(target, method, args)])[0]
+
+    def pipeline(self, calls):
+        """
+        Send every call on its own line without waiting, then read the answers in order.
+        :param calls: An iterable of (target, method, args) tuples.
+        :return: The list of results. If a call failed, its exception is raised once all answers are read.
+        """
+        requests = [self.__request(target, method, args) for target, method, args in calls]
+        self.__file.write(b"".join(protocol.dumps(request) for request in requests))
+        self.__file.flush()
+        return self.__results([self.__read_line() for _ in requests])
+
+    def batch(self, calls):
+        """
+        Send the calls as one batch line and read the one answer line.
+        :param calls: An iterable of (target, method, args) tuples.
+        :return: The list of results. If a call failed, its exception is raised.
+        """
+        self.__file.write(protocol.dumps([self.__request(target, method, args) for target, method, args in calls]))
+        self.__file.flush()
+        return self.__results(self.__read_line())
+
+    def proxy(self, target):
+        return RemoteProxy(self, target)
+
+
+class RemoteProxy(protocol.Reference):
+    """
+    Stands in for one of the server's services or repositories: calling a method calls it on the server.
+    Passed as an argument, it stands for the server's own object.
+    """
+
+    def __init__(self, client, target):
+        super().__init__(target)
+        self._client = client
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args):
+            return self._client.call(self._target, name, *args)
+
+        call.__name__ = name
+        return call
+
+
+class RemoteUndoService(RemoteProxy):
+    """
+    The server's undo service. The server-side services record their own operations,
+    so the operations the menu flows record as well are not sent.
+    """
+
+    def __init__(self, client):
+        super().__init__(client, "undo")
+
+    def record(self, operation):
+        pass
+
+    @property
+    def evicted_operations(self):
+        return self._client.call("undo", "evicted_operations")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work on a grade book served by src.server.server.")
+    parser.add_argument("--host", default=protocol.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="connect to this Unix socket instead of a TCP port")
+    arguments = parser.parse_args(argv)
+
+    from src.ui.ui import run_menu_loop
+
+    with GradeBookClient(arguments.host, arguments.port, arguments.unix) as client:
+        run_menu_loop(client.proxy("students"), client.proxy("assignments"), client.proxy("grades"),
+                      client.proxy("student_repo"), client.proxy("assignment_repo"), client.proxy("grade_repo"),
+                      RemoteUndoService(client))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+The line-delimited JSON protocol of the grade book server.
+
+Every request is one line holding a JSON object:
+    {"id": 1, "target": "students", "method": "add", "args": [...]}
+and is answered by one line holding {"id": 1, "result": ...} or {"id": 1, "error": {"type": ..., "message": ...}}.
+A line holding a JSON array of requests is a batch: it is answered by one line with the array of responses.
+Clients may send several lines before reading the answers (pipelining); a connection answers in request order.
+
+Values that JSON has no type for (domain objects, tuples, sets, dates and dicts with non-string keys)
+are written as {"__type__": name, ...} objects. A Reference to one of the server's targets, e.g. the
+grade repository passed to AssignmentService.remove_assignment, is sent by name and resolved by the server.
+"""
+import datetime
+import json
+
+from src.domain.assigment import Assignment
+from src.domain.grade import Grade
+from src.domain.student import Student
+from src.exceptions import exceptions
+from src.services.undo_service import UndoRedoError
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# The longest request line the server accepts; bulk calls carry all of their entities on one line
+MAX_LINE = 64 * 1024 * 1024
+
+
+class RemoteError(Exception):
+    """Raised by the client for a server error that has no matching local exception type."""
+    pass
+
+
+class Reference:
+    """Names one of the server's targets, like "grade_repo"."""
+
+    def __init__(self, target):
+        self._target = target
+
+
+# The exceptions that are raised again with their own type on the client
+ERRORS = {cls.__name__: cls for cls in vars(exceptions).values()
+          if isinstance(cls, type) and issubclass(cls, Exception)}
+ERRORS.update({cls.__name__: cls for cls in (UndoRedoError, ValueError, KeyError, TypeError, AttributeError)})
+
+
+def encode(value):
+    """Turn a value into something json.dumps accepts."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, Reference):
+        return {"__type__": "ref", "target": value._target}
+    if isinstance(value, Student):
+        return {"__type__": "Student", "name": value.name, "id": value.id, "group": value.group}
+    if isinstance(value, Assignment):
+        return {"__type__": "Assignment", "id": value.id, "description": value.description,
+                "deadline": encode(value.deadline)}
+    if isinstance(value, Grade):
+        return {"__type__": "Grade", "assignment_id": value.id, "student_id": value.student, "value": value.value}
+    if isinstance(value, tuple):
+        return {"__type__": "tuple", "items": [encode(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"__type__": "set", "items": [encode(item) for item in value]}
+    if isinstance(value, datetime.date):
+        return {"__type__": "date", "value": value.isoformat()}
+    if isinstance(value, dict):
+        return {"__type__": "dict", "items": [[encode(key), encode(item)] for key, item in value.items()]}
+    # Other iterables, e.g. the generators returned by the iter_* methods
+    return [encode(item) for item in value]
+
+
+def decode(value, targets=None):
+    """
+    Turn a json.loads value back into the values encode() was given.
+    :param targets: The server's {name: object} map that references are resolved against.
+    """
+    if isinstance(value, list):
+        return [decode(item, targets) for item in value]
+    if not isinstance(value, dict):
+        return value
+    kind = value.get("__type__")
+    if kind == "ref":
+        if targets is None:
+            return Reference(value["target"])
+        return targets[value["target"]]
+    if kind == "Student":
+        return Student(value["name"], value["id"], value["group"])
+    if kind == "Assignment":
+        return Assignment(value["id"], value["description"], decode(value["deadline"]))
+    if kind == "Grade":
+        return Grade(value["assignment_id"], value["student_id"], value["value"])
+    if kind == "tuple":
+        return tuple(decode(item, targets) for item in value["items"])
+    if kind == "set":
+        return {decode(item, targets) for item in value["items"]}
+    if kind == "date":
+        return datetime.date.fromisoformat(value["value"])
+    if kind == "dict":
+        return {decode(key, targets): decode(item, targets) for key, item in value["items"]}
+    return {key: decode(item, targets) for key, item in value.items()}
+
+
+def dumps(message):
+    """Serialize one request, response or batch as a protocol line."""
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def error_response(request_id, error):
+    return {"id": request_id, "error": {"type": type(error).__name__, "message": str(error)}}
+
+
+def raise_error(error):
+    """Raise the exception described by the "error" member of a response."""
+    raise ERRORS.get(error["type"], RemoteError)(error["message"])
@@ -0,0 +1,174 @@
+"""
+Serve one in-memory grade book to many clients over a local TCP or Unix socket.
+
+Run from the directory holding settings.properties, like the interactive UI:
+    python -m src.server.server --port 8765
+    python -m src.server.server --unix /tmp/studentmanager.sock
+"""
+import argparse
+import asyncio
+import collections.abc
+import json
+
+from src.repository.thread_safe import WRITE_PREFIXES
+from src.server import protocol
+from src.services.async_service import AsyncGradeBook
+
+
+class GradeBookServer:
+    """
+    Holds one set of repositories and services and answers protocol requests from any number of connections.
+    Requests run through an AsyncGradeBook, so writes from all clients are serialized and saved on an executor,
+    while reads are answered from memory in the meantime.
+
+    The targets a request can name are the three services ("students", "assignments", "grades"),
+    the three repositories ("student_repo", "assignment_repo", "grade_repo") and the undo service ("undo").
+    """
+
+    def __init__(self, student_repo, assignment_repo, grade_repo, undo_service=None, executor=None):
+        self.grade_book = AsyncGradeBook(student_repo, assignment_repo, grade_repo, undo_service, executor)
+        # {target: (object, function(method name) -> True for writes)}
+        self.__targets = {
+            "students": (self.grade_book.students.service, self.grade_book.students.writes.__contains__),
+            "assignments": (self.grade_book.assignments.service, self.grade_book.assignments.writes.__contains__),
+            "grades": (self.grade_book.grades.service, self.grade_book.grades.writes.__contains__),
+            "student_repo": (student_repo, self.__is_repository_write),
+            "assignment_repo": (assignment_repo, self.__is_repository_write),
+            "grade_repo": (grade_repo, self.__is_repository_write),
+            "undo": (self.grade_book.undo_service, {"undo", "redo"}.__contains__),
+        }
+        self.__objects = {target: obj for target, (obj, _) in self.__targets.items()}
+        self.__server = None
+        self.__writers = set()  # the stream writers of the open connections
+
+    @staticmethod
+    def __is_repository_write(name):
+        return name.startswith(WRITE_PREFIXES)
+
+    async def call(self, target, method, args=()):
+        """
+        Run one call on a target. Attributes that are not methods, like UndoService.evicted_operations,
+        are returned as they are.
+        """
+        if target not in self.__targets or method.startswith("_"):
+            raise AttributeError(f"Unknown method {target}.{method}.")
+        obj, is_write = self.__targets[target]
+        member = getattr(obj, method)
+        if not callable(member):
+            return member
+        run = self.grade_book.write if is_write(method) else self.grade_book.read
+        result = await run(member, *args)
+        if isinstance(result, collections.abc.Iterator):
+            # The iter_* generators are read to the end before anything else runs on the loop
+            result = list(result)
+        return result
+
+    async def handle(self, request):
+        """
+        Answer one decoded request object.
+        """
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            result = await self.call(request["target"], request["method"], protocol.decode(request.get("args", []), self.__objects))
+            return {"id": request_id, "result": protocol.encode(result)}
+        except Exception as error:
+            return protocol.error_response(request_id, error)
+
+    async def handle_line(self, line):
+        """
+        Answer one protocol line, a single request or a batch.
+        :return: The response line.
+        """
+        try:
+            message = json.loads(line)
+        except ValueError as error:
+            return protocol.dumps(protocol.error_response(None, error))
+        if isinstance(message, list):
+            return protocol.dumps([await self.handle(request) for request in message])
+        return protocol.dumps(await self.handle(message))
+
+    @property
+    def connections(self):
+        """The number of open connections."""
+        return len(self.__writers)
+
+    async def __serve_connection(self, reader, writer):
+        self.__writers.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as error:
+                    # The line is longer than protocol.MAX_LINE; the rest of the stream cannot be framed
+                    writer.write(protocol.dumps(protocol.error_response(None, error)))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(await self.handle_line(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.__writers.discard(writer)
+            writer.close()
+
+    async def start(self, host=protocol.DEFAULT_HOST, port=protocol.DEFAULT_PORT, path=None):
+        """
+        Start listening on a TCP port, or on a Unix socket if `path` is given.
+        :return: The address the server listens on: (host, port) or the socket path.
+        """
+        if path is not None:
+            self.__server = await asyncio.start_unix_server(self.__serve_connection, path, limit=protocol.MAX_LINE)
+            return path
+        self.__server = await asyncio.start_server(self.__serve_connection, host, port, limit=protocol.MAX_LINE)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self.__server.serve_forever()
+
+    async def close(self):
+        """
+        Stop accepting connections, close the open ones and write whatever the flush policies deferred.
+        """
+        if self.__server is not None:
+            self.__server.close()
+            for writer in list(self.__writers):
+                writer.close()
+            await self.__server.wait_closed()
+        await self.grade_book.flush()
+
+
+async def serve(server, host, port, path):
+    address = await server.start(host, port, path)
+    print(f"Serving the grade book on {address}. Press Ctrl+C to stop.")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the grade book to many clients over a local socket.")
+    parser.add_argument("--host", default=protocol.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=protocol.DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on this Unix socket instead of a TCP port")
+    arguments = parser.parse_args(argv)
+
+    from src.services.undo_service import UndoService
+    from src.ui.ui import choose_repository
+
+    student_repo, assignment_repo, grade_repo, settings = choose_repository()
+    undo_service = UndoService(settings.get_undo_max_operations(), settings.get_undo_max_bytes())
+    server = GradeBookServer(student_repo, assignment_repo, grade_repo, undo_service)
+    try:
+        asyncio.run(serve(server, arguments.host, arguments.port, arguments.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        settings.save_repositories(student_repo, assignment_repo, grade_repo)
+
+
+if __name__ == "__main__":
+    main()
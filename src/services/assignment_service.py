@@ -6,15 +6,17 @@ from src.services.grade_service import GradeService
 from src.domain.student import Student
 from src.domain.assigment import Assignment
 from src.domain.grade import Grade
-from datetime import datetime
 
 from src.services.undo_service import UndoService, FunctionCall, Operation
 
 class AssignmentService:
-    def __init__(self, assignment_repo: AssignmentRepository, student_repo: StudentRepository, undo_service: UndoService):
+    def __init__(self, assignment_repo: AssignmentRepository, student_repo: StudentRepository, undo_service: UndoService,
+                 grade_repo: GradeRepository = None):
         self._assignment_repo = assignment_repo
         self._student_repo = student_repo
         self._undo_service = undo_service
+        # When given, assignments handed out to students are also stored as ungraded rows in the grade repository
+        self._grade_repo = grade_repo
         self._student_assignments = {}  # Tracks assignments given to students {student_id: [assignment_id, ...]}
 
     def get_assignment(self, assignment_id: int):
@@ -56,15 +58,20 @@ class AssignmentService:
         if not assignment:
             raise ValueError(f"Assignment with ID {assignment_id} not found.")
 
+        # The grades are captured before they are removed, so undo can put them back in one write
+        removed_grades = [(student_id, assignment_id, grade_value)
+                          for student_id, grade_value in grade_repo.get_grades_for_assignment(assignment_id)]
+
         # Define undo and redo functions for removing an assignment
         def undo_remove():
             self._assignment_repo.add_assignment(assignment)
+            if removed_grades:
+                grade_repo.add_grades_bulk(removed_grades)
 
         def redo_remove():
             self._assignment_repo.remove_assignment(assignment_id, grade_repo)
 
-        # Remove the assignment and associated grades
-        grade_repo.remove_grades_for_assignment(assignment_id)
+        # Remove the assignment; the repository also removes its grades
         self._assignment_repo.remove_assignment(assignment_id, grade_repo)
 
         # Record the operation for undo/redo
@@ -120,6 +127,7 @@ class AssignmentService:
     def assign_to_students(self, assignment_id: int, student_ids: list[int]):
         """
         Assigns an assignment to a list of students. If a student already has the assignment, it will not be added again.
+        The whole batch is written to the grade repository at once and recorded as a single undoable operation.
         :param assignment_id: The ID of the assignment to assign.
         :param student_ids: A list of student IDs to assign the assignment to.
         """
@@ -128,14 +136,26 @@ class AssignmentService:
         if not assignment:
             raise ValueError(f"Assignment with ID {assignment_id} does not exist.")
 
-        students_before = {student_id: self._student_assignments.get(student_id, []) for student_id in student_ids}
+        # Validate every student before changing anything
+        for student_id in student_ids:
+            self._student_repo.find_student(student_id)
+
+        students_before = {student_id: list(self._student_assignments.get(student_id, [])) for student_id in student_ids}
+
+        assigned_ids = []
+        if self._grade_repo is not None:
+            assigned_ids = self._assignment_repo.give_assignment_to_students(assignment_id, student_ids, self._grade_repo)
 
         def undo_assign():
             for student_id in student_ids:
                 if student_id in self._student_assignments:
                     self._student_assignments[student_id] = students_before.get(student_id, [])
+            if assigned_ids:
+                self._grade_repo.remove_grades_bulk([(student_id, assignment_id) for student_id in assigned_ids])
 
         def redo_assign():
+            if assigned_ids:
+                self._grade_repo.add_grades_bulk([(student_id, assignment_id, None) for student_id in assigned_ids])
             for student_id in student_ids:
                 if student_id not in self._student_assignments:
                     self._student_assignments[student_id] = []
@@ -162,9 +182,7 @@ class AssignmentService:
         :param group: The group number to assign the assignment to.
         """
         # Get all students in the group
-        students_in_group = [
-            student.id for student in self._student_repo.list_all() if student.group == group
-        ]
+        students_in_group = [student.id for student in self._student_repo.students_in_group(group)]
         if not students_in_group:
             raise ValueError(f"No students found in group {group}.")
         # Assign to all students in the group
@@ -194,24 +212,23 @@ class AssignmentService:
         :param grade_repo: The grade repository to check for grades.
         :return: List of students who are late.
         """
-        from datetime import datetime
+        # Deadlines are already parsed and indexed by the repository, so this is a set lookup per pair
+        overdue_assignments = set(self._assignment_repo.get_overdue_assignments())
 
         late_students = set()
 
         for student_id, assignment_ids in self._student_assignments.items():
             for assignment_id in assignment_ids:
-                assignment = self._assignment_repo.get(assignment_id)
-
-                # Check if the assignment exists and has a valid deadline
-                if not assignment:
+                if assignment_id not in overdue_assignments:
                     continue
 
-                # Check if the grade is None (ungraded) and the deadline has passed
+                # Check if the grade is None (ungraded)
                 grade = grade_repo.get_grade_for_assig(student_id, assignment_id)
-                if grade is None and datetime.strptime(assignment.deadline, "%Y-%m-%d") < datetime.now():
+                if grade is None:
                     student = self._student_repo.find_student(student_id)
                     if student:
                         late_students.add(student)
+                    break
 
         return list(late_students)
 
@@ -0,0 +1,123 @@
+import asyncio
+
+from src.repository.flush_policy import deferred_flushes
+from src.services.assignment_service import AssignmentService
+from src.services.grade_service import GradeService
+from src.services.student_service import StudentService
+from src.services.undo_service import UndoService
+
+# The service methods that change data; every other public method is a read
+STUDENT_WRITES = frozenset({"add", "add_bulk", "remove", "update"})
+ASSIGNMENT_WRITES = frozenset({"add_assignment", "remove_assignment", "update_assignment",
+                               "assign_to_students", "assign_to_group"})
+GRADE_WRITES = frozenset({"grade_student", "add_grades_bulk", "remove_grade"})
+
+
+class AsyncService:
+    """
+    Async view of one service: awaiting one of its methods runs the service method through the grade book,
+    as a write for the names in `writes` and as a read otherwise.
+    """
+
+    def __init__(self, service, writes, grade_book):
+        self.__service = service
+        self.__writes = writes
+        self.__grade_book = grade_book
+
+    @property
+    def service(self):
+        """The synchronous service behind this view."""
+        return self.__service
+
+    @property
+    def writes(self):
+        """The names of the service methods that run as writes."""
+        return self.__writes
+
+    def __getattr__(self, name):
+        function = getattr(self.__service, name)
+        if name.startswith("_") or not callable(function):
+            raise AttributeError(f"{type(self.__service).__name__}.{name} is not a public service method.")
+        run = self.__grade_book.write if name in self.__writes else self.__grade_book.read
+
+        async def call(*args, **kwargs):
+            return await run(function, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class AsyncGradeBook:
+    """
+    asyncio facade over the student, assignment and grade services, for embedding them in an async application.
+
+    Writes are serialized by an asyncio lock. A write changes the repositories on the event loop thread with
+    their flushes held back, then the saves the flush policies ask for run on an executor, so a slow file save
+    never blocks the event loop. The lock stays held until the saves finish, so the next write waits for them,
+    while reads, which only look at the in-memory state, are served in the meantime.
+    SQLite connections can only be used from the thread that opened them, so SQLite commits stay on the loop.
+    """
+
+    def __init__(self, student_repo, assignment_repo, grade_repo, undo_service: UndoService = None, executor=None):
+        """
+        :param executor: The concurrent.futures executor for the saves, or None for the loop's default one.
+        """
+        self.__repositories = (student_repo, assignment_repo, grade_repo)
+        self.__executor = executor
+        self.__write_lock = asyncio.Lock()
+        self.undo_service = undo_service or UndoService()
+        self.students = AsyncService(StudentService(student_repo, grade_repo, self.undo_service),
+                                     STUDENT_WRITES, self)
+        self.assignments = AsyncService(AssignmentService(assignment_repo, student_repo, self.undo_service, grade_repo),
+                                        ASSIGNMENT_WRITES, self)
+        self.grades = AsyncService(GradeService(grade_repo, student_repo, assignment_repo, self.undo_service),
+                                   GRADE_WRITES, self)
+
+    @property
+    def saving(self):
+        """True while a write or its saves are in progress."""
+        return self.__write_lock.locked()
+
+    async def read(self, function, *args, **kwargs):
+        """
+        Run a read-only function. It does not wait for saves in progress.
+        """
+        return function(*args, **kwargs)
+
+    async def write(self, function, *args, **kwargs):
+        """
+        Run a mutating function once the previous write and its saves have finished,
+        then run the saves its changes are due for.
+        """
+        async with self.__write_lock:
+            with deferred_flushes(*self.__repositories, flush=False):
+                result = function(*args, **kwargs)
+            await self.__save(lambda flusher: flusher.flush_if_due())
+        return result
+
+    async def undo(self):
+        await self.write(self.undo_service.undo)
+
+    async def redo(self):
+        await self.write(self.undo_service.redo)
+
+    async def flush(self):
+        """
+        Write all pending changes, whatever the flush policies say, e.g. before the application exits.
+        """
+        async with self.__write_lock:
+            await self.__save(lambda flusher: flusher.flush())
+
+    async def __save(self, save):
+        loop = asyncio.get_running_loop()
+        saves = []
+        for repo in self.__repositories:
+            flusher = getattr(repo, "_flusher", None)
+            if flusher is None or not flusher.dirty:
+                continue
+            if hasattr(repo, "_connection"):
+                save(flusher)
+            else:
+                # Each repository writes its own file, so the saves can run side by side
+                saves.append(loop.run_in_executor(self.__executor, save, flusher))
+        await asyncio.gather(*saves)
@@ -4,17 +4,24 @@ from src.repository.memory_grade import GradeRepository
 from src.services.student_service import StudentService
 from src.domain.student import Student
 from src.domain.assigment import Assignment
-from datetime import datetime, date
+from src.exceptions.exceptions import StudentNotFoundError
 
 from src.services.undo_service import FunctionCall, Operation, UndoService
 
 
 class GradeService:
-    def __init__(self, grade_repo: GradeRepository, student_repo: StudentRepository, assignment_repo: AssignmentRepository, undo_service: UndoService ):
+    def __init__(self, grade_repo: GradeRepository, student_repo: StudentRepository, assignment_repo: AssignmentRepository, undo_service: UndoService,
+                 report_engine=None):
+        """
+        :param report_engine: A ParallelReportEngine that builds the rankings and the ungraded-student reports from
+                              sharded grade rows on worker processes, or None to build them from the repository.
+        """
         self._grade_repo = grade_repo
         self._student_repo = student_repo
         self._assignment_repo = assignment_repo
         self._undo_service = undo_service
+        self._report_engine = report_engine
+        self._rankings = {}  # {include_ungraded: ((grade_repo.version, student_repo.version), ranking)}
 
     def grade_student(self, student_id: int, assignment_id: int, grade_value: int):
         """
@@ -31,7 +38,7 @@ class GradeService:
             raise ValueError(f"Assignment with ID {assignment_id} does not exist.")
 
         # Add a default grade of None if not already present
-        if assignment_id not in self._grade_repo.get_assignments_for_student(student_id):
+        if not self._grade_repo.has_grade(student_id, assignment_id):
             self._grade_repo.add_grade(student_id, assignment_id, None)
 
         # Ensure the grade is not already set
@@ -55,6 +62,39 @@ class GradeService:
         operation = Operation(undo_function, redo_function)
         self._undo_service.record(operation)
 
+    def add_grades_bulk(self, entries):
+        """
+        Adds or replaces a batch of grades with one repository write, recorded as a single undoable operation.
+        :param entries: An iterable of (student_id, assignment_id, grade_value) tuples.
+        """
+        entries = list(entries)
+
+        # Validate the whole batch before touching the repository
+        for student_id, assignment_id, _ in entries:
+            self._student_repo.find_student(student_id)
+            self._assignment_repo.get(assignment_id)
+
+        new_keys = [(student_id, assignment_id) for student_id, assignment_id, _ in entries
+                    if not self._grade_repo.has_grade(student_id, assignment_id)]
+        previous_entries = [(student_id, assignment_id, self._grade_repo.get_grade_for_assig(student_id, assignment_id))
+                            for student_id, assignment_id, _ in entries
+                            if self._grade_repo.has_grade(student_id, assignment_id)]
+
+        def undo_add():
+            self._grade_repo.remove_grades_bulk(new_keys)
+            if previous_entries:
+                self._grade_repo.add_grades_bulk(previous_entries)
+
+        def redo_add():
+            self._grade_repo.add_grades_bulk(entries)
+
+        self._grade_repo.add_grades_bulk(entries)
+
+        undo_function = FunctionCall(undo_add)
+        redo_function = FunctionCall(redo_add)
+        operation = Operation(undo_function, redo_function)
+        self._undo_service.record(operation)
+
     def get_ungraded_assignments_for_student(self, student_id: int):
         """
         Returns a list of ungraded assignments for a student.
@@ -64,17 +104,8 @@ class GradeService:
         if not student:
             raise ValueError(f"Student with ID {student_id} does not exist.")
 
-        # Get all assignments assigned to the student
-        all_assignments = self._grade_repo.get_assignments_for_student(student_id)
-
-        # Check the grade values for each assignment
-        ungraded_assignments = []
-        for assignment_id in all_assignments:
-            grade_value = self._grade_repo.get_grade_for_assig(student_id, assignment_id)
-            if grade_value is None:  # Only include ungraded assignments
-                ungraded_assignments.append(assignment_id)
-
-        return ungraded_assignments
+        # The grade repository filters the student's assignments down to the ungraded ones
+        return self._grade_repo.get_ungraded_assignments(student_id)
 
     def get_students_with_assignment_ordered_by_grade(self, assignment_id: int):
         """
@@ -85,16 +116,24 @@ class GradeService:
         if not assignment:
             raise ValueError(f"Assignment with ID {assignment_id} does not exist.")
 
+        if self._joins_students():
+            return self._grade_repo.assignment_students_by_grade(self._student_repo, assignment_id)
+
+        # The repository, or the report engine, returns the rows already sorted by grade descending
+        if self._report_engine is not None:
+            rows = self._report_engine.assignment_ranking(self._grade_repo, assignment_id)
+        else:
+            rows = self._grade_repo.get_grades_for_assignment_by_grade(assignment_id)
         students_with_grades = []
-        for (assign_id, student_id), grade_value in self._grade_repo.grades.items():
-            if assign_id == assignment_id:
+        for student_id, grade_value in rows:
+            try:
                 student = self._student_repo.find_student(student_id)
-                if student:
-                    grade = grade_value if grade_value is not None else 0  # Treat None grades as 0
-                    students_with_grades.append((student, grade))
-
-        # Sort students by grade descending
-        return sorted(students_with_grades, key=lambda x: x[1], reverse=True)
+            except StudentNotFoundError:
+                # Grades left behind by a removed student are skipped, as by the joined query
+                continue
+            grade = grade_value if grade_value is not None else 0  # Treat None grades as 0
+            students_with_grades.append((student, grade))
+        return students_with_grades
 
     def remove_grade(self, student_id, assignment_id):
         # Validate that the grade exists
@@ -104,88 +143,130 @@ class GradeService:
 
         # Remove the grade
         self._grade_repo.delete(student_id, assignment_id)
-    def get_students_sorted_by_average_grade(self):
+    def _joins_students(self):
         """
-        Get students sorted in descending order of the average grade received for all graded assignments.
+        Whether the reports can be served by the grade repository's queries joined with the students table:
+        both repositories have to live in the same SQLite database, and no report engine is in use.
         """
-        student_grades = {}
-
-        # Collect grades for each student
-        for (assignment_id, student_id), grade_value in self._grade_repo.grades.items():
-            # Treat None grades as 0 for average calculation
-            if student_id not in student_grades:
-                student_grades[student_id] = []
-            student_grades[student_id].append(grade_value if grade_value is not None else 0)
+        connection = getattr(self._grade_repo, "_connection", None)
+        return (self._report_engine is None and connection is not None
+                and getattr(self._student_repo, "_connection", None) is connection
+                and hasattr(self._grade_repo, "ranked_students"))
 
-        # Include students with no grades
-        for student_id in self._student_repo.get_all_ids():
-            if student_id not in student_grades:
-                student_grades[student_id] = []
+    def _ranking(self, include_ungraded):
+        """
+        Return all students ranked descending by average grade, and by ascending student ID on equal averages,
+        built from the repository's running aggregates or by the report engine.
+        The ranking is cached until either repository records a write.
+        :param include_ungraded: If True, ungraded assignments count as 0 in the average.
+        :return: A list of (student, average) tuples.
+        """
+        versions = (self._grade_repo.version, self._student_repo.version)
+        cached = self._rankings.get(include_ungraded)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+
+        if self._joins_students():
+            ranking = self._grade_repo.ranked_students(self._student_repo, include_ungraded)
+            self._rankings[include_ungraded] = (versions, ranking)
+            return ranking
+
+        if self._report_engine is not None:
+            ranked = self._report_engine.ranked_averages(self._grade_repo, include_ungraded)
+        else:
+            ranked = sorted(self._grade_repo.average_grades(include_ungraded).items(), key=lambda x: (-x[1], x[0]))
+        ranking = []
+        for student_id, avg_grade in ranked:
+            try:
+                ranking.append((self._student_repo.find_student(student_id), avg_grade))
+            except StudentNotFoundError:
+                # Grades left behind by a removed student are not part of the ranking
+                continue
+
+        # Students without any counted grade rank last with an average of 0
+        averaged = {student_id for student_id, _ in ranked}
+        for student in self._student_repo.iter_students():
+            if student.id not in averaged:
+                ranking.append((student, 0.0))
+
+        self._rankings[include_ungraded] = (versions, ranking)
+        return ranking
+
+    def top_k(self, n: int):
+        """
+        Get the n students with the best average over their graded assignments, best first.
+        Served from the cached ranking when it is current, otherwise from a bounded heap over the
+        repository's running aggregates.
+        """
+        cached = self._rankings.get(False)
+        if cached is not None and cached[0] == (self._grade_repo.version, self._student_repo.version):
+            return cached[1][:n]
+
+        best = []
+        for student_id, avg_grade in self._grade_repo.top_k(n):
+            try:
+                best.append((self._student_repo.find_student(student_id), avg_grade))
+            except StudentNotFoundError:
+                continue
+
+        # Not enough graded students: fill up with ungraded ones, who average 0
+        if len(best) < n:
+            ranked_ids = {student.id for student, _ in best}
+            for student in self._student_repo.iter_students():
+                if len(best) == n:
+                    break
+                if student.id not in ranked_ids and self._grade_repo.get_average_for_student(student.id) is None:
+                    best.append((student, 0.0))
+        return best
 
-        # Calculate averages
-        student_averages = []
-        for student_id, grades in student_grades.items():
-            avg_grade = sum(grades) / len(grades) if grades else 0.0
-            student = self._student_repo.find_student(student_id)
-            if student:
-                student_averages.append((student, avg_grade))
+    def get_students_sorted_by_average_grade(self):
+        """
+        Get students sorted in descending order of the average grade received for all assignments,
+        treating ungraded assignments as 0.
+        """
+        return list(self._ranking(include_ungraded=True))
 
-        # Sort by average grade descending
-        return sorted(student_averages, key=lambda x: x[1], reverse=True)
+    def _find_students(self, student_ids):
+        """
+        Map student IDs to students, ordered by ID, skipping IDs that are no longer in the repository.
+        """
+        students = []
+        for student_id in sorted(student_ids):
+            try:
+                students.append(self._student_repo.find_student(student_id))
+            except StudentNotFoundError:
+                continue
+        return students
+
+    def _ungraded_students(self, assignment_ids):
+        """
+        :return: The students with an ungraded row among the given assignments, ordered by ID.
+        """
+        if self._joins_students():
+            return self._grade_repo.ungraded_students(self._student_repo, assignment_ids)
+        if self._report_engine is not None:
+            student_ids = self._report_engine.ungraded_students(self._grade_repo, assignment_ids)
+        else:
+            student_ids = self._grade_repo.get_ungraded_students_for_assignments(assignment_ids)
+        return self._find_students(student_ids)
 
     def get_late_students_with_ungraded_assignments(self):
-        late_students = []
-
-        # Get all students
-        students = self._student_repo.list_all()
-
-        for student in students:
-            student_id = student.id
-
-            # Get ungraded assignments for the student
-            ungraded_assignments = self._assignment_repo.get_ungraded_assignments_for_student(student_id,
-                                                                                              self._grade_repo)
-
-            for assignment_id in ungraded_assignments:
-                # Get the deadline for each assignment
-                deadline = self._assignment_repo.get_deadline_for_assignment(assignment_id)
-
-                # Check if the assignment's deadline has passed
-                if isinstance(deadline, datetime):
-                    assignment_deadline = deadline.date()
-                elif isinstance(deadline, date):
-                    assignment_deadline = deadline
-
-                # Compare only dates (without time)
-                if assignment_deadline < datetime.now().date():
-                    late_students.append(student)
-                    break  # No need to check further assignments for this student
+        """
+        Get the students with an ungraded assignment whose deadline has passed.
+        Only the overdue assignments, found by a range scan over the deadline index, are looked at.
+        """
+        overdue_assignments = self._assignment_repo.get_overdue_assignments()
+        return self._ungraded_students(overdue_assignments)
 
-        return late_students
+    def get_students_with_assignments_due_within(self, days: int):
+        """
+        Get the students with an ungraded assignment due from today up to `days` days from now.
+        """
+        due_assignments = self._assignment_repo.get_assignments_due_within(days)
+        return self._ungraded_students(due_assignments)
 
     def get_students_with_best_grades(self):
-        students_with_grades = []
-
-        # Step 1: Get all students
-        students = self._student_repo.list_all()
-
-        # Step 2: Calculate the average grade for each student
-        for student in students:
-            student_id = student.id
-
-            # Get all grades for this student
-            grades = self._grade_repo.get_grades_for_student(student_id)
-
-            # Calculate the average grade (exclude None grades)
-            graded_assignments = [grade for grade in grades if grade[1] is not None]
-            if graded_assignments:
-                avg_grade = sum(grade[1] for grade in graded_assignments) / len(graded_assignments)
-            else:
-                avg_grade = 0  # No grades assigned
-
-            students_with_grades.append((student, avg_grade))
-
-        # Step 3: Sort students by average grade in descending order
-        students_with_grades.sort(key=lambda x: x[1], reverse=True)
-
-        return students_with_grades
\ No newline at end of file
+        """
+        Get students sorted in descending order of the average grade received for all graded assignments.
+        """
+        return list(self._ranking(include_ungraded=False))
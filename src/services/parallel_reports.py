@@ -0,0 +1,166 @@
+"""
+Report generation over grade data split into shards, for grade books too large for one core to report on quickly.
+
+The grade rows are partitioned by student ID into `shards` column sets of compact arrays, so a shard pickles to a
+worker process as a few memory blocks instead of millions of objects. Each worker aggregates and sorts its own
+shard, and the sorted partial results are combined with a k-way merge (heapq.merge). A student's rows all land
+in one shard, so the partial aggregates never have to be combined per student.
+"""
+import heapq
+import os
+from array import array
+
+NAN = float("nan")
+
+
+def _grade_value(value):
+    return None if value != value else value  # NaN != NaN
+
+
+def _shard_averages(student_ids, assignment_ids, values, rows, include_ungraded):
+    """
+    Rank one shard's students by average grade.
+    :return: A list of (-average, student_id) tuples in ascending order, i.e. best average first and,
+             on ties, the smaller student ID, as GradeService._ranking orders them for every repository.
+    """
+    totals = {}  # {student_id: [sum, graded count, row count]}
+    for student_id, value in zip(student_ids, values):
+        total = totals.get(student_id)
+        if total is None:
+            total = totals[student_id] = [0.0, 0, 0]
+        if value == value:
+            total[0] += value
+            total[1] += 1
+        total[2] += 1
+    count = 2 if include_ungraded else 1
+    ranked = [(-total[0] / total[count], student_id) for student_id, total in totals.items() if total[count]]
+    ranked.sort()
+    return ranked
+
+
+def _shard_ungraded_students(student_ids, assignment_ids, values, rows, wanted_assignments):
+    """
+    :return: The sorted IDs of the shard's students with an ungraded row among `wanted_assignments`.
+    """
+    return sorted({student_id for student_id, assignment_id, value in zip(student_ids, assignment_ids, values)
+                   if value != value and assignment_id in wanted_assignments})
+
+
+def _shard_assignment_ranking(student_ids, assignment_ids, values, rows, assignment_id):
+    """
+    :return: A list of (-grade, row, student_id, grade) tuples for the shard's rows of the assignment in ascending
+             order, i.e. best grade first. Ungraded rows are ordered as if graded 0.
+    """
+    ranked = [(-(value if value == value else 0.0), row, student_id, _grade_value(value))
+              for student_id, row_assignment, value, row in zip(student_ids, assignment_ids, values, rows)
+              if row_assignment == assignment_id]
+    ranked.sort()
+    return ranked
+
+
+class GradeShards:
+    """
+    The grade rows of one repository version, partitioned by student ID into column arrays.
+    """
+
+    def __init__(self, grade_repo, count):
+        self.grade_repo = grade_repo
+        self.version = getattr(grade_repo, "version", None)
+        # One (student_ids, assignment_ids, values, rows) column set per shard; ungraded values are NaN and
+        # rows keep the repository's order, which breaks equal grades in the assignment ranking the way
+        # the repositories' stable sorts do
+        self.columns = [(array("q"), array("q"), array("d"), array("q")) for _ in range(count)]
+        grades = getattr(grade_repo, "grades", None)
+        if type(grades) is dict:
+            # The dict-based repositories are read directly, skipping a Grade object per row
+            entries = ((assignment_id, student_id, value) for (assignment_id, student_id), value in grades.items())
+        else:
+            entries = ((grade.id, grade.student, grade.value) for grade in grade_repo.iter_grades())
+        for row, (assignment_id, student_id, value) in enumerate(entries):
+            student_ids, assignment_ids, values, rows = self.columns[student_id % count]
+            student_ids.append(student_id)
+            assignment_ids.append(assignment_id)
+            values.append(NAN if value is None else value)
+            rows.append(row)
+        self.rows = sum(len(columns[0]) for columns in self.columns)
+
+
+class ParallelReportEngine:
+    """
+    Runs the grade reports shard by shard on a pool of worker processes and merges the partial results.
+
+    Partitioning is one pass over the repository, so the shards are kept and reused by every report until the
+    grade repository's version changes. Below `min_rows` rows the shards are processed in this process, since
+    starting workers and pickling shards would cost more than the reports themselves.
+    """
+
+    def __init__(self, workers=None, min_rows=100_000):
+        """
+        :param workers: The number of worker processes and shards; None or 0 for the number of CPUs.
+        :param min_rows: The smallest grade book that is sent to the worker processes.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self.__executor = None
+        self.__shards = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def shards(self, grade_repo):
+        """
+        Return the repository's grade rows partitioned into shards, partitioning again only after a write.
+        Repositories without a version are partitioned on every report.
+        """
+        version = getattr(grade_repo, "version", None)
+        shards = self.__shards
+        if shards is None or shards.grade_repo is not grade_repo or version is None or shards.version != version:
+            self.__shards = GradeShards(grade_repo, self.workers)
+        return self.__shards
+
+    def __map(self, function, shards, *args):
+        calls = [columns + args for columns in shards.columns]
+        if self.workers == 1 or shards.rows < self.min_rows:
+            return [function(*call) for call in calls]
+        if self.__executor is None:
+            # Imported here: it pulls in multiprocessing, which most runs never need
+            from concurrent.futures import ProcessPoolExecutor
+            self.__executor = ProcessPoolExecutor(self.workers)
+        return list(self.__executor.map(function, *zip(*calls)))
+
+    def ranked_averages(self, grade_repo, include_ungraded=False):
+        """
+        Rank the students with grades by average grade, best first and by ascending student ID on ties.
+        :param include_ungraded: If True, ungraded assignments count as 0; otherwise they are skipped.
+        :return: A list of (student_id, average) tuples.
+        """
+        shards = self.shards(grade_repo)
+        partial = self.__map(_shard_averages, shards, include_ungraded)
+        return [(student_id, -negative_average) for negative_average, student_id in heapq.merge(*partial)]
+
+    def ungraded_students(self, grade_repo, assignment_ids):
+        """
+        :return: The sorted IDs of the students with at least one ungraded row among the given assignments.
+        """
+        shards = self.shards(grade_repo)
+        partial = self.__map(_shard_ungraded_students, shards, frozenset(assignment_ids))
+        return list(heapq.merge(*partial))
+
+    def assignment_ranking(self, grade_repo, assignment_id):
+        """
+        Retrieve students and grades for an assignment, ordered descending by grade.
+        Ungraded rows are ordered as if graded 0 and keep their value of None.
+        :return: A list of (student_id, grade_value) tuples.
+        """
+        shards = self.shards(grade_repo)
+        partial = self.__map(_shard_assignment_ranking, shards, assignment_id)
+        return [(student_id, grade_value) for _, _, student_id, grade_value in heapq.merge(*partial)]
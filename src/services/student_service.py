@@ -28,6 +28,32 @@ class StudentService:
         operation = Operation(undo_function, redo_function)
         self._undo_service.record(operation)
 
+    def add_bulk(self, students: list[Student]):
+        """
+        Adds a batch of students with one repository write, recorded as a single undoable operation.
+        """
+        students = list(students)
+
+        student_ids = [student.id for student in students]
+        removed_grades = []
+
+        def undo_add():
+            # Grades given to the batch since it was added are kept for redo
+            removed_grades[:] = self._grade_repo.get_grades_for_students(student_ids)
+            self._repo.remove_students_bulk(student_ids, self._grade_repo)
+
+        def redo_add():
+            self._repo.add_students_bulk(students)
+            if removed_grades:
+                self._grade_repo.add_grades_bulk(removed_grades)
+
+        self._repo.add_students_bulk(students)
+
+        undo_function = FunctionCall(undo_add)
+        redo_function = FunctionCall(redo_add)
+        operation = Operation(undo_function, redo_function)
+        self._undo_service.record(operation)
+
     def get_assignments_and_grades_for_student(self, student_id: int):
         student = self._repo.find_student(student_id)
         if not student:
@@ -40,20 +66,20 @@ class StudentService:
         if not student:
             raise ValueError(f"Student with ID {student_id} does not exist.")
 
+        # The grades are captured before they are removed, so undo can put them back in one write
+        removed_grades = self._grade_repo.get_grades_for_students([student.id])
+
         # Record the removal of a student
         def undo_remove():
             self._repo.add_student(student)  # Add student back
-            # Restore the student's grades
-            for assignment_id, grade in self._grade_repo.get_grades_for_student(student_id):
-                self._grade_repo.add_grade(student.id, assignment_id, grade)
+            if removed_grades:
+                self._grade_repo.add_grades_bulk(removed_grades)
 
         def redo_remove():
             self._repo.remove_student(student.id, self._grade_repo)  # Remove student and grades
-            self._grade_repo.remove_grades_for_student(student.id)
 
-        # Perform the actual operation
+        # Perform the actual operation; the repository also removes the student's grades
         self._repo.remove_student(student.id, self._grade_repo)
-        self._grade_repo.remove_grades_for_student(student.id)
 
         # Record the undo/redo operation
         undo_function = FunctionCall(undo_remove)
@@ -1,3 +1,47 @@
+import sys
+import types
+from collections import deque
+
+from src.repository.flush_policy import deferred_flushes
+
+# Values whose size is just their own sys.getsizeof
+_SCALARS = (str, bytes, int, float, bool, type(None))
+_CONTAINERS = (tuple, list, set, frozenset, deque)
+
+
+def estimate_size(obj, _seen=None):
+    """
+    Estimate the bytes an undo operation keeps alive: its FunctionCalls, their parameters and closure cells,
+    and the data these hold (containers, strings, numbers and slotted domain objects).
+    Anything else, like the services and repositories the closures refer to, is shared with the rest of the
+    application and only counted as a reference.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, _SCALARS):
+        return sys.getsizeof(obj)
+    if isinstance(obj, _CONTAINERS):
+        return sys.getsizeof(obj) + sum(estimate_size(item, seen) for item in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(key, seen) + estimate_size(value, seen)
+                                        for key, value in obj.items())
+    if isinstance(obj, types.FunctionType):
+        cells = obj.__closure__ or ()
+        return sys.getsizeof(obj) + sum(estimate_size(cell.cell_contents, seen) for cell in cells
+                                        if cell.cell_contents is not None)
+    if isinstance(obj, (FunctionCall, Operation, CascadedOperation)):
+        return sys.getsizeof(obj) + estimate_size(vars(obj), seen)
+    slots = getattr(type(obj), "__slots__", None)
+    if slots is not None:
+        # Slotted domain objects: the "__x" slots are stored under their mangled names
+        names = (f"_{type(obj).__name__}{name}" if name.startswith("__") else name for name in slots)
+        return sys.getsizeof(obj) + sum(estimate_size(getattr(obj, name, None), seen) for name in names)
+    return 0
+
+
 class FunctionCall:
     """
     Objects of this class encode calling a function with given parameters
@@ -29,9 +73,19 @@ class Operation:
 
 
 class CascadedOperation:
-    def __init__(self):
+    """
+    An operation made of several function calls, undone and redone in order.
+    The flushes of the given repositories are deferred while the calls run, so a file-backed repository
+    is written once per undo or redo instead of once per call.
+    """
+
+    def __init__(self, *repositories):
+        """
+        :param repositories: The repositories the calls write to.
+        """
         self.__undo_function = []
         self.__redo_function = []
+        self.__repositories = repositories
 
     def add_undo_function(self, undo_function: FunctionCall):
         self.__undo_function.append(undo_function)
@@ -40,14 +94,16 @@ class CascadedOperation:
         self.__redo_function.append(redo_function)
 
     def undo(self):
-        for func in self.__undo_function:
-            # call each function to undo one entity at a time
-            func()
+        with deferred_flushes(*self.__repositories):
+            for func in self.__undo_function:
+                # call each function to undo one entity at a time
+                func()
 
     def redo(self):
-        for func in self.__redo_function:
-            # call each function to redo one entity at a time
-            func()
+        with deferred_flushes(*self.__repositories):
+            for func in self.__redo_function:
+                # call each function to redo one entity at a time
+                func()
 
 
 class UndoRedoError(Exception):
@@ -58,32 +114,69 @@ class UndoService:
     """
     The UI has access to this UndoService and calls undo() or redo() directly
     This service is common across all program entities and functionalities
+
+    The history can be bounded by a number of operations and by the estimated bytes they keep alive.
+    When a new operation goes over a bound, the oldest undoable operations are dropped; the newest one is
+    always kept, so the last action can be undone even if it alone is over the byte bound.
     """
 
-    def __init__(self):
-        self.__undo_stack = []
+    def __init__(self, max_operations=None, max_bytes=None):
+        """
+        :param max_operations: Keep at most this many operations, or any number if None.
+        :param max_bytes: Keep at most this many estimated bytes of operations, or any amount if None.
+        """
+        self.max_operations = max_operations
+        self.max_bytes = max_bytes
+        # Entries are (operation, estimated size); the oldest undo entries are at the left
+        self.__undo_stack = deque()
         self.__redo_stack = []
+        self.__bytes = 0
+        self.evicted_operations = 0
 
     def record(self, operation: Operation):
         # NOTE When an operation that is not undo or redo is made, all stored redos are invalidated
+        self.__bytes -= sum(size for _, size in self.__redo_stack)
         self.__redo_stack.clear()
-        self.__undo_stack.append(operation)
+        size = estimate_size(operation)
+        self.__undo_stack.append((operation, size))
+        self.__bytes += size
+        self.__evict()
+
+    def __evict(self):
+        while len(self.__undo_stack) > 1 and (
+                (self.max_operations is not None and len(self.__undo_stack) > self.max_operations) or
+                (self.max_bytes is not None and self.__bytes > self.max_bytes)):
+            _, size = self.__undo_stack.popleft()
+            self.__bytes -= size
+            self.evicted_operations += 1
+
+    def memory_footprint(self):
+        """
+        Return the estimated bytes kept alive by the undo and redo history, see estimate_size().
+        """
+        return self.__bytes
+
+    def history_length(self):
+        """
+        Return the number of operations that can currently be undone and redone.
+        """
+        return len(self.__undo_stack), len(self.__redo_stack)
 
     def undo(self):
         if len(self.__undo_stack) == 0:
             raise UndoRedoError("No more undos!")
 
-        current_operation = self.__undo_stack.pop()
+        current_operation, size = self.__undo_stack.pop()
         current_operation.undo()
-        self.__redo_stack.append(current_operation)
+        self.__redo_stack.append((current_operation, size))
 
     def redo(self):
         if len(self.__redo_stack) == 0:
             raise UndoRedoError("No more redos!")
 
-        current_operation = self.__redo_stack.pop()
+        current_operation, size = self.__redo_stack.pop()
         current_operation.redo()
-        self.__undo_stack.append(current_operation)
+        self.__undo_stack.append((current_operation, size))
 
 
 if __name__ == "__main__":
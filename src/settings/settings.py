@@ -1,25 +1,18 @@
 import configparser
 import os
+import sys
+
+
 class Settings:
     def __init__(self, filename="settings.properties"):
         self.config = configparser.ConfigParser()
 
-        cwd = os.getcwd()
-        print(f"Current working directory: {cwd}")  # Debug print the cwd
-
-        file_path = os.path.join(cwd, filename)
-        print(f"Loading settings from: {file_path}")  # Debug print the file path
-
+        file_path = os.path.join(os.getcwd(), filename)
         if not os.path.exists(file_path):
-            print(f"Error: The file {file_path} does not exist.")
+            print(f"Error: The file {file_path} does not exist.", file=sys.stderr)
         else:
-            # Read the settings file
             self.config.read(file_path)
 
-            # Debugging: Print the content of the settings file
-            print(f"Debug: Sections in the settings file: {self.config.sections()}")
-            print(f"Debug: Settings content: {dict(self.config.items('DEFAULT'))}")
-
     def get_repository_type(self):
         return self.config.get('DEFAULT', 'repository', fallback='')
 
@@ -32,20 +25,56 @@ class Settings:
     def get_file_for_grades(self):
         return self.config.get('DEFAULT', 'grades', fallback='')
 
+    def get_grades_format(self):
+        return self.config.get('DEFAULT', 'grades_format', fallback='pickle')
+
+    def get_grade_storage(self):
+        return self.config.get('DEFAULT', 'grade_storage', fallback='dict')
+
+    def get_database_file(self):
+        return self.config.get('DEFAULT', 'database', fallback='studentmanager.db')
+
+    def get_grades_journal(self):
+        return self.config.getboolean('DEFAULT', 'grades_journal', fallback=False)
+
+    def get_compression(self):
+        return self.config.get('DEFAULT', 'compression', fallback='none')
+
+    def get_journal_compact_threshold(self):
+        return self.config.getint('DEFAULT', 'journal_compact_threshold', fallback=1000)
+
+    def get_flush_mode(self):
+        return self.config.get('DEFAULT', 'flush', fallback='immediate')
+
+    def get_flush_operations(self):
+        return self.config.getint('DEFAULT', 'flush_operations', fallback=1)
+
+    def get_flush_interval(self):
+        return self.config.getfloat('DEFAULT', 'flush_interval', fallback=0.0)
+
+    def get_undo_max_operations(self):
+        return self.config.getint('DEFAULT', 'undo_max_operations', fallback=None)
+
+    def get_undo_max_bytes(self):
+        return self.config.getint('DEFAULT', 'undo_max_bytes', fallback=None)
+
+    def get_stats_enabled(self):
+        return self.config.getboolean('DEFAULT', 'stats', fallback=False)
+
+    def get_seed_data(self):
+        return self.config.getboolean('DEFAULT', 'seed_data', fallback=True)
+
+    def get_parallel_reports(self):
+        return self.config.getboolean('DEFAULT', 'parallel_reports', fallback=False)
+
+    def get_report_workers(self):
+        return self.config.getint('DEFAULT', 'report_workers', fallback=0)
+
     def save_repositories(self, student_repo, assignment_repo, grade_repo):
         """
-        Saves repositories based on the repository type.
-        If the repository type is 'binaryfiles' or 'textfiles', the save logic is executed.
+        Writes the pending changes of the file repositories, e.g. when the application exits.
+        In-memory repositories have no flush method and nothing to save.
         """
-        repository_type = self.get_repository_type()
-
-        if repository_type == "binaryfiles" or repository_type == "textfiles":
-            # If the repositories have explicit save methods
-            if hasattr(student_repo, "_save_students"):
-                student_repo._save_students()
-            if hasattr(assignment_repo, "_save_assignments"):
-                assignment_repo._save_assignments()
-            if hasattr(grade_repo, "_save_grades"):
-                grade_repo._save_grades()
-        else:
-            print("No save required for in-memory repository.")
+        for repo in (student_repo, assignment_repo, grade_repo):
+            if hasattr(repo, "flush"):
+                repo.flush()
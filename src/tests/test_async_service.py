@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.repository.flush_policy import FlushController
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.student_text_file_repo import StudentTextFileRepository
+from src.services.async_service import AsyncGradeBook
+
+
+class TestAsyncGradeBook(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """Set up a grade book whose student saves block until released."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "students.txt")
+        self.student_repo = StudentTextFileRepository(self.filename)
+        self.release_save = threading.Event()
+        self.saves = []
+        save_file = self.student_repo._flusher._FlushController__save_function
+
+        def blocking_save():
+            self.release_save.wait(5)
+            self.saves.append(None)
+            return save_file()
+
+        self.student_repo._flusher = FlushController(blocking_save)
+        self.grade_book = AsyncGradeBook(self.student_repo, AssignmentRepository(), GradeRepository())
+
+    def tearDown(self):
+        self.release_save.set()
+        self.directory.cleanup()
+
+    async def test_reads_are_served_while_a_save_runs(self):
+        """Test that reads complete during a save, while the next write waits for it."""
+        first = asyncio.create_task(self.grade_book.students.add(Student("Alice", 1, 101)))
+        await asyncio.sleep(0.05)
+        self.assertTrue(self.grade_book.saving)
+        self.assertFalse(first.done(), "The write returned before its save.")
+
+        students = await asyncio.wait_for(self.grade_book.students.list_all(), 1)
+        self.assertEqual([student.name for student in students], ["Alice"])
+        second = asyncio.create_task(self.grade_book.students.add(Student("Bob", 2, 101)))
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.student_repo.get_all_ids(), [1], "A write ran during a save.")
+
+        self.release_save.set()
+        await asyncio.gather(first, second)
+        self.assertEqual(len(self.saves), 2)
+        self.assertEqual(StudentTextFileRepository(self.filename).get_all_ids(), [1, 2])
+
+    async def test_undo_and_errors_go_through_the_write_path(self):
+        """Test that undo is saved like any write and that a failing write releases the lock."""
+        self.release_save.set()
+        await self.grade_book.assignments.add_assignment(Assignment(10, "Essay", "2024-03-01"))
+        await self.grade_book.students.add_bulk([Student("Alice", 1, 101), Student("Bob", 2, 101)])
+        await self.grade_book.undo()
+        self.assertEqual(StudentTextFileRepository(self.filename).get_all_ids(), [])
+
+        with self.assertRaises(ValueError):
+            await self.grade_book.grades.remove_grade(1, 10)
+        self.assertFalse(self.grade_book.saving)
+        with self.assertRaises(AttributeError):
+            self.grade_book.students._repo
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from src.benchmarks import startup
+from src.benchmarks.suite import compare, run_backend
+from src.repository.flush_policy import FlushPolicy
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_run_backend_times_every_operation(self):
+        """Test that a small in-memory run reports a time for each benchmarked operation."""
+        timings = run_backend("memory", 200, 1, FlushPolicy())
+        self.assertIn("give_assignment_to_group", timings)
+        self.assertIn("late_students", timings)
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()), "Negative timing reported.")
+
+    def test_compare_flags_only_real_slowdowns(self):
+        """Test that slowdowns beyond the tolerance and the noise floor are reported as regressions."""
+        baseline = [{"backend": "text", "grades": 1000, "operation": "load", "seconds": 0.010},
+                    {"backend": "text", "grades": 1000, "operation": "undo", "seconds": 0.0001}]
+        results = [{"backend": "text", "grades": 1000, "operation": "load", "seconds": 0.020},
+                   {"backend": "text", "grades": 1000, "operation": "undo", "seconds": 0.0005}]
+        self.assertEqual(compare(results, baseline, 0.25), [(("text", 1000, "load"), 0.010, 0.020)])
+
+
+class TestStartupBenchmark(unittest.TestCase):
+    def test_cold_start_opens_the_configured_backend(self):
+        """Test that a fresh process opens the SQLite backend and reports every startup time."""
+        with tempfile.TemporaryDirectory() as directory:
+            timings = startup.run_once("sqlite", directory)
+            self.assertTrue(os.path.exists(os.path.join(directory, "studentmanager.db")), "SQLite backend not opened.")
+        self.assertEqual(set(timings), {"process", "import_ui", "choose_repository"})
+
+    def test_ui_import_leaves_faker_and_other_backends_unloaded(self):
+        """Test that importing the UI imports neither Faker nor a file or SQLite backend."""
+        probe = ("import sys, src.ui.ui; print(sorted(name for name in sys.modules if name == 'faker' "
+                 "or name.startswith('src.repository.') and ('file' in name or 'sqlite' in name)))")
+        completed = subprocess.run([sys.executable, "-c", probe], cwd=startup.ROOT, capture_output=True,
+                                   text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
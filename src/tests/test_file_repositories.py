@@ -0,0 +1,377 @@
+import datetime
+import gzip
+import os
+import pickle
+import tempfile
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.repository.assig_binary_file_repo import AssignmentBinaryFileRepository
+from src.repository.assignment_text_file_repo import AssignmentTextFileRepository
+from src.repository.compression import CODECS, GZIP, NONE, ZLIB, detect
+from src.repository.flush_policy import FlushController, FlushPolicy
+from src.repository.grade_binary_file_repo import GradeBinaryFileRepository
+from src.repository.grade_record_file_repo import GradeRecordFile, GradeRecordFileRepository, RECORD
+from src.repository.grade_text_file_repo import GradeTextFileRepository
+from src.repository.student_binary_file_repo import StudentBinaryFileRepository
+from src.repository.student_text_file_repo import StudentTextFileRepository
+from src.services.undo_service import CascadedOperation, FunctionCall
+
+
+class TestTextFileLoaders(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary directory for the text files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_text_files_load_line_by_line(self):
+        """Test that the streaming loaders parse every record and skip blank lines."""
+        filename = os.path.join(self.directory.name, "students.txt")
+        with open(filename, "wt") as file:
+            file.write("1,Alice,101\n\n2,Bob,102\n")
+        repo = StudentTextFileRepository(filename)
+        self.assertEqual([student.name for student in repo.iter_students()], ["Alice", "Bob"])
+
+        filename = os.path.join(self.directory.name, "assignments.txt")
+        with open(filename, "wt") as file:
+            file.write("10,Essay,2024-03-01\n20,Lab,2024-04-01\n")
+        assignments = AssignmentTextFileRepository(filename)
+        self.assertEqual([assignment.id for assignment in assignments.iter_assignments()], [10, 20])
+        self.assertEqual(assignments.get_overdue_assignments(datetime.date(2024, 3, 15)), [10])
+
+
+class TestGradeTextFileJournal(unittest.TestCase):
+    def setUp(self):
+        """Set up an empty grades file in a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "grades.txt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_journal_is_replayed_on_load(self):
+        """Test that journaled mutations survive a reload without touching the base file."""
+        repo = GradeTextFileRepository(self.filename, journal=True)
+        repo.add_grade(1, 10, None)
+        repo.add_grade(2, 10, None)
+        repo.update_grade(1, 10, 8)
+        repo.remove_grades_for_student(2)
+        self.assertFalse(os.path.exists(self.filename), "Base file was rewritten in journal mode.")
+
+        reloaded = GradeTextFileRepository(self.filename, journal=True)
+        self.assertEqual(reloaded.grades, {(10, 1): 8.0})
+        self.assertEqual(reloaded.get_students_for_assignment(10), [1])
+
+    def test_journal_is_compacted_past_threshold(self):
+        """Test that the journal is folded into the base file once it reaches the threshold."""
+        repo = GradeTextFileRepository(self.filename, journal=True, compact_threshold=3)
+        repo.add_grade(1, 10, None)
+        repo.add_grade(2, 10, None)
+        repo.add_grade(3, 10, 5)
+        self.assertFalse(os.path.exists(self.filename + ".journal"), "Journal was not compacted.")
+
+        reloaded = GradeTextFileRepository(self.filename)
+        self.assertEqual(len(reloaded.grades), 3)
+
+    def test_torn_journal_record_is_dropped(self):
+        """Test that a journal record cut short by a crash is ignored and truncated, keeping the earlier ones."""
+        repo = GradeTextFileRepository(self.filename, journal=True)
+        repo.add_grade(1, 10, None)
+        repo.update_grade(1, 10, 8)
+        intact_size = os.path.getsize(self.filename + ".journal")
+        with open(self.filename + ".journal", "at") as file:
+            file.write("+,10,3")
+
+        reloaded = GradeTextFileRepository(self.filename, journal=True)
+        self.assertEqual(reloaded.grades, {(10, 1): 8.0})
+        self.assertEqual(os.path.getsize(self.filename + ".journal"), intact_size)
+        reloaded.add_grade(2, 10, 5)
+        self.assertEqual(GradeTextFileRepository(self.filename, journal=True).grades, {(10, 1): 8.0, (10, 2): 5.0})
+
+    def test_failed_compaction_keeps_base_file_and_journal(self):
+        """Test that a compaction whose write fails leaves the old base file and the journal in place."""
+        repo = GradeTextFileRepository(self.filename, journal=True)
+        repo.add_grades_bulk([(student_id, 10, None) for student_id in range(5)])
+        repo.compact()
+        repo.update_grade(1, 10, 8)
+        with open(self.filename, "rb") as file:
+            base = file.read()
+        # The temporary file cannot be created where a directory of that name exists
+        os.mkdir(self.filename + ".tmp")
+        with self.assertRaises(OSError):
+            repo.compact()
+        os.rmdir(self.filename + ".tmp")
+
+        with open(self.filename, "rb") as file:
+            self.assertEqual(file.read(), base)
+        self.assertEqual(GradeTextFileRepository(self.filename, journal=True).grades, repo.grades)
+
+    def test_journal_is_folded_in_when_journaling_is_off(self):
+        """Test that a journal left by a journaled run is applied and removed once journaling is switched off."""
+        repo = GradeTextFileRepository(self.filename, journal=True)
+        repo.add_grade(1, 10, None)
+        repo.update_grade(1, 10, 8)
+
+        plain = GradeTextFileRepository(self.filename)
+        self.assertEqual(plain.grades, {(10, 1): 8.0})
+        self.assertFalse(os.path.exists(self.filename + ".journal"), "The journal was left behind.")
+        plain.update_grade(1, 10, 9)
+        # Switching journaling back on must not replay the old records over the newer base file
+        self.assertEqual(GradeTextFileRepository(self.filename, journal=True).grades, {(10, 1): 9.0})
+
+    def test_bulk_writes_are_persisted(self):
+        """Test that bulk adds and removals reach the file in both modes."""
+        for journal in (False, True):
+            repo = GradeTextFileRepository(self.filename, journal=journal)
+            repo.add_grades_bulk([(student_id, 10, None) for student_id in range(5)])
+            repo.remove_grades_bulk([(0, 10), (1, 10)])
+
+            reloaded = GradeTextFileRepository(self.filename, journal=journal)
+            self.assertEqual(reloaded.get_students_for_assignment(10), [2, 3, 4])
+            reloaded.remove_grades_for_assignment(10)
+
+
+class TestBinaryFileSegments(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary directory for the pickle files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.filename = os.path.join(self.directory.name, "grades.pickle")
+
+    def test_changes_are_appended_and_replayed(self):
+        """Test that a change appends a segment far smaller than the snapshot and survives a reload."""
+        repo = GradeBinaryFileRepository(self.filename)
+        repo.add_grades_bulk([(student_id, 10, None) for student_id in range(500)])
+        snapshot_size = os.path.getsize(self.filename)
+        repo.update_grade(1, 10, 8)
+        repo.remove_grades_for_student(2)
+        self.assertLess(os.path.getsize(self.filename) - snapshot_size, 100, "The change rewrote the snapshot.")
+
+        reloaded = GradeBinaryFileRepository(self.filename)
+        self.assertEqual(reloaded.grades, repo.grades)
+        self.assertEqual(reloaded.get_grade_for_assig(1, 10), 8)
+        self.assertEqual(reloaded.student_totals, repo.student_totals)
+
+    def test_segments_are_compacted_past_threshold(self):
+        """Test that the segments are folded into a new snapshot once they reach the threshold."""
+        filename = os.path.join(self.directory.name, "students.pickle")
+        repo = StudentBinaryFileRepository(filename, compact_threshold=3)
+        repo.add_student(Student("Alice", 1, 101))
+        repo.add_student(Student("Bob", 2, 101))
+        repo.update_student(2, new_group=102)
+        repo.remove_student(1, GradeBinaryFileRepository(self.filename))
+        with open(filename, "rb") as file:
+            self.assertEqual(pickle.load(file), {2: Student("Bob", 2, 102)})
+            self.assertEqual(file.read(), b"", "Segments were left after the compaction.")
+
+        reloaded = StudentBinaryFileRepository(filename, compact_threshold=3)
+        self.assertEqual([(student.name, student.group) for student in reloaded.list_all()], [("Bob", 102)])
+
+    def test_torn_segment_is_dropped(self):
+        """Test that a segment cut short by a crash is ignored and truncated, keeping the earlier changes."""
+        filename = os.path.join(self.directory.name, "assignments.pickle")
+        repo = AssignmentBinaryFileRepository(filename)
+        repo.add_assignment(Assignment(10, "Essay", "2000-01-01"))
+        repo.add_assignment(Assignment(11, "Project", "2000-02-01"))
+        intact_size = os.path.getsize(filename)
+        repo.update_assignment(Assignment(11, "Project, revised", "2000-03-01"))
+        os.truncate(filename, os.path.getsize(filename) - 5)
+
+        reloaded = AssignmentBinaryFileRepository(filename)
+        self.assertEqual([assignment.description for assignment in reloaded.list_assignments()], ["Essay", "Project"])
+        self.assertEqual(os.path.getsize(filename), intact_size)
+
+    def test_plain_snapshot_files_still_load(self):
+        """Test that a file written as one pickled dict, the format before segments, loads unchanged."""
+        with open(self.filename, "wb") as file:
+            pickle.dump({(10, 1): 7, (10, 2): None}, file)
+        repo = GradeBinaryFileRepository(self.filename)
+        self.assertEqual(repo.get_students_for_assignment(10), [1, 2])
+        repo.delete(2, 10)
+        self.assertEqual(GradeBinaryFileRepository(self.filename).grades, {(10, 1): 7})
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary directory for the compressed files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_every_codec_round_trips(self):
+        """Test that the text and pickle repositories reload what they wrote with every codec."""
+        for codec in CODECS:
+            with self.subTest(codec=codec):
+                students = StudentTextFileRepository(self.path(f"students.{codec}"), compression=codec)
+                students.add_student(Student("Alice", 1, 101))
+                grades = GradeBinaryFileRepository(self.path(f"grades.{codec}"), compression=codec)
+                grades.add_grades_bulk([(student_id, 10, student_id % 10 or None) for student_id in range(200)])
+
+                self.assertEqual(detect(self.path(f"grades.{codec}")), codec)
+                self.assertEqual([student.name for student in
+                                  StudentTextFileRepository(self.path(f"students.{codec}")).list_all()], ["Alice"])
+                self.assertEqual(GradeBinaryFileRepository(self.path(f"grades.{codec}")).grades, grades.grades)
+
+    def test_codec_is_detected_on_load(self):
+        """Test that a file keeps loading, and keeps its codec, when the configured compression changes."""
+        filename = self.path("assignments.txt")
+        AssignmentTextFileRepository(filename, compression=GZIP).add_assignment(Assignment(10, "Essay", "2000-01-01"))
+        repo = AssignmentTextFileRepository(filename)
+        self.assertEqual([assignment.description for assignment in repo.list_assignments()], ["Essay"])
+        repo.add_assignment(Assignment(11, "Project", "2000-02-01"))
+        self.assertEqual(detect(filename), NONE)
+
+        students = StudentBinaryFileRepository(self.path("students.pickle"), compression=ZLIB)
+        students.add_student(Student("Alice", 1, 101))
+        # Segments are appended in the snapshot's codec, whatever the repository is configured with
+        reopened = StudentBinaryFileRepository(self.path("students.pickle"))
+        reopened.add_student(Student("Bob", 2, 102))
+        self.assertEqual(detect(self.path("students.pickle")), ZLIB)
+        self.assertEqual(len(StudentBinaryFileRepository(self.path("students.pickle")).list_all()), 2)
+
+    def test_appended_segments_are_replayed(self):
+        """Test that a compressed file is extended by one stream per segment, which all load back."""
+        filename = self.path("grades.pickle")
+        repo = GradeBinaryFileRepository(filename, compression=ZLIB)
+        repo.add_grades_bulk([(student_id, 10, None) for student_id in range(100)])
+        snapshot_size = os.path.getsize(filename)
+        repo.update_grade(1, 10, 8)
+        repo.remove_grades_for_student(2)
+        self.assertGreater(os.path.getsize(filename), snapshot_size)
+        self.assertEqual(GradeBinaryFileRepository(filename).grades, repo.grades)
+
+    def test_torn_compressed_segment_is_compacted_away(self):
+        """Test that a compressed segment cut short is dropped and the file rewritten as a snapshot on load."""
+        filename = self.path("students.pickle")
+        repo = StudentBinaryFileRepository(filename, compression=GZIP)
+        repo.add_student(Student("Alice", 1, 101))
+        repo.add_student(Student("Bob", 2, 102))
+        intact_size = os.path.getsize(filename)
+        repo.update_student(2, new_group=103)
+        os.truncate(filename, (intact_size + os.path.getsize(filename)) // 2)
+
+        reloaded = StudentBinaryFileRepository(filename, compression=GZIP)
+        self.assertEqual([(student.name, student.group) for student in reloaded.list_all()],
+                         [("Alice", 101), ("Bob", 102)])
+        with gzip.open(filename, "rb") as file:
+            self.assertEqual(len(pickle.load(file)), 2)
+            self.assertEqual(file.read(), b"", "The torn segment was left in the file.")
+
+
+class TestGradeRecordFile(unittest.TestCase):
+    def setUp(self):
+        """Set up a record file path in a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "grades.rec")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_grades_survive_reopening(self):
+        """Test that graded, ungraded and removed rows read back the same after a reopen."""
+        repo = GradeRecordFileRepository(self.filename)
+        repo.add_grades_bulk([(1, 10, None), (2, 10, 7.5), (3, 20, 9)])
+        repo.update_grade(1, 10, 6)
+        repo.remove_grades_for_student(3)
+        repo.close()
+
+        reloaded = GradeRecordFileRepository(self.filename)
+        self.assertEqual(dict(reloaded.grades), {(10, 1): 6.0, (10, 2): 7.5})
+        self.assertEqual(reloaded.top_k(1), [(2, 7.5)])
+        reloaded.close()
+
+    def test_free_slots_are_reused_and_file_grows(self):
+        """Test that deleted slots are reused before the file grows, and that it grows when full."""
+        records = GradeRecordFile(self.filename)
+        for student_id in range(GradeRecordFile.INITIAL_CAPACITY):
+            records[(1, student_id)] = None
+        size = os.path.getsize(self.filename)
+        del records[(1, 5)]
+        records[(2, 5)] = 8
+        self.assertEqual(os.path.getsize(self.filename), size, "A free slot was not reused.")
+
+        records[(3, 0)] = 4
+        self.assertGreater(os.path.getsize(self.filename), size, "The file did not grow when full.")
+        self.assertEqual((records[(2, 5)], records[(3, 0)]), (8.0, 4.0))
+        records.close()
+
+    def test_rejects_other_files(self):
+        """Test that a file without the record header is not overwritten."""
+        with open(self.filename, "wb") as file:
+            file.write(b"\x00" * RECORD.size)
+        with self.assertRaises(ValueError):
+            GradeRecordFile(self.filename)
+
+
+class TestFlushPolicy(unittest.TestCase):
+    def setUp(self):
+        """Set up a students file in a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "students.txt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_exit_policy_writes_only_on_flush(self):
+        """Test that changes stay pending until flush() is called."""
+        repo = StudentTextFileRepository(self.filename, FlushPolicy(FlushPolicy.EXIT))
+        repo.add_student(Student("Alice", 1, 101))
+        self.assertTrue(repo.dirty)
+        self.assertFalse(os.path.exists(self.filename), "File was written before flush().")
+
+        repo.flush()
+        self.assertFalse(repo.dirty)
+        self.assertEqual(len(StudentTextFileRepository(self.filename).list_all()), 1)
+
+    def test_operations_policy_writes_every_n_operations(self):
+        """Test that the file is written once the configured number of operations is pending."""
+        repo = StudentTextFileRepository(self.filename, FlushPolicy(FlushPolicy.OPERATIONS, operations=2))
+        repo.add_student(Student("Alice", 1, 101))
+        self.assertFalse(os.path.exists(self.filename))
+        repo.add_student(Student("Bob", 2, 101))
+        self.assertFalse(repo.dirty)
+        self.assertEqual(len(StudentTextFileRepository(self.filename).list_all()), 2)
+
+    def test_deferred_block_flushes_once(self):
+        """Test that changes inside nested deferred blocks are saved once, when the outer block ends."""
+        saves = []
+        flusher = FlushController(lambda: saves.append(None))
+        with flusher.deferred():
+            flusher.changed()
+            with flusher.deferred():
+                flusher.changed()
+            self.assertEqual(saves, [])
+        self.assertEqual(len(saves), 1)
+        self.assertFalse(flusher.dirty)
+
+    def test_cascaded_operation_writes_each_file_once(self):
+        """Test that a cascaded undo over an immediate-flush repository writes the file once."""
+        repo = StudentTextFileRepository(self.filename)
+        operation = CascadedOperation(repo)
+        for student_id in range(3):
+            operation.add_undo_function(FunctionCall(repo.add_student, Student(f"Student {student_id}", student_id, 101)))
+        saves = []
+        original_flush = repo._flusher.flush
+        repo._flusher.flush = lambda: saves.append(None) or original_flush()
+
+        operation.undo()
+        self.assertEqual(len(saves), 1)
+        self.assertEqual(len(StudentTextFileRepository(self.filename).list_all()), 3)
+
+    def test_journal_records_are_buffered_until_flush(self):
+        """Test that a deferred journal keeps its records in memory until flushed."""
+        filename = os.path.join(self.directory.name, "grades.txt")
+        repo = GradeTextFileRepository(filename, journal=True, flush_policy=FlushPolicy(FlushPolicy.EXIT))
+        repo.add_grade(1, 10, None)
+        repo.update_grade(1, 10, 7)
+        self.assertFalse(os.path.exists(filename + ".journal"))
+
+        repo.flush()
+        self.assertEqual(GradeTextFileRepository(filename, journal=True).grades, {(10, 1): 7.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from src.domain.student import Student
+from src.instrumentation.stats import STATS, instrument
+from src.repository.memory_grade import GradeRepository
+from src.repository.student_text_file_repo import StudentTextFileRepository
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        """Start every test with empty statistics in a temporary directory."""
+        STATS.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "students.txt")
+
+    def tearDown(self):
+        STATS.enabled = False
+        STATS.reset()
+        self.directory.cleanup()
+
+    def test_nothing_is_recorded_while_disabled(self):
+        """Test that loads and saves leave no statistics behind when collection is off."""
+        repo = StudentTextFileRepository(self.filename)
+        repo.add_student(Student("Alice", 1, 101))
+        self.assertEqual(STATS.snapshot(), {})
+
+    def test_loads_saves_and_calls_are_recorded(self):
+        """Test that load times, bytes written and instrumented calls show up in the snapshot."""
+        STATS.enabled = True
+        repo = StudentTextFileRepository(self.filename)
+        repo.add_student(Student("Alice", 1, 101))
+        grade_repo = instrument(GradeRepository())
+        grade_repo.add_grade(1, 10, 7)
+        grade_repo.add_grade(2, 10, 9)
+
+        snapshot = STATS.snapshot()
+        self.assertEqual(snapshot["StudentTextFileRepository.__load_file"]["count"], 1)
+        self.assertEqual(snapshot["StudentTextFileRepository.__save_file"]["bytes_written"],
+                         os.path.getsize(self.filename))
+        self.assertEqual(snapshot["GradeRepository.add_grade"]["count"], 2)
+        self.assertIn("GradeRepository.add_grade", STATS.format_table())
+
+
+if __name__ == "__main__":
+    unittest.main()
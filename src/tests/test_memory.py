@@ -1,3 +1,5 @@
+import datetime
+import pickle
 import unittest
 from src.domain.student import Student
 from src.domain.assigment import Assignment
@@ -5,6 +7,26 @@ from src.domain.grade import Grade
 from src.repository.memory_student import StudentRepository
 from src.repository.memory_assignment import AssignmentRepository
 from src.repository.memory_grade import GradeRepository
+from src.exceptions.exceptions import DuplicateStudentError, StudentNotFoundError
+
+class TestDomainObjects(unittest.TestCase):
+    def test_hash_and_pickle(self):
+        """Test that assignments and grades are hashable by key and survive pickling with __slots__."""
+        self.assertEqual(len({Assignment(1, "Essay", "2024-03-01"), Assignment(1, "Essay v2", "2024-03-02")}), 1)
+        self.assertEqual(hash(Grade(1, 2, 7)), hash(Grade(1, 2, 7)), "Equal grades must hash equally.")
+        self.assertIn(Grade(1, 2, 7), {Grade(1, 2, 7)})
+
+        grade = pickle.loads(pickle.dumps(Grade(1, 2, 7)))
+        self.assertEqual((grade.id, grade.student, grade.value), (1, 2, 7))
+        student = pickle.loads(pickle.dumps(Student("Alice", 1, 101)))
+        self.assertEqual((student.name, student.id, student.group), ("Alice", 1, 101))
+
+    def test_restore_pre_slots_state(self):
+        """Test that the __dict__ state of objects pickled before __slots__ still restores."""
+        student = Student.__new__(Student)
+        student.__setstate__({"_Student__id": 1, "_name": "Alice", "_Student__group": 101})
+        self.assertEqual((student.name, student.id, student.group), ("Alice", 1, 101))
+
 
 class TestMemoryStudentRepository(unittest.TestCase):
     def setUp(self):
@@ -18,6 +40,59 @@ class TestMemoryStudentRepository(unittest.TestCase):
         self.assertEqual(len(self.repo.list_all()), 1, "Student was not added.")
         self.assertIn(student, self.repo.list_all(), "Added student is not in the repository.")
 
+    def test_students_in_group_follows_updates(self):
+        """Test that the group index tracks additions, group changes and removals."""
+        alice = Student("Alice", 1, 101)
+        bob = Student("Bob", 2, 101)
+        self.repo.add_student(alice)
+        self.repo.add_student(bob)
+        self.repo.update_student(2, new_group=102)
+        self.assertEqual(self.repo.students_in_group(101), [alice])
+        self.assertEqual(self.repo.students_in_group(102), [bob])
+
+        self.repo.remove_student(1, GradeRepository())
+        self.assertEqual(self.repo.students_in_group(101), [])
+
+    def test_add_students_bulk_is_all_or_nothing(self):
+        """Test that a batch with a duplicate ID leaves the repository untouched."""
+        self.repo.add_student(Student("Alice", 1, 101))
+        with self.assertRaises(DuplicateStudentError):
+            self.repo.add_students_bulk([Student("Bob", 2, 101), Student("Carol", 1, 102)])
+        self.assertEqual(self.repo.get_all_ids(), [1])
+
+        self.repo.add_students_bulk([Student("Bob", 2, 101), Student("Carol", 3, 102)])
+        self.assertEqual([student.name for student in self.repo.students_in_group(101)], ["Alice", "Bob"])
+
+    def test_search_students_ranks_and_follows_renames(self):
+        """Test ranked substring and prefix search, the limit, accent folding and renames."""
+        self.repo.add_students_bulk([Student("Anna Smith", 1, 101), Student("Joanna Lee", 2, 101),
+                                     Student("Ann", 3, 102), Student("José Annan", 4, 102)])
+        self.assertEqual([student.id for student in self.repo.search_students("ann")], [3, 1, 4, 2])
+        self.assertEqual([student.id for student in self.repo.search_students("an", limit=2)], [3, 1])
+        self.assertEqual([student.id for student in self.repo.search_students("ANN", prefix=True)], [3, 1, 4])
+        self.assertEqual(self.repo.search_students("jose"), [self.repo.find_student(4)])
+
+        self.repo.update_student(2, new_name="Maria Lee")
+        self.assertEqual([student.id for student in self.repo.search_students("joa")], [])
+        self.assertEqual([student.id for student in self.repo.search_students("m", prefix=True)], [2])
+
+    def test_remove_students_bulk_is_all_or_nothing(self):
+        """Test that a batch removal drops the students, their index entries and their grades together."""
+        grade_repo = GradeRepository()
+        self.repo.add_students_bulk([Student("Alice", 1, 101), Student("Bob", 2, 101), Student("Carol", 3, 102)])
+        grade_repo.add_grades_bulk([(1, 10, 7), (2, 10, 8), (3, 10, None)])
+        with self.assertRaises(StudentNotFoundError):
+            self.repo.remove_students_bulk([1, 4], grade_repo)
+        self.assertEqual(self.repo.get_all_ids(), [1, 2, 3])
+
+        alice, carol = self.repo.find_student(1), self.repo.find_student(3)
+        self.assertEqual(self.repo.remove_students_bulk([1, 3], grade_repo), [alice, carol])
+        self.assertEqual(self.repo.get_all_ids(), [2])
+        self.assertEqual(self.repo.students_in_group(102), [])
+        self.assertEqual(self.repo.search_students("carol"), [])
+        self.assertEqual([student.id for student in self.repo.search_students("b", prefix=True)], [2])
+        self.assertEqual(grade_repo.grades, {(10, 2): 8})
+
     # def test_add_duplicate_student(self):
     #     """Test that adding a student with a duplicate ID raises an error."""
     #     student1 = Student("Alice", 1234, 101)
@@ -38,6 +113,23 @@ class TestMemoryAssignmentRepository(unittest.TestCase):
         self.assertEqual(len(self.repo.list_assignments()), 1, "Assignment was not added.")
         self.assertIn(assignment, self.repo.list_assignments(), "Added assignment is not in the repository.")
 
+    def test_deadline_index_range_queries(self):
+        """Test overdue and due-within queries over string and date deadlines, including updates."""
+        today = datetime.date(2024, 3, 10)
+        self.repo.add_assignment(Assignment(1, "Essay", "2024-03-01"))
+        self.repo.add_assignment(Assignment(2, "Lab", datetime.date(2024, 3, 12)))
+        self.repo.add_assignment(Assignment(3, "Project", "2024-04-30"))
+        self.assertEqual(self.repo.get_overdue_assignments(today), [1])
+        self.assertEqual(self.repo.get_assignments_due_within(7, today), [2])
+
+        moved = self.repo.get(3)
+        moved.deadline = "2024-03-11"
+        self.repo.update_assignment(moved)
+        self.assertEqual(self.repo.get_assignments_due_within(7, today), [3, 2])
+
+        self.repo.remove_assignment(1, GradeRepository())
+        self.assertEqual(self.repo.get_overdue_assignments(today), [])
+
 
 
 class TestMemoryGradeRepository(unittest.TestCase):
@@ -51,6 +143,98 @@ class TestMemoryGradeRepository(unittest.TestCase):
         self.repo.add_grade(1, 1234, 9.5)
         self.assertEqual(len(self.repo.list_all_grades()), 1, "Grade was not added.")
 
+    def test_indexes_follow_add_and_delete(self):
+        """Test that per-student and per-assignment lookups stay consistent with the grades."""
+        self.repo.add_grade(1, 10, 7)
+        self.repo.add_grade(1, 20, None)
+        self.repo.add_grade(2, 10, 9)
+        self.repo.update_grade(1, 20, 5)
+        self.assertEqual(self.repo.get_grades_for_student(1), [(10, 7), (20, 5)])
+        self.assertEqual(self.repo.get_grades_for_assignment(10), [(1, 7), (2, 9)])
+
+        self.repo.delete(1, 10)
+        self.assertEqual(self.repo.get_assignments_for_student(1), [20])
+        self.assertEqual(self.repo.get_students_for_assignment(10), [2])
+
+    def test_remove_grades_for_student_and_assignment(self):
+        """Test that bulk removals only drop the matching rows and their index entries."""
+        self.repo.add_grade(1, 10, 7)
+        self.repo.add_grade(1, 20, 8)
+        self.repo.add_grade(2, 10, 9)
+        self.repo.remove_grades_for_assignment(10)
+        self.assertEqual(self.repo.grades, {(20, 1): 8})
+        self.assertEqual(self.repo.get_grades_for_student(2), [])
+
+        self.repo.remove_grades_for_student(1)
+        self.assertEqual(self.repo.grades, {})
+        self.assertEqual(self.repo.get_students_for_assignment(20), [])
+
+    def test_running_averages_and_top_k(self):
+        """Test that the per-student aggregates follow grade writes and feed top_k."""
+        self.repo.add_grade(1, 10, 6)
+        self.repo.add_grade(1, 20, None)
+        self.repo.add_grade(2, 10, 9)
+        self.repo.add_grade(3, 10, 4)
+        self.repo.update_grade(1, 20, 10)
+        self.assertEqual(self.repo.get_average_for_student(1), 8)
+        self.assertEqual(self.repo.top_k(2), [(2, 9), (1, 8)])
+
+        self.repo.remove_grades_for_assignment(10)
+        self.assertEqual(self.repo.average_grades(), {1: 10})
+        self.assertIsNone(self.repo.get_average_for_student(2))
+
+    def test_top_k_breaks_ties_by_student_id(self):
+        """Test that students with equal averages are ranked by ascending ID, whatever order they were added in."""
+        self.repo.add_grades_bulk([(3, 10, 9), (1, 10, 9), (2, 10, 9), (4, 10, 5)])
+        self.assertEqual(self.repo.top_k(2), [(1, 9), (2, 9)])
+        self.assertEqual([student_id for student_id, _ in self.repo.top_k(4)], [1, 2, 3, 4])
+
+    def test_get_grades_for_students(self):
+        """Test that the grades of several students come back as add_grades_bulk entries."""
+        self.repo.add_grades_bulk([(1, 10, 6), (2, 10, None), (1, 20, 8), (3, 10, 9)])
+        self.assertEqual(sorted(self.repo.get_grades_for_students([1, 2])), [(1, 10, 6), (1, 20, 8), (2, 10, None)])
+        self.assertEqual(self.repo.get_grades_for_students([4]), [])
+
+    def test_iter_grades_is_lazy(self):
+        """Test that iter_grades yields the same grades as list_all_grades, one at a time."""
+        self.repo.add_grades_bulk([(1, 10, 6), (2, 10, None), (1, 20, 8)])
+        self.repo.delete(2, 10)
+        grades = self.repo.iter_grades()
+        self.assertNotIsInstance(grades, list, "iter_grades built a list.")
+        self.assertEqual(list(grades), self.repo.list_all_grades())
+        self.assertEqual(len(self.repo.list_all_grades()), 2)
+
+
+try:
+    from src.repository.grade_numpy_repo import GradeNumpyRepository
+except ImportError:
+    # NumPy is an optional dependency
+    GradeNumpyRepository = None
+
+
+@unittest.skipIf(GradeNumpyRepository is None, "NumPy is not installed.")
+class TestNumpyGradeRepository(TestMemoryGradeRepository):
+    def setUp(self):
+        """Run the grade repository tests against the columnar NumPy repository."""
+        self.repo = GradeNumpyRepository()
+
+    def test_columns_grow_and_compact(self):
+        """Test that the columns survive growing past their capacity and compacting after removals."""
+        rows = 3 * GradeNumpyRepository.INITIAL_CAPACITY
+        self.repo.add_grades_bulk((student_id, student_id % 3, student_id % 10 or None) for student_id in range(rows))
+        self.repo.remove_grades_for_assignment(0)
+        self.repo.remove_grades_for_assignment(1)
+        self.assertEqual(len(self.repo.list_all_grades()), GradeNumpyRepository.INITIAL_CAPACITY)
+        self.assertEqual(self.repo.get_grades_for_student(5), [(2, 5)])
+        self.assertEqual(self.repo.get_grades_for_assignment_by_grade(2)[:2], [(29, 9), (59, 9)])
+        # The per-student and per-assignment row indexes point at the compacted rows
+        self.repo.add_grade(5, 7, None)
+        self.assertEqual(self.repo.get_assignments_for_student(5), [2, 7])
+        self.assertEqual(self.repo.get_ungraded_assignments(5), [7])
+        self.assertEqual(self.repo.get_students_for_assignment(2)[:3], [2, 5, 8])
+        self.assertEqual(self.repo.get_ungraded_students_for_assignments([2, 7]), {5} | {
+            student_id for student_id in range(2, rows, 3) if student_id % 10 == 0})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.exceptions.exceptions import MigrationError
+from src.migration.migrate import migrate
+from src.repository.backends import create_repositories
+from src.repository.flush_policy import FlushPolicy
+from src.settings.settings import Settings
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary directory for the settings files and backends."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def settings(self, name, backend, **options):
+        """Write a settings file for a backend whose files are named after `name`, and load it."""
+        path = os.path.join(self.directory.name, name)
+        lines = ["[DEFAULT]", f"repository = {backend}",
+                 f"students = {path}.students", f"assignments = {path}.assignments",
+                 f"grades = {path}.grades", f"database = {path}.db"]
+        lines += [f"{key} = {value}" for key, value in options.items()]
+        with open(path + ".properties", "wt") as file:
+            file.write("\n".join(lines) + "\n")
+        return Settings(path + ".properties")
+
+    @staticmethod
+    def contents(settings):
+        """Open the backend's repositories and return everything they hold."""
+        student_repo, assignment_repo, grade_repo = create_repositories(settings, FlushPolicy())
+        contents = ([(student.id, student.name, student.group) for student in student_repo.iter_students()],
+                    [(assignment.id, assignment.description, str(assignment.deadline))
+                     for assignment in assignment_repo.iter_assignments()],
+                    sorted((grade.student, grade.id, grade.value) for grade in grade_repo.iter_grades()))
+        connection = getattr(grade_repo, "_connection", None)
+        if connection is not None:
+            connection.close()
+        return contents
+
+    def test_round_trip_through_every_backend(self):
+        """Test that data written through a text journal survives text -> SQLite -> records -> pickle -> text."""
+        source = self.settings("source", "textfiles", grades_journal="true")
+        student_repo, assignment_repo, grade_repo = create_repositories(source, FlushPolicy())
+        student_repo.add_students_bulk(Student(f"Student {student_id}", student_id, 100 + student_id % 3)
+                                       for student_id in range(1, 31))
+        assignment_repo.add_assignment(Assignment(10, "Essay", "2000-01-01"))
+        assignment_repo.add_assignment(Assignment(11, "Project", "2000-02-01"))
+        grade_repo.add_grades_bulk((student_id, assignment_id, student_id % 10 or None)
+                                   for student_id in range(1, 31) for assignment_id in (10, 11))
+        # Journal records on top of the grades: a removed student, an update and a removed assignment's grades
+        student_repo.remove_student(30, grade_repo)
+        grade_repo.update_grade(1, 10, 9.5)
+        grade_repo.remove_grades_for_assignment(11)
+        grade_repo.add_grade(2, 11, 4)
+        expected = self.contents(source)
+
+        chain = [source, self.settings("sqlite", "sqlite"),
+                 self.settings("records", "binaryfiles", grades_format="records"),
+                 self.settings("pickle", "binaryfiles"), self.settings("text", "textfiles")]
+        progress = []
+        for previous, target in zip(chain, chain[1:]):
+            copied = migrate(previous, target, batch_size=7, progress=lambda kind, count: progress.append(kind))
+            self.assertEqual(self.contents(target), expected)
+        self.assertEqual((copied["students"].count, copied["grades"].count), (29, 30))
+        self.assertEqual(progress.count("students"), 4 * 5)  # 29 students in batches of 7, per migration
+
+    def test_target_must_be_empty_and_copies_are_verified(self):
+        """Test that a migration refuses a target with data and reports a copy the target cannot represent."""
+        source = self.settings("source", "sqlite")
+        student_repo, _, _ = create_repositories(source, FlushPolicy())
+        # The text files strip the spaces around names, so the copy reads back differently
+        student_repo.add_student(Student(" Alice ", 1, 101))
+        student_repo._connection.close()
+
+        target = self.settings("text", "textfiles")
+        with self.assertRaises(MigrationError):
+            migrate(source, target)
+        with self.assertRaisesRegex(MigrationError, "already holds data"):
+            migrate(source, target)
+        with self.assertRaisesRegex(MigrationError, "cannot be migrated"):
+            migrate(source, self.settings("memory", "inmemory"))
+
+
+if __name__ == "__main__":
+    unittest.main()
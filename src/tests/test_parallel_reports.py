@@ -0,0 +1,89 @@
+import random
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.repository.assignment_sqlite_repo import AssignmentSqliteRepository
+from src.repository.grade_sqlite_repo import GradeSqliteRepository
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+from src.repository.sqlite_database import connect
+from src.repository.student_sqlite_repo import StudentSqliteRepository
+from src.services.grade_service import GradeService
+from src.services.parallel_reports import ParallelReportEngine
+from src.services.undo_service import UndoService
+
+try:
+    from src.repository.grade_numpy_repo import GradeNumpyRepository
+except ImportError:
+    # NumPy is an optional dependency
+    GradeNumpyRepository = None
+
+
+class TestParallelReports(unittest.TestCase):
+    def setUp(self):
+        """Set up a random grade book with tied averages, ungraded rows and overdue assignments."""
+        rng = random.Random(21)
+        self.student_repo, self.assignment_repo, self.grade_repo = self.repositories()
+        for student_id in range(1, 201):
+            self.student_repo.add_student(Student(f"Student {student_id}", student_id, 100 + student_id % 5))
+        for assignment_id in range(1, 11):
+            deadline = "2000-01-01" if assignment_id % 2 else "2999-01-01"
+            self.assignment_repo.add_assignment(Assignment(assignment_id, f"Assignment {assignment_id}", deadline))
+        grades = [(student_id, assignment_id, rng.choice([None, 4, 7, 10]))
+                  for student_id in range(1, 191) for assignment_id in range(1, 11) if rng.random() < 0.6]
+        # Out of ID order, so a tie broken by row order would show
+        rng.shuffle(grades)
+        self.grade_repo.add_grades_bulk(grades)
+
+        self.serial = GradeService(self.grade_repo, self.student_repo, self.assignment_repo, UndoService())
+        # min_rows=0 sends even this small grade book to the worker processes
+        self.engine = ParallelReportEngine(workers=3, min_rows=0)
+        self.addCleanup(self.engine.close)
+        self.parallel = GradeService(self.grade_repo, self.student_repo, self.assignment_repo, UndoService(),
+                                     self.engine)
+
+    def repositories(self):
+        return StudentRepository(), AssignmentRepository(), GradeRepository()
+
+    def assertSameReports(self):
+        for report in ("get_students_with_best_grades", "get_students_sorted_by_average_grade",
+                       "get_late_students_with_ungraded_assignments"):
+            self.assertEqual(getattr(self.parallel, report)(), getattr(self.serial, report)(), report)
+        for assignment_id in (1, 2):
+            self.assertEqual(self.parallel.get_students_with_assignment_ordered_by_grade(assignment_id),
+                             self.serial.get_students_with_assignment_ordered_by_grade(assignment_id))
+
+    def test_parallel_reports_match_the_serial_ones(self):
+        """Test that the merged shard results equal the repository's reports, ties included."""
+        self.assertSameReports()
+
+    def test_shards_are_rebuilt_after_a_write(self):
+        """Test that the reports see a write made after the shards were built."""
+        self.assertSameReports()
+        shards = self.engine.shards(self.grade_repo)
+        self.grade_repo.add_grade(200, 1, None)
+        self.assertIsNot(self.engine.shards(self.grade_repo), shards)
+        self.assertSameReports()
+        self.assertIn(self.student_repo.find_student(200), self.parallel.get_late_students_with_ungraded_assignments())
+
+
+class TestParallelReportsSqlite(TestParallelReports):
+    def repositories(self):
+        """Run the parallel report tests against the SQLite repositories, which average and sort in SQL."""
+        connection = connect(":memory:")
+        self.addCleanup(connection.close)
+        return (StudentSqliteRepository(connection), AssignmentSqliteRepository(connection),
+                GradeSqliteRepository(connection))
+
+
+@unittest.skipIf(GradeNumpyRepository is None, "NumPy is not installed.")
+class TestParallelReportsNumpy(TestParallelReports):
+    def repositories(self):
+        """Run the parallel report tests against the columnar NumPy grade repository."""
+        return StudentRepository(), AssignmentRepository(), GradeNumpyRepository()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.exceptions.exceptions import StudentNotFoundError
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+from src.server.client import GradeBookClient, RemoteUndoService
+from src.server.server import GradeBookServer
+
+
+class TestGradeBookServer(unittest.TestCase):
+    def setUp(self):
+        """Start a server on a free local port, with its event loop in a background thread."""
+        self.server = GradeBookServer(StudentRepository(), AssignmentRepository(), GradeRepository())
+        self.loop = asyncio.new_event_loop()
+        self.host, self.port = self.loop.run_until_complete(self.server.start(port=0))
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        # Cleanups run last in, first out, so the clients are closed before the server
+        self.addCleanup(self.stop_server)
+
+    def stop_server(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def connect(self):
+        client = GradeBookClient(self.host, self.port)
+        self.addCleanup(client.close)
+        return client
+
+    def test_clients_share_one_dataset(self):
+        """Test that a batch written by one client is read by another through pipelined calls."""
+        writer, reader = self.connect(), self.connect()
+        writer.batch([
+            ("assignments", "add_assignment", (Assignment(10, "Essay", "2000-01-01"),)),
+            ("students", "add_bulk", ([Student("Alice", 1, 101), Student("Bob", 2, 101)],)),
+            ("assignments", "assign_to_group", (10, 101)),
+            ("grades", "grade_student", (2, 10, 9)),
+        ])
+
+        students, grades, late = reader.pipeline([
+            ("student_repo", "iter_students", ()),
+            ("grade_repo", "get_grades_for_assignment", (10,)),
+            ("grades", "get_late_students_with_ungraded_assignments", ()),
+        ])
+        self.assertEqual([(student.name, student.group) for student in students], [("Alice", 101), ("Bob", 101)])
+        self.assertEqual(grades, [(1, None), (2, 9)])
+        self.assertEqual(late, [Student("Alice", 1, 101)])
+
+    def test_errors_and_undo_through_proxies(self):
+        """Test that server errors are raised with their own type and that undo works through the proxies."""
+        client = self.connect()
+        students = client.proxy("students")
+        students.add(Student("Alice", 1, 101))
+        with self.assertRaises(StudentNotFoundError):
+            client.proxy("student_repo").find_student(2)
+        with self.assertRaises(AttributeError):
+            client.call("student_repo", "_students")
+
+        undo = RemoteUndoService(client)
+        undo.undo()
+        self.assertEqual(students.list_all(), [])
+        self.assertEqual(undo.history_length(), (0, 1))
+
+        # A proxy passed as an argument stands for the server's own repository
+        assignments = client.proxy("assignments")
+        assignments.add_assignment(Assignment(10, "Essay", "2000-01-01"))
+        assignments.remove_assignment(10, client.proxy("grade_repo"))
+        self.assertEqual(assignments.list_all_assignments(), [])
+        self.assertEqual(undo.evicted_operations, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+from src.services.assignment_service import AssignmentService
+from src.services.grade_service import GradeService
+from src.services.student_service import StudentService
+from src.services.undo_service import FunctionCall, Operation, UndoRedoError, UndoService
+
+
+class TestGradeServiceReports(unittest.TestCase):
+    def setUp(self):
+        """Set up three students with a few grades on one assignment."""
+        self.student_repo = StudentRepository()
+        self.assignment_repo = AssignmentRepository()
+        self.grade_repo = GradeRepository()
+        self.service = GradeService(self.grade_repo, self.student_repo, self.assignment_repo, UndoService())
+
+        self.alice = Student("Alice", 1, 101)
+        self.bob = Student("Bob", 2, 101)
+        self.carol = Student("Carol", 3, 102)
+        for student in (self.alice, self.bob, self.carol):
+            self.student_repo.add_student(student)
+        self.assignment_repo.add_assignment(Assignment(10, "Essay", "2023-12-15"))
+        self.grade_repo.add_grade(1, 10, 7)
+        self.grade_repo.add_grade(2, 10, 9)
+
+    def test_best_grades_ranking(self):
+        """Test that the ranking lists graded students first and ungraded students last."""
+        self.assertEqual(self.service.get_students_with_best_grades(),
+                         [(self.bob, 9), (self.alice, 7), (self.carol, 0.0)])
+        self.assertEqual(self.service.top_k(2), [(self.bob, 9), (self.alice, 7)])
+
+    def test_ranking_is_refreshed_after_a_write(self):
+        """Test that a cached ranking is rebuilt once a grade changes."""
+        self.service.get_students_with_best_grades()
+        self.grade_repo.add_grade(3, 10, 10)
+        self.assertEqual(self.service.top_k(1), [(self.carol, 10)])
+        self.assertEqual(self.service.get_students_with_best_grades()[0], (self.carol, 10))
+
+    def test_top_k_ties_do_not_depend_on_the_cache(self):
+        """Test that top_k orders equal averages the same way with and without a cached ranking."""
+        self.grade_repo.update_grade(1, 10, 9)
+        self.grade_repo.add_grade(3, 10, 9)
+        expected = [(self.alice, 9), (self.bob, 9)]
+        self.assertEqual(self.service.top_k(2), expected)
+        self.service.get_students_with_best_grades()
+        self.assertEqual(self.service.top_k(2), expected)
+
+    def test_late_students_come_from_overdue_assignments(self):
+        """Test that only ungraded rows of overdue assignments make a student late."""
+        self.assignment_repo.add_assignment(Assignment(20, "Lab", "2000-01-01"))
+        self.grade_repo.add_grade(1, 20, None)
+        self.grade_repo.add_grade(2, 20, 8)
+        self.assertEqual(self.service.get_late_students_with_ungraded_assignments(), [self.alice])
+
+
+class TestAssignmentServiceBulk(unittest.TestCase):
+    def setUp(self):
+        """Set up a group of three students and one assignment."""
+        self.student_repo = StudentRepository()
+        self.assignment_repo = AssignmentRepository()
+        self.grade_repo = GradeRepository()
+        self.undo_service = UndoService()
+        self.service = AssignmentService(self.assignment_repo, self.student_repo, self.undo_service, self.grade_repo)
+        self.student_repo.add_students_bulk([Student("Alice", 1, 101), Student("Bob", 2, 101), Student("Carol", 3, 101)])
+        self.assignment_repo.add_assignment(Assignment(10, "Essay", "2023-12-15"))
+
+    def test_assign_to_group_is_one_undoable_operation(self):
+        """Test that a group assignment keeps existing grades and is undone and redone as a whole."""
+        self.grade_repo.add_grade(1, 10, 8)
+        self.service.assign_to_group(10, 101)
+        self.assertEqual(self.grade_repo.get_grades_for_assignment(10), [(1, 8), (2, None), (3, None)])
+
+        self.undo_service.undo()
+        self.assertEqual(self.grade_repo.get_grades_for_assignment(10), [(1, 8)])
+        self.undo_service.redo()
+        self.assertEqual(self.grade_repo.get_students_for_assignment(10), [1, 2, 3])
+
+
+class TestStudentServiceUndo(unittest.TestCase):
+    def setUp(self):
+        """Set up two graded students."""
+        self.student_repo = StudentRepository()
+        self.grade_repo = GradeRepository()
+        self.undo_service = UndoService()
+        self.service = StudentService(self.student_repo, self.grade_repo, self.undo_service)
+        self.student_repo.add_students_bulk([Student("Alice", 1, 101), Student("Bob", 2, 101)])
+        self.grade_repo.add_grades_bulk([(1, 10, 7), (1, 20, None), (2, 10, 9)])
+
+    def test_undo_remove_restores_the_grades(self):
+        """Test that undoing a removal brings back the student together with their grades."""
+        self.service.remove(1)
+        self.assertEqual(self.grade_repo.get_grades_for_student(1), [])
+
+        self.undo_service.undo()
+        self.assertEqual(self.student_repo.find_student(1).name, "Alice")
+        self.assertEqual(self.grade_repo.get_grades_for_student(1), [(10, 7), (20, None)])
+        self.undo_service.redo()
+        self.assertEqual(self.student_repo.get_all_ids(), [2])
+        self.assertEqual(self.grade_repo.get_students_for_assignment(10), [2])
+
+    def test_undo_add_bulk_removes_the_batch_at_once(self):
+        """Test that a bulk add is undone as one removal and redo restores the grades given since."""
+        self.service.add_bulk([Student("Carol", 3, 102), Student("Dan", 4, 102)])
+        self.grade_repo.add_grade(3, 10, 5)
+
+        self.undo_service.undo()
+        self.assertEqual(self.student_repo.get_all_ids(), [1, 2])
+        self.assertEqual(self.student_repo.search_students("carol"), [])
+        self.assertEqual(self.grade_repo.get_students_for_assignment(10), [1, 2])
+        self.undo_service.redo()
+        self.assertEqual([student.id for student in self.student_repo.students_in_group(102)], [3, 4])
+        self.assertEqual(self.grade_repo.get_grades_for_student(3), [(10, 5)])
+
+
+class TestBoundedUndoService(unittest.TestCase):
+    def setUp(self):
+        """Set up a counter whose increments are recorded as operations."""
+        self.values = []
+
+    def record_append(self, undo_service, value, payload=None):
+        def undo_append():
+            self.values.remove(value)
+
+        def redo_append():
+            self.values.append(value)
+
+        redo_append()
+        # The payload stands for the data an operation keeps alive, e.g. the grades of a removed student
+        undo_service.record(Operation(FunctionCall(undo_append), FunctionCall(redo_append, payload)))
+
+    def test_oldest_operations_are_dropped_past_the_count(self):
+        """Test that only the newest max_operations operations can be undone."""
+        undo_service = UndoService(max_operations=2)
+        for value in range(4):
+            self.record_append(undo_service, value)
+        self.assertEqual(undo_service.history_length(), (2, 0))
+        undo_service.undo()
+        undo_service.undo()
+        with self.assertRaises(UndoRedoError):
+            undo_service.undo()
+        self.assertEqual(self.values, [0, 1])
+        self.assertEqual(undo_service.evicted_operations, 2)
+
+    def test_footprint_is_accounted_and_bounded(self):
+        """Test that large operations count towards the byte bound and leave it when dropped."""
+        undo_service = UndoService(max_bytes=100_000)
+        self.record_append(undo_service, 0)
+        small = undo_service.memory_footprint()
+        self.record_append(undo_service, 1, payload=list(range(5_000)))
+        self.assertGreater(undo_service.memory_footprint(), small + 5_000 * 28, "The payload was not counted.")
+
+        self.record_append(undo_service, 2, payload=list(range(5_000)))
+        self.assertEqual(undo_service.history_length(), (1, 0), "Operations over the byte bound were kept.")
+
+        # The newest operation stays undoable even though it alone is over the bound
+        undo_service.undo()
+        self.assertEqual(self.values, [0, 1])
+        self.record_append(undo_service, 3)
+        self.assertLess(undo_service.memory_footprint(), small * 2, "Cleared redos are still accounted.")
+
+
+if __name__ == "__main__":
+    unittest.main()
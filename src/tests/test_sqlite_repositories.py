@@ -0,0 +1,114 @@
+import datetime
+import unittest
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.exceptions.exceptions import StudentNotFoundError
+from src.repository.assignment_sqlite_repo import AssignmentSqliteRepository
+from src.repository.grade_sqlite_repo import GradeSqliteRepository
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+from src.repository.sqlite_database import connect
+from src.repository.student_sqlite_repo import StudentSqliteRepository
+from src.services.grade_service import GradeService
+from src.services.undo_service import UndoService
+
+
+class TestSqliteRepositories(unittest.TestCase):
+    def setUp(self):
+        """Set up the three repositories on one in-memory database."""
+        self.connection = connect(":memory:")
+        self.student_repo = StudentSqliteRepository(self.connection)
+        self.assignment_repo = AssignmentSqliteRepository(self.connection)
+        self.grade_repo = GradeSqliteRepository(self.connection)
+        self.student_repo.add_students_bulk([Student("Alice", 1, 101), Student("Bob", 2, 101), Student("Carol", 3, 102)])
+        self.assignment_repo.add_assignment(Assignment(10, "Essay", "2000-01-01"))
+        self.assignment_repo.add_assignment(Assignment(20, "Lab", datetime.date(2999, 1, 1)))
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_student_group_updates_and_removal(self):
+        """Test the group query, an update that moves a student, and a cascading removal."""
+        self.grade_repo.add_grade(2, 10, 5)
+        self.student_repo.update_student(2, new_group=102)
+        self.assertEqual([student.name for student in self.student_repo.students_in_group(102)], ["Bob", "Carol"])
+
+        self.student_repo.remove_student(2, self.grade_repo)
+        with self.assertRaises(StudentNotFoundError):
+            self.student_repo.find_student(2)
+        self.assertEqual(self.grade_repo.get_grades_for_student(2), [])
+
+    def test_remove_students_bulk(self):
+        """Test that a batch removal is validated first and takes the students' grades with it."""
+        self.grade_repo.add_grades_bulk([(1, 10, 7), (2, 10, None), (3, 10, 9)])
+        with self.assertRaises(StudentNotFoundError):
+            self.student_repo.remove_students_bulk([1, 4], self.grade_repo)
+        self.assertEqual(self.grade_repo.get_grades_for_students([1, 3]), [(1, 10, 7.0), (3, 10, 9.0)])
+
+        self.assertEqual([student.id for student in self.student_repo.remove_students_bulk([1, 3], self.grade_repo)], [1, 3])
+        self.assertEqual(self.student_repo.get_all_ids(), [2])
+        self.assertEqual(self.grade_repo.get_students_for_assignment(10), [2])
+
+    def test_search_students_matches_memory_ranking(self):
+        """Test that the SQL search folds case and accents and ranks like the in-memory search."""
+        self.student_repo.add_student(Student("Álice Carolson", 4, 102))
+        self.assertEqual([student.id for student in self.student_repo.search_students("CAROL")], [3, 4])
+        self.assertEqual([student.id for student in self.student_repo.search_students("al", limit=1)], [1])
+
+    def test_group_assignment_and_deadline_queries(self):
+        """Test a group assignment through the bulk path and the deadline range scans."""
+        self.assertEqual(self.assignment_repo.give_assignment_to_group(10, 101, self.student_repo, self.grade_repo), [1, 2])
+        self.assertEqual(self.grade_repo.get_students_for_assignment(10), [1, 2])
+        self.assertEqual(self.assignment_repo.get_overdue_assignments(), [10])
+        self.assertEqual(self.assignment_repo.get_assignments_due_between(None, None), [10, 20])
+
+    def test_iterators_stream_rows(self):
+        """Test that the iterators walk the tables in order without fetching them first."""
+        self.grade_repo.add_grades_bulk([(1, 10, 6), (2, 10, None)])
+        self.assertEqual([student.id for student in self.student_repo.iter_students()], [1, 2, 3])
+        self.assertEqual([assignment.id for assignment in self.assignment_repo.iter_assignments()], [10, 20])
+        self.assertEqual([(grade.student, grade.value) for grade in self.grade_repo.iter_grades()], [(1, 6), (2, None)])
+
+    def test_reports_are_computed_in_sql(self):
+        """Test the grade service reports on top of the SQL aggregates."""
+        service = GradeService(self.grade_repo, self.student_repo, self.assignment_repo, UndoService())
+        self.grade_repo.add_grades_bulk([(1, 10, 6), (1, 20, None), (2, 10, 9), (3, 10, None)])
+        self.assertEqual(self.grade_repo.average_grades(), {1: 6.0, 2: 9.0})
+        self.assertEqual(self.grade_repo.get_average_for_student(1, include_ungraded=True), 3.0)
+        self.assertEqual([student.id for student, _ in service.top_k(2)], [2, 1])
+        self.grade_repo.update_grade(1, 10, 9)
+        self.assertEqual([student.id for student, _ in service.top_k(2)], [1, 2])
+        self.assertEqual([student.id for student, _ in service.get_students_with_best_grades()][:2], [1, 2])
+        self.assertEqual([student.id for student in service.get_late_students_with_ungraded_assignments()], [3])
+        self.assertEqual([student.id for student, _ in service.get_students_sorted_by_average_grade()], [2, 1, 3])
+
+
+    def test_reports_join_the_students_table(self):
+        """Test that the student reports match the in-memory ones and look students up in the same query."""
+        self.student_repo.add_student(Student("Dave", 4, 102))
+        grades = [(1, 10, 6), (1, 20, None), (2, 10, 9), (3, 10, None), (3, 20, 9), (7, 10, 5)]
+        self.grade_repo.add_grades_bulk(grades)
+        student_repo, assignment_repo, grade_repo = StudentRepository(), AssignmentRepository(), GradeRepository()
+        student_repo.add_students_bulk(self.student_repo.iter_students())
+        for assignment in self.assignment_repo.iter_assignments():
+            assignment_repo.add_assignment(assignment)
+        grade_repo.add_grades_bulk(grades)
+        service = GradeService(self.grade_repo, self.student_repo, self.assignment_repo, UndoService())
+        expected = GradeService(grade_repo, student_repo, assignment_repo, UndoService())
+
+        statements = []
+        self.connection.set_trace_callback(statements.append)
+        for report in ("get_students_with_best_grades", "get_students_sorted_by_average_grade",
+                       "get_late_students_with_ungraded_assignments"):
+            self.assertEqual(getattr(service, report)(), getattr(expected, report)(), report)
+        self.assertEqual(service.get_students_with_assignment_ordered_by_grade(10),
+                         expected.get_students_with_assignment_ordered_by_grade(10))
+        self.connection.set_trace_callback(None)
+        # One query per report, plus the assignment lookups; student 7 has grades but is not a student
+        self.assertLessEqual(sum("FROM students" in statement for statement in statements), 4)
+        self.assertNotIn(7, [student.id for student, _ in service.get_students_with_best_grades()])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.domain.assigment import Assignment
+from src.domain.student import Student
+from src.repository.memory_assignment import AssignmentRepository
+from src.repository.memory_grade import GradeRepository
+from src.repository.memory_student import StudentRepository
+from src.repository.thread_safe import ReadWriteLock, ThreadSafeRepository, locked
+
+STUDENTS = 200
+ASSIGNMENTS = 5
+WRITERS = 4
+READERS = 8
+ROUNDS = 30
+
+
+class TestReadWriteLock(unittest.TestCase):
+    def test_readers_share_and_writers_exclude(self):
+        """Test that readers hold the lock together, reenter it, and that a writer waits for all of them."""
+        lock = ReadWriteLock()
+        lock.acquire_read()
+        lock.acquire_read()
+        acquired = threading.Event()
+
+        def write():
+            with lock.write():
+                acquired.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertFalse(acquired.wait(0.05), "The writer got in while readers held the lock.")
+        # A thread already reading gets in again, even though a writer waits
+        with lock.read():
+            self.assertFalse(acquired.is_set())
+        with self.assertRaises(RuntimeError):
+            lock.acquire_write()
+        lock.release_read()
+        self.assertFalse(acquired.wait(0.05))
+        lock.release_read()
+        writer.join(1)
+        self.assertTrue(acquired.is_set())
+
+
+class TestThreadSafeRepositories(unittest.TestCase):
+    def setUp(self):
+        """Set up thread-safe repositories with every student graded on every assignment."""
+        self.student_repo = ThreadSafeRepository(StudentRepository())
+        self.assignment_repo = ThreadSafeRepository(AssignmentRepository())
+        self.grade_repo = ThreadSafeRepository(GradeRepository())
+        for assignment_id in range(ASSIGNMENTS):
+            self.assignment_repo.add_assignment(Assignment(assignment_id, f"Assignment {assignment_id}", "2024-03-01"))
+        self.student_repo.add_students_bulk(Student(f"Student {student_id}", student_id, student_id % 10)
+                                            for student_id in range(STUDENTS))
+        self.grade_repo.add_grades_bulk((student_id, assignment_id, student_id % 10 + 1)
+                                        for student_id in range(STUDENTS) for assignment_id in range(ASSIGNMENTS))
+
+    def write(self, writer):
+        """Remove, re-add, regrade and rename this writer's own slice of the students."""
+        for round_number in range(ROUNDS):
+            for student_id in range(writer, STUDENTS, WRITERS * 5):
+                self.student_repo.remove_student(student_id, self.grade_repo)
+                self.student_repo.add_student(Student(f"Student {student_id}", student_id, student_id % 10))
+                self.grade_repo.add_grades_bulk((student_id, assignment_id, round_number % 10 + 1)
+                                                for assignment_id in range(ASSIGNMENTS))
+                self.student_repo.update_student(student_id, new_name=f"Renamed {round_number}")
+            self.assignment_repo.give_assignment_to_group(round_number % ASSIGNMENTS, writer,
+                                                          self.student_repo, self.grade_repo)
+
+    def read(self, reader):
+        """Check that no grade outlives its student and run the reports. :return: The number of checks."""
+        checks = 0
+        for _ in range(ROUNDS * 3):
+            with locked(self.student_repo, self.grade_repo):
+                student_ids = set(self.student_repo.get_all_ids())
+                graded_ids = {grade.student for grade in self.grade_repo.iter_grades()}
+                self.assertLessEqual(graded_ids, student_ids, "A removed student still has grades.")
+            self.grade_repo.top_k(10)
+            self.grade_repo.get_grades_for_student(reader)
+            self.student_repo.search_students("student", limit=5)
+            self.student_repo.students_in_group(reader % 10)
+            checks += 1
+        return checks
+
+    def test_mixed_readers_and_writers(self):
+        """Test that concurrent readers and writers leave the repositories consistent."""
+        with ThreadPoolExecutor(max_workers=WRITERS + READERS) as pool:
+            writes = [pool.submit(self.write, writer) for writer in range(WRITERS)]
+            reads = [pool.submit(self.read, reader) for reader in range(READERS)]
+            for future in writes:
+                future.result()
+            self.assertEqual(sum(future.result() for future in reads), READERS * ROUNDS * 3)
+
+        # The indexes and aggregates must match a rebuild from the final grades
+        grades = self.grade_repo.wrapped
+        rebuilt = GradeRepository()
+        rebuilt.grades = dict(grades.grades)
+        rebuilt._rebuild_indexes()
+        self.assertEqual(grades.student_assignments, rebuilt.student_assignments)
+        self.assertEqual(grades.student_totals, rebuilt.student_totals)
+        self.assertEqual(len(self.student_repo.get_all_ids()), STUDENTS)
+        self.assertIsNot(self.grade_repo.grades, grades.grades, "A live dict escaped the lock.")
+
+
+if __name__ == "__main__":
+    unittest.main()
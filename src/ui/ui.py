@@ -1,4 +1,4 @@
-from faker import Faker
+import functools
 import random
 
 from src.repository.memory_student import StudentRepository
@@ -7,26 +7,38 @@ from src.repository.memory_grade import GradeRepository
 from src.services.student_service import StudentService
 from src.services.assignment_service import AssignmentService
 from src.services.grade_service import GradeService
+from src.services.parallel_reports import ParallelReportEngine
 from src.domain.student import Student
 from src.domain.assigment import Assignment
 from src.domain.grade import Grade
-from src.services.undo_service import UndoService, Operation, FunctionCall
+from src.services.undo_service import UndoService, Operation, FunctionCall, UndoRedoError
 from src.settings.settings import Settings
+from src.repository.flush_policy import FlushPolicy
+from src.repository.backends import create_repositories
+from src.instrumentation.stats import STATS, instrument
 from src.exceptions.exceptions import (
     StudentNotFoundError, AssignmentNotFoundError, AssignmentAlreadyExistsError,
     InvalidStudentError, DuplicateStudentError, InvalidStudentUpdateError,
     GradeAlreadyExistsError, GradeNotFoundError, InvalidGroupError, InvalidGradeValueError
 )
 
-fake = Faker()
-
 
 # --- DATA GENERATORS ---
+@functools.lru_cache(maxsize=None)
+def fake():
+    """
+    The Faker instance of the data generators. Faker takes longer to import than the rest of the
+    application together, so it is only imported once synthetic data is generated.
+    """
+    from faker import Faker
+    return Faker()
+
+
 def generate_students(assignments, num_students=20):
     students = []
     for _ in range(num_students):
         student_id = random.randint(1000, 9999)
-        name = fake.name()
+        name = fake().name()
         group = random.randint(900, 999)
 
         assigned_assignments = set(random.sample([a.id for a in assignments], k=random.randint(1, len(assignments)//2)))
@@ -39,26 +51,23 @@ def generate_assignments(num_assignments=20):
     assignments = []
     for _ in range(num_assignments):
         assignment_id = random.randint(1000, 9999)
-        description = fake.sentence(nb_words=6)
-        deadline = fake.date_this_decade()
+        description = fake().sentence(nb_words=6)
+        deadline = fake().date_this_decade()
         assignment = Assignment(assignment_id, description, deadline)
         assignments.append(assignment)
     return assignments
 
 
-import random
-
-
-import random
-
 def generate_grades(student_repo, assignment_repo, grade_repo, num_grades=20):
-    # Step 1: Assign all assignments to students
+    # Step 1: Assign all assignments to students, written to the repository as one batch
+    missing_grades = []
     for student in student_repo.list_all():
         for assignment in assignment_repo.list_assignments():
             # Check if the student already has the assignment linked, if not, assign it
-            if assignment.id not in grade_repo.get_assignments_for_student(student.id):
-                grade_repo.add_grade(student.id, assignment.id, None)
-                print(f"Assigned Assignment {assignment.id} to Student {student.id} (No Grade Yet)")
+            if not grade_repo.has_grade(student.id, assignment.id):
+                missing_grades.append((student.id, assignment.id, None))
+    grade_repo.add_grades_bulk(missing_grades)
+    print(f"Assigned {len(missing_grades)} assignments to students (No Grade Yet)")
 
     # Step 2: Generate grades for students and assignments
     for _ in range(num_grades):
@@ -95,36 +104,16 @@ def view_grades(assignment_service, grade_repo:GradeRepository):
 
     print(f"\nAssignments and Grades for Student ID {student_id}:")
     print(grades_values)
-import os
+
 
 def choose_repository():
     settings = Settings("settings.properties")
-    repository_type = settings.get_repository_type()
-    undo_service = UndoService()
-    if repository_type == "inmemory":
-        student_repo = StudentRepository()
-        assignment_repo = AssignmentRepository()
-        grade_repo = GradeRepository()
-    elif repository_type == "binaryfiles":
-        from src.repository.student_binary_file_repo import StudentBinaryFileRepository
-        from src.repository.assig_binary_file_repo import AssignmentBinaryFileRepository
-        from src.repository.grade_binary_file_repo import GradeBinaryFileRepository
-
-        student_repo = StudentBinaryFileRepository(settings.get_file_for_students())
-        assignment_repo = AssignmentBinaryFileRepository(settings.get_file_for_assignments())
-        grade_repo = GradeBinaryFileRepository(settings.get_file_for_grades())
-    elif repository_type == "textfiles":
-        from src.repository.student_text_file_repo import StudentTextFileRepository
-        from src.repository.assignment_text_file_repo import AssignmentTextFileRepository
-        from src.repository.grade_text_file_repo import GradeTextFileRepository
-
-        student_repo = StudentTextFileRepository(settings.get_file_for_students())
-        assignment_repo = AssignmentTextFileRepository(settings.get_file_for_assignments())
-        grade_repo = GradeTextFileRepository(settings.get_file_for_grades())
-    else:
-        student_repo = StudentRepository()
-        assignment_repo = AssignmentRepository()
-        grade_repo = GradeRepository()
+    # Switched on before the repositories are built, so their load times are recorded too
+    STATS.enabled = settings.get_stats_enabled()
+    flush_policy = FlushPolicy(settings.get_flush_mode(), settings.get_flush_operations(), settings.get_flush_interval())
+    student_repo, assignment_repo, grade_repo = create_repositories(settings, flush_policy)
+    if not settings.get_seed_data():
+        return student_repo, assignment_repo, grade_repo, settings
 
     # Populate repositories with initial data
     list_of_assignments = generate_assignments()
@@ -137,7 +126,7 @@ def choose_repository():
     # Automatically save repositories if needed
     settings.save_repositories(student_repo, assignment_repo, grade_repo)
 
-    return student_repo, assignment_repo, grade_repo
+    return student_repo, assignment_repo, grade_repo, settings
 
 
 # --- MENU DISPLAY ---
@@ -153,6 +142,7 @@ def display_main_menu():
     print("8. All students who are late in handing in at least one assignment. These are all the students who have an ungraded assignment for which the deadline has passed.")
     print("9. Students with the best school situation, sorted in descending order of the average grade received for all graded assignments.")
     print("10. EXIT ")
+    print("12. Performance statistics")
 
 
 def validate_numeric_input(prompt, input_type=int):
@@ -192,23 +182,15 @@ def manage_students(student_service, undo_service: UndoService):
             print(f"Student {name} added.")
         elif choice == "2":
             student_id = validate_numeric_input("Enter student ID to remove: ")
-            student = student_service.get(student_id)
 
-            # Remove student
+            # Remove student; the service records the undo, which also restores the grades
             student_service.remove(student_id)
-
-            # Record for undo/redo
-            undo_service.record(
-                Operation(
-                    undo_function=FunctionCall(student_service.add, student),
-                    redo_function=FunctionCall(student_service.remove, student_id)
-                )
-            )
             print(f"Student with ID {student_id} removed.")
         elif choice == "3":
             student_id = validate_numeric_input("Enter student ID to update: ")
             new_name = input("Enter new name (press enter to skip): ").strip()
             new_group = input("Enter new group (press enter to skip): ").strip()
+            new_group = int(new_group) if new_group else None
 
             student = student_service.get(student_id)
             previous_data = {'name': student.name, 'group': student.group}
@@ -277,18 +259,9 @@ def manage_assignments(assignment_service, grade_repo, undo_service):
 
         elif choice == "2":
             assignment_id = validate_numeric_input("Enter assignment ID to remove: ")
-            assignment = assignment_service.get_assignment(assignment_id)
 
-            # Remove assignment
+            # Remove assignment; the service records the undo, which also restores the grades
             assignment_service.remove_assignment(assignment_id, grade_repo)
-
-            # Record for undo/redo
-            undo_service.record(
-                Operation(
-                    undo_function=FunctionCall(assignment_service.add_assignment, assignment),
-                    redo_function=FunctionCall(assignment_service.remove_assignment, assignment_id, grade_repo)
-                )
-            )
             print(f"Assignment with ID {assignment_id} removed.")
 
         elif choice == "3":
@@ -415,6 +388,17 @@ def display_students_with_best_grades(grade_service):
         print(f"{student.id:<12}{student.name:<20}{avg_grade:.2f}")
 
 
+def display_statistics(undo_service: UndoService):
+    print("\n--- Performance Statistics ---")
+    undo_count, redo_count = undo_service.history_length()
+    print(f"Undo history: {undo_count} undo and {redo_count} redo operations, "
+          f"about {undo_service.memory_footprint() / 1024:.1f} KB, {undo_service.evicted_operations} dropped")
+    if not STATS.enabled:
+        print("Statistics are off. Set stats = true in settings.properties to collect them.")
+        return
+    print(STATS.format_table())
+
+
 def assign_to_students(assignment_service: AssignmentService, student_repo: StudentRepository):
     print("\n--- Assign an Assignment ---")
     print("1. Assign to a single student")
@@ -428,15 +412,13 @@ def assign_to_students(assignment_service: AssignmentService, student_repo: Stud
         try:
             assignment_service.assign_to_students(assignment_id, [student_id])
             print(f"Assignment {assignment_id} successfully assigned to student {student_id}.")
-        except ValueError as e:
+        except (ValueError, StudentNotFoundError) as e:
             print(e)
 
     elif choice == "2":
         group = int(input("Enter group number to assign to: "))
         # Fetch students in the group
-        students_in_group = [
-            student.id for student in student_repo.list_all() if student.group == group
-        ]
+        students_in_group = [student.id for student in student_repo.students_in_group(group)]
         if not students_in_group:
             print(f"No students found in group {group}.")
             return
@@ -452,12 +434,38 @@ def assign_to_students(assignment_service: AssignmentService, student_repo: Stud
 
 
 def main():
-    student_repo, assignment_repo, grade_repo = choose_repository()
-    undo_service = UndoService()
-    student_service = StudentService(student_repo, grade_repo, undo_service)
-    assignment_service = AssignmentService(assignment_repo, student_repo, undo_service)
-    grade_service = GradeService(grade_repo, student_repo, assignment_repo, undo_service)
+    student_repo, assignment_repo, grade_repo, settings = choose_repository()
+    undo_service = UndoService(settings.get_undo_max_operations(), settings.get_undo_max_bytes())
+    report_engine = ParallelReportEngine(settings.get_report_workers()) if settings.get_parallel_reports() else None
+    try:
+        run_menu(student_repo, assignment_repo, grade_repo, undo_service, report_engine)
+    finally:
+        # Whatever the flush policy deferred is written here, also when the session ends with an error or Ctrl+C
+        settings.save_repositories(student_repo, assignment_repo, grade_repo)
+        if report_engine is not None:
+            report_engine.close()
+
 
+def run_menu(student_repo, assignment_repo, grade_repo, undo_service=None, report_engine=None):
+    undo_service = undo_service or UndoService()
+    student_service = StudentService(student_repo, grade_repo, undo_service)
+    assignment_service = AssignmentService(assignment_repo, student_repo, undo_service, grade_repo)
+    grade_service = GradeService(grade_repo, student_repo, assignment_repo, undo_service, report_engine)
+    if STATS.enabled:
+        # Wrapped in place, so the services already holding the repositories are timed as well
+        for component in (student_repo, assignment_repo, grade_repo, undo_service,
+                          student_service, assignment_service, grade_service):
+            instrument(component)
+    run_menu_loop(student_service, assignment_service, grade_service, student_repo, assignment_repo, grade_repo,
+                  undo_service)
+
+
+def run_menu_loop(student_service, assignment_service, grade_service, student_repo, assignment_repo, grade_repo,
+                  undo_service):
+    """
+    The main menu. The services and repositories only need to offer the methods the menu flows call,
+    so the network client runs the same loop on remote proxies.
+    """
     actions_history = []  # Stores actions for undo
     redo_history = []     # Stores undone actions for redo
 
@@ -494,17 +502,19 @@ def main():
         elif choice == "10":
             print("Goodbye!")
             break
+        elif choice == "12":
+            display_statistics(undo_service)
         elif choice == "0":
             try:
                 undo_service.undo()
                 print("Last action undone.")
-            except ValueError as e:
+            except (ValueError, UndoRedoError) as e:
                 print(e)
         elif choice == "11":
             try:
                 undo_service.redo()
                 print("Last undone action redone.")
-            except ValueError as e:
+            except (ValueError, UndoRedoError) as e:
                 print(e)
         else:
             print("Invalid choice. Try again.")